@@ -1,35 +1,131 @@
+import asyncio
 import fastapi
+import hmac
 import json 
 import os
-import requests
+import time
+import numpy as np
 import spiceypy as spice
-from fastapi import FastAPI, HTTPException, Response
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.concurrency import run_in_threadpool
 
 import phase1_simulation as sim
-import phase3_trajectory as p3_traj 
+import catalog_store
+import close_approaches
+import czml_encoder
+import ephemeris_tiles
+import neo_search
+import propagation_config
+import metrics
+import sampling_profiler
+import scene_bundle
+import session_channel
+import spice_kernels
+from session_channel import SESSION_HUB
+from session_store import DEFAULT_SESSION_ID, PURGE_INTERVAL_SECONDS, SESSION_STORE, valid_session_id
+from metrics import run_in_threadpool
+from propagation_cache import PROPAGATION_CACHE
+
+# --- Startup ---
+# "lazy" (default): serve immediately; the propagation stack and SPICE kernels load on first use.
+# "eager": load everything in the lifespan hook before accepting requests.
+# "background": accept requests at once and warm up in a worker thread; /ready reports when done.
+STARTUP_MODE = os.environ.get("ASTROTERRA_STARTUP", "lazy")
+STARTUP_STATE = {"mode": STARTUP_MODE, "warm": False, "warm_seconds": None, "error": None}
+
+def warm_up():
+    """
+    Imports the propagation stack and loads kernels, the ephemeris cache and track tiles,
+    the close-approach table, the launch grid and the impactor CZML.
+    """
+    import ephemeris_cache
+    import mitigation_grid
+    import phase3_trajectory as p3_traj
+
+    start = time.perf_counter()
+    spice_kernels.ensure_kernels_loaded()
+    ephemeris_cache.get_cache()
+    ephemeris_tiles.load_tiles()
+    close_approaches.load_table()
+    mitigation_grid.load_grid()
+    p3_traj.load_impactor_czml()
+    STARTUP_STATE.update(warm=True, warm_seconds=time.perf_counter() - start)
+    print(f"--- Warm-up finished in {STARTUP_STATE['warm_seconds']:.2f} s ---")
+
+async def _warm_up_in_background():
+    try:
+        await run_in_threadpool(warm_up)
+    except Exception as e:
+        STARTUP_STATE["error"] = f"{type(e).__name__}: {e}"
+        print(f"ERROR during warm-up: {STARTUP_STATE['error']}")
+
+async def _purge_sessions_periodically():
+    """Deletes sessions idle past the TTL, now and every PURGE_INTERVAL_SECONDS (every worker may run it)."""
+    while True:
+        try:
+            purged = await run_in_threadpool(SESSION_STORE.purge_expired)
+            if purged:
+                print(f"--- Purged {purged} expired session(s) ---")
+        except Exception as e:
+            print(f"ERROR purging sessions: {type(e).__name__}: {e}")
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app):
+    warm_up_task = None
+    if STARTUP_MODE == "eager":
+        await run_in_threadpool(warm_up)
+    elif STARTUP_MODE == "background":
+        warm_up_task = asyncio.create_task(_warm_up_in_background())
+    purge_task = asyncio.create_task(_purge_sessions_periodically())
+    yield
+    purge_task.cancel()
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
 
 # --- App Initialization ---
-app = FastAPI(title="AstroTerra Backend (Pre-computed)", version="2.0.0")
+app = FastAPI(title="AstroTerra Backend (Pre-computed)", version="2.0.0", lifespan=lifespan)
 
 # --- Middleware ---
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Records latency, status and payload sizes per route template (see metrics.py)."""
+    start = time.perf_counter()
+    profile = metrics.profile_request(request.url.path) if metrics.profiling_requested(request.headers) else None
+    with metrics.track_in_flight():
+        if profile is None:
+            response = await call_next(request)
+        else:
+            with profile as profile_result:
+                response = await call_next(request)
+            response.headers["X-Profile-File"] = os.path.basename(profile_result["path"])
+    route = request.scope.get("route")
+    request_bytes = request.headers.get("content-length")
+    response_bytes = response.headers.get("content-length")
+    metrics.record_request(
+        request.method,
+        route.path if route is not None else "unmatched",
+        response.status_code,
+        time.perf_counter() - start,
+        int(request_bytes) if request_bytes else None,
+        int(response_bytes) if response_bytes else None,
+    )
+    return response
+
 # --- Static Files ---
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 # FIX: The 'static' directory is inside the 'Backend' sub-directory.
 STATIC_DIR = os.path.join(PROJECT_ROOT, "static")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
-# --- Helper Function (copied from original) ---
-def get_asteroid_classification(h_mag, is_pha):
-    if h_mag is not None:
-        if h_mag < 18.0: return "PLANET_KILLER"
-        if h_mag < 22.0: return "CITY_KILLER"
-    if is_pha: return "PHA"
-    return "REGULAR"
+# --- Catalog Store (built once at startup from the SBDB cache) ---
+CATALOG_STORE = catalog_store.load_catalog_store()
+SEARCH_INDEX = neo_search.SearchIndex(CATALOG_STORE)
 
 # ===============================================================
 # --- PHASE 1: MISSION SIMULATION API ENDPOINTS ---
@@ -39,24 +135,32 @@ def get_asteroid_classification(h_mag, is_pha):
 
 # (In backend/app.py)
 
+def session_id_from(x_session_id):
+    """The caller's session (X-Session-Id header); requests without one share the default session."""
+    session_id = x_session_id or DEFAULT_SESSION_ID
+    if not valid_session_id(session_id):
+        raise HTTPException(status_code=400, detail="Invalid X-Session-Id header.")
+    return session_id
+
 @app.post("/simulation/start")
-async def start_new_simulation():
+async def start_new_simulation(x_session_id: str = Header(None)):
     """
     Loads the PRE-COMPUTED 'Impactor 2025' mission from the static file.
+    Also starts a fresh simulation state for the caller's session.
     """
-    # 1. This line creates the exact path to your file: "Backend/static/impactor.czml"
-    impactor_czml_path = os.path.join(STATIC_DIR, "impactor.czml")
+    session_id = session_id_from(x_session_id)
+    # 1. The impactor trajectory: "Backend/static/impactor2025.czml" (shared with Phase 3 and the launch grid)
+    impactor_czml_path = sim.IMPACTOR_CZML_PATH
 
     # 2. This checks if that file actually exists.
     if not os.path.exists(impactor_czml_path):
         raise HTTPException(
             status_code=500, 
-            detail="Error: 'impactor.czml' not found. Please run the precompute_impactor.py script first."
+            detail="Error: 'impactor2025.czml' not found. Please run the precompute_impactor.py script first."
         )
     
-    # 3. This opens and reads your 'impactor.czml' file.
-    with open(impactor_czml_path, "r") as f:
-        impactor_czml_data = json.load(f)
+    # 3. The parsed file, cached until it changes.
+    impactor_czml_data = await run_in_threadpool(sim.load_impactor_czml)
 
     # 4. This creates a simple status message for the UI.
     mock_sim_state = {
@@ -67,22 +171,129 @@ async def start_new_simulation():
         "time_to_impact_days": 90
     }
     
-    # 5. This sends the content of your 'impactor.czml' file to the frontend.
+    # 5. Per-session state lives in the session store so every worker sees it.
+    await run_in_threadpool(SESSION_STORE.update, session_id, sim.start_simulation, sim.new_simulation_state)
+    SESSION_HUB.notify(session_id)
+
+    # 6. This sends the content of your 'impactor2025.czml' file to the frontend.
     return {"simulation_state": mock_sim_state, "czml": impactor_czml_data}
 
 @app.post("/simulation/observe")
-async def observe_threat():
+async def observe_threat(x_session_id: str = Header(None)):
     """Runs one observation, refining the orbit and returning the new state and CZML."""
-    sim_state = await run_in_threadpool(sim.perform_observation)
+    session_id = session_id_from(x_session_id)
+    sim_state = await run_in_threadpool(SESSION_STORE.update, session_id, sim.perform_observation, sim.new_simulation_state)
     if sim_state is None:
         raise HTTPException(status_code=400, detail="Simulation is not in a state where observation is possible.")
-    czml_data = await run_in_threadpool(sim.generate_threat_czml)
+    SESSION_HUB.notify(session_id)
+    czml_data = await run_in_threadpool(sim.generate_threat_czml, sim_state)
     return {"simulation_state": sim_state, "czml": czml_data}
 
 @app.get("/simulation/state")
-async def get_simulation_state():
+async def get_simulation_state(x_session_id: str = Header(None)):
     """Gets the current state of the mission without changing it."""
-    return {"simulation_state": sim.SIMULATION_STATE}
+    session_id = session_id_from(x_session_id)
+    return {"simulation_state": await run_in_threadpool(SESSION_STORE.get, session_id, sim.new_simulation_state)}
+
+
+@app.get("/simulation/encounter")
+async def get_encounter(clones: int = 2000, x_session_id: str = Header(None)):
+    """
+    B-plane coordinates of the current orbit solution and of `clones` clones drawn from its
+    covariance, with the impact probability, impact point and the risk corridor as CZML.
+    """
+    import encounter
+
+    session_id = session_id_from(x_session_id)
+    if not 0 <= clones <= encounter.MAX_CLONES:
+        raise HTTPException(status_code=400, detail=f"clones must be between 0 and {encounter.MAX_CLONES}.")
+    sim_state = await run_in_threadpool(SESSION_STORE.get, session_id, sim.new_simulation_state)
+    result = await run_in_threadpool(sim.encounter_analysis, sim_state, clones)
+    if result is None:
+        raise HTTPException(status_code=400, detail="No orbit solution yet; start the simulation first.")
+    return czml_encoder.CZMLResponse(await run_in_threadpool(czml_encoder.dumps, result))
+
+
+def _session_message(channel, state):
+    """
+    The channel's next message for `state`: (message type, encoded bytes). The orbit solution
+    ("od": estimate and covariance, ~2 KB that changes on every observation) stays on the server.
+    """
+    client_state = {key: value for key, value in state.items() if key != "od"}
+    message = channel.message(client_state, sim.generate_threat_czml(state))
+    return message["type"], czml_encoder.dumps(message)
+
+
+@app.websocket("/ws/session/{session_id}")
+async def session_updates(websocket: WebSocket, session_id: str):
+    """
+    Per-session channel that pushes only what changed (see session_channel.py).
+    The first message is a "snapshot" of the simulation state and its CZML. The client then sends
+    {"action": "observe" | "start" | "state" | "resync"} and gets a "delta" with the changed
+    simulation_state fields and CZML packet updates ("resync" answers with a new snapshot).
+    Changes made to the session by other connections or REST calls on this worker are pushed too.
+    """
+    if not valid_session_id(session_id):
+        await websocket.close(code=1008, reason="Invalid session ID.")
+        return
+    await websocket.accept()
+    channel = session_channel.SessionChannel()
+    changed = SESSION_HUB.connect(session_id)
+
+    async def send(message_type, content):
+        await websocket.send_text(content.decode())
+        metrics.record_websocket_message(message_type, len(content))
+
+    async def push(state=None):
+        if state is None:
+            state = await run_in_threadpool(SESSION_STORE.get, session_id, sim.new_simulation_state)
+        await send(*await run_in_threadpool(_session_message, channel, state))
+
+    async def error(detail):
+        await send("error", json.dumps({"type": "error", "detail": detail}).encode())
+
+    async def handle(text):
+        try:
+            action = json.loads(text).get("action")
+        except (ValueError, AttributeError):
+            return await error("Messages must be JSON objects with an 'action'.")
+        if action in ("observe", "start"):
+            update = sim.perform_observation if action == "observe" else sim.start_simulation
+            state = await run_in_threadpool(SESSION_STORE.update, session_id, update, sim.new_simulation_state)
+            if state is None:
+                return await error("Simulation is not in a state where observation is possible.")
+            SESSION_HUB.notify(session_id, source=changed)
+            await push(state)
+        elif action == "state":
+            await push()
+        elif action == "resync":
+            channel.reset()
+            await push()
+        else:
+            await error("action must be 'observe', 'start', 'state' or 'resync'.")
+
+    receive = woken = None
+    with metrics.track_websocket():
+        try:
+            await push()
+            receive = asyncio.ensure_future(websocket.receive_text())
+            woken = asyncio.ensure_future(changed.wait())
+            while True:
+                done, _ = await asyncio.wait({receive, woken}, return_when=asyncio.FIRST_COMPLETED)
+                if woken in done:
+                    changed.clear()
+                    await push()
+                    woken = asyncio.ensure_future(changed.wait())
+                if receive in done:
+                    await handle(receive.result())
+                    receive = asyncio.ensure_future(websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in (receive, woken):
+                if task is not None:
+                    task.cancel()
+            SESSION_HUB.disconnect(session_id, changed)
 
 
 # --- ADD THIS ENTIRE NEW SECTION FOR PHASE 3 ---
@@ -92,7 +303,14 @@ async def launch_mitigation_vehicle(payload: dict):
     """
     Calculates the initial trajectory for the mitigation vehicle based on
     Phase 2 design choices and a precise launch time from the frontend.
+    An optional "mode" ("fast", "interactive" or "accurate") trades accuracy for latency.
     """
+    mode = payload.get("mode")
+    try:
+        propagation_config.get_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         print("--- LAUNCH REQUEST RECEIVED ---")
         # Extract data sent from the frontend
@@ -106,42 +324,152 @@ async def launch_mitigation_vehicle(payload: dict):
         if launch_time_iso.endswith('Z'):
             launch_time_iso = launch_time_iso[:-1]
 
-        # Convert the ISO launch time string to SPICE Ephemeris Time (ET)
-        launch_time_et = spice.str2et(launch_time_iso)
-
         # Call the new module to do the heavy lifting in a background thread
-        czml_data = await run_in_threadpool(
-            p3_traj.generate_mitigation_czml,
-            trajectory_params,
-            launch_time_et
+        czml_data, trajectory_id = await run_in_threadpool(_generate_mitigation_czml, trajectory_params, launch_time_iso, mode)
+        content = await run_in_threadpool(
+            czml_encoder.dumps, {"status": "success", "czml": czml_data, "trajectory_id": trajectory_id}
         )
         
-        return {"status": "success", "czml": czml_data}
+        return czml_encoder.CZMLResponse(content)
 
     except Exception as e:
         print(f"ERROR in launch_mitigation_vehicle: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to calculate trajectory: {str(e)}")
 
 
-# --- API ENDPOINTS ---
-@app.get("/neos/curated_list")
-async def get_curated_neo_list():
+def _generate_mitigation_czml(trajectory_params, launch_time_iso, mode):
+    """
+    Loads the propagation stack on first use, converts the launch time to ET and builds the CZML.
+    Returns (CZML, trajectory ID for /simulation/trajectory).
+    """
+    import phase3_trajectory as p3_traj
+
+    spice_kernels.ensure_kernels_loaded()
+    # Convert the ISO launch time string to SPICE Ephemeris Time (ET)
+    launch_time_et = spice.str2et(launch_time_iso)
+    czml_data = p3_traj.generate_mitigation_czml(trajectory_params, launch_time_et, mode)
+    return czml_data, p3_traj.mitigation_trajectory_id(trajectory_params, launch_time_et, mode)
+
+
+def _sample_trajectory(trajectory_id, at, start, end, samples):
+    """Resolves the requested UTC times against the trajectory and samples its states."""
+    import trajectory_store
+
+    spice_kernels.ensure_kernels_loaded()
+    info = trajectory_store.describe(trajectory_id)
+    if at:
+        ets = np.array([spice.str2et(t.strip().rstrip("Z")) for t in at.split(",")])
+    elif start and end:
+        ets = np.linspace(spice.str2et(start.rstrip("Z")), spice.str2et(end.rstrip("Z")), samples)
+    else:
+        ets = np.linspace(info["start_et"], info["start_et"] + info["duration_s"], samples)
+    offsets = ets - info["start_et"]
+    states = trajectory_store.sample(trajectory_id, offsets)
+    return {
+        **info,
+        "epoch": spice.et2utc(info["start_et"], "ISOC", 3),
+        "times": offsets,  # Seconds after the epoch
+        "positions_m": states[:, :3],
+        "velocities_m_s": states[:, 3:],
+    }
+
+
+@app.get("/simulation/trajectory/{trajectory_id}")
+async def get_trajectory_states(trajectory_id: str, at: str = None, start: str = None, end: str = None, samples: int = 100):
+    """
+    States along a stored propagation (the trajectory_id of /simulation/launch_mitigation) at
+    comma-separated UTC times `at`, or at `samples` even steps over [start, end] (default: the whole run).
+    Each query restores the nearest saved snapshot and integrates only the remaining gap.
+    """
+    import trajectory_store
+
+    if not trajectory_store.valid_trajectory_id(trajectory_id):
+        raise HTTPException(status_code=404, detail="Unknown trajectory.")
+    if (start is None) != (end is None):
+        raise HTTPException(status_code=400, detail="Give both start and end, or neither.")
+    if not 1 <= samples <= trajectory_store.MAX_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"samples must be between 1 and {trajectory_store.MAX_SAMPLES}.")
+    try:
+        result = await run_in_threadpool(_sample_trajectory, trajectory_id, at, start, end, samples)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown trajectory.")
+    except (ValueError, spice.exceptions.SpiceyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return czml_encoder.CZMLResponse(await run_in_threadpool(czml_encoder.dumps, result))
+
+
+@app.get("/simulation/propagation_modes")
+async def get_propagation_modes():
+    """Lists the propagation modes with their settings and measured error bounds."""
+    import phase3_trajectory as p3_traj
+
+    return {**propagation_config.describe_modes(), "mitigation_default": p3_traj.DEFAULT_MODE}
+
+@app.get("/simulation/cache_stats")
+async def get_propagation_cache_stats():
+    """Hit, miss and eviction counters for the propagation result cache."""
+    return PROPAGATION_CACHE.metrics()
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe. In "lazy" mode the worker is ready as soon as it serves requests; in "eager"
+    and "background" mode it is ready once warm-up succeeded. A failed kernel load is never ready.
+    """
+    kernels = spice_kernels.status()
+    error = STARTUP_STATE["error"] or kernels["error"]
+    ready = error is None and (STARTUP_MODE == "lazy" or STARTUP_STATE["warm"])
+    body = {"ready": ready, "startup": STARTUP_STATE, "kernels": kernels}
+    return JSONResponse(content=body, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request, span, threadpool and cache metrics in the Prometheus text format."""
+    return Response(content=metrics.render(PROPAGATION_CACHE.metrics()), media_type="text/plain; version=0.0.4")
+
+# --- Admin: on-demand sampling profiler ---
+ADMIN_TOKEN = os.environ.get("ASTROTERRA_ADMIN_TOKEN")
+
+@app.get("/admin/profile")
+async def profile_worker(
+    seconds: float = 5.0,
+    mode: str = "wall",
+    interval_ms: float = 5.0,
+    x_admin_token: str = Header(None),
+):
+    """
+    Samples every thread of this worker (event loop and threadpool) for `seconds` and returns
+    collapsed stacks for flamegraph tools. Requires the X-Admin-Token header to match
+    ASTROTERRA_ADMIN_TOKEN; the endpoint is disabled when that variable is not set.
+    """
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+    if not 0 < seconds <= sampling_profiler.MAX_DURATION_S:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {sampling_profiler.MAX_DURATION_S}].")
+    if not 1.0 <= interval_ms <= 1000.0:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000.")
+    try:
+        profiler = sampling_profiler.SamplingProfiler(mode=mode, interval=interval_ms / 1000.0)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not sampling_profiler.acquire():
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker.")
+
     try:
-        response = await run_in_threadpool(requests.get, "https://ssd-api.jpl.nasa.gov/sbdb_query.api", params={"limit": 500, "fields": "spkid,full_name,H,pha", "sb-class": "APO"}, timeout=30)
-        response.raise_for_status()
-        raw_data = response.json()
-        planet_killers, city_killers = [], []
-        for item in raw_data.get("data", []):
-            spkid, fullname, h, pha = item
-            h_mag = float(h) if h is not None else None; is_pha = pha == 'Y'
-            classification = get_asteroid_classification(h_mag, is_pha)
-            if classification == 'PLANET_KILLER' and len(planet_killers) < 5: planet_killers.append({"spkid": spkid, "name": fullname})
-            elif classification == 'CITY_KILLER' and len(city_killers) < 5: city_killers.append({"spkid": spkid, "name": fullname})
-            if len(planet_killers) >= 5 and len(city_killers) >= 5: break
-        return {"planet_killers": planet_killers, "city_killers": city_killers}
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"SBDB API error: {str(e)}")
+        # The sampler runs in its own thread; sleeping here keeps the event loop free to serve requests.
+        profiler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        sampling_profiler.release()
+    return Response(
+        content=profiler.collapsed(),
+        media_type="text/plain",
+        headers={"X-Profile-Mode": mode, "X-Profile-Samples": str(profiler.samples), "X-Profile-Pid": str(os.getpid())},
+    )
 
+
+# --- API ENDPOINTS ---
 # --- Add this function to your app.py ---
 # --- (This is the new, correct code) ---
 
@@ -149,6 +477,8 @@ async def get_curated_neo_list():
 def get_curated_neo_list():
     """
     Loads the PRE-COMPUTED curated list of NEOs from a static JSON file.
+    Written by precompute_neos.py (same shape the /scene curated_list layer serves); this
+    route used to query SBDB live on every request, now it never calls out to SBDB.
     """
     curated_list_path = os.path.join(STATIC_DIR, "curated_neo_list.json")
     
@@ -177,26 +507,165 @@ def get_neo_list():
     with open(neo_list_path, "r") as f:
         return json.load(f)
 
+@app.get("/neos/query")
+def query_neos(
+    classification: str = None,
+    pha: bool = None,
+    h_min: float = None, h_max: float = None,
+    a_min: float = None, a_max: float = None,
+    e_min: float = None, e_max: float = None,
+    i_min: float = None, i_max: float = None,
+    q_min: float = None, q_max: float = None,
+    moid_min: float = None, moid_max: float = None,
+    diameter_min: float = None, diameter_max: float = None,
+    energy_min: float = None, energy_max: float = None,
+    v_inf_min: float = None, v_inf_max: float = None,
+    sort: str = "H",
+    order: str = "asc",
+    offset: int = 0,
+    limit: int = 50,
+):
+    """
+    Filters, sorts and paginates the catalog using the in-memory columnar store.
+    `classification` accepts a comma-separated list, e.g. "PLANET_KILLER,CITY_KILLER".
+    Diameters are in km, impact energies in megatons and v_inf in km/s (see catalog_enrichment.py).
+    """
+    classifications = [c.strip().upper() for c in classification.split(",") if c.strip()] if classification else None
+    ranges = {
+        "H": (h_min, h_max), "a": (a_min, a_max), "e": (e_min, e_max),
+        "i": (i_min, i_max), "q": (q_min, q_max), "moid": (moid_min, moid_max),
+        "diameter_km": (diameter_min, diameter_max), "energy_mt": (energy_min, energy_max),
+        "v_inf_km_s": (v_inf_min, v_inf_max),
+    }
+    try:
+        return CATALOG_STORE.query(
+            classifications=classifications, pha=pha, ranges=ranges,
+            sort_by=sort, descending=order.lower() == "desc", offset=offset, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/neos/search")
+def search_neos(q: str, limit: int = 10):
+    """
+    Autocomplete lookup by name, number, provisional designation or SPK-ID.
+    Prefix matches come first, followed by fuzzy (trigram) matches.
+    """
+    return {"query": q, "results": SEARCH_INDEX.search(q, limit)}
+
+@app.get("/neos/approaches")
+def get_close_approaches(
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to"),
+    max_dist: float = close_approaches.MAX_DISTANCE_AU,
+    classification: str = None,
+    sort: str = "date",
+    limit: int = 100,
+):
+    """
+    Earth close approaches from the pre-computed calendar, e.g.
+    /neos/approaches?from=2029-01-01&to=2030-01-01&max_dist=0.01 (max_dist in AU).
+    """
+    if close_approaches.load_table() is None:
+        raise HTTPException(status_code=404, detail="Close-approach table not found. Please run precompute_close_approaches.py first.")
+    classifications = [c.strip().upper() for c in classification.split(",") if c.strip()] if classification else None
+    try:
+        return close_approaches.query(
+            ephemeris_tiles.parse_utc(start), ephemeris_tiles.parse_utc(end), max_dist, classifications, sort, limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/neos/upcoming_threats")
+def get_upcoming_threats(years: float = close_approaches.THREAT_WINDOW_YEARS, max_dist: float = close_approaches.MAX_DISTANCE_AU, limit: int = 10):
+    """
+    The closest approaches of large objects (PLANET_KILLER and CITY_KILLER) in the coming years,
+    from the pre-computed close-approach calendar.
+    """
+    if close_approaches.load_table() is None:
+        raise HTTPException(status_code=404, detail="Close-approach table not found. Please run precompute_close_approaches.py first.")
+    now = time.time()
+    try:
+        return close_approaches.query(
+            now, now + years * 365.25 * 86400, max_dist, close_approaches.THREAT_CLASSIFICATIONS, "dist", limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @app.get("/czml/catalog")
 async def get_neo_catalog_czml():
-    catalog_path = os.path.join(STATIC_DIR, "catalog.czml")
-    planets_path = os.path.join(STATIC_DIR, "planets.czml")
-
-    if not os.path.exists(catalog_path) or not os.path.exists(planets_path):
+    """
+    Planet tracks plus the asteroid catalog as one CZML document. The planets cover the coming
+    year from the ephemeris tiles when built (planets.czml otherwise); both layers come
+    pre-encoded from the scene fragment cache.
+    """
+    try:
+        content = await run_in_threadpool(scene_bundle.build_czml, ["planets", "catalog"], STATIC_DIR)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="CZML data files not found.")
+    return czml_encoder.CZMLResponse(content)
 
-    # Load both CZML files
-    with open(catalog_path, "r") as f:
-        catalog_data = json.load(f)
-    with open(planets_path, "r") as f:
-        planets_data = json.load(f)
-    
-    # The first packet in each file is the "document" packet. We'll use the one from the planets file
-    # and append all other entities.
-    combined_data = planets_data + catalog_data[1:] # Skip the asteroid document packet
+@app.get("/czml/tracks")
+async def get_track_czml(start: str, end: str, bodies: str = None):
+    """
+    Planet and Moon tracks for any interval covered by the tile store, e.g.
+    /czml/tracks?start=2031-04-01T00:00:00Z&end=2031-06-01T00:00:00Z&bodies=Mars,Moon
+    """
+    if ephemeris_tiles.load_tiles() is None:
+        raise HTTPException(status_code=404, detail="Ephemeris tiles not found. Run precompute_ephemeris_tiles.py.")
+    try:
+        start_s, end_s = ephemeris_tiles.parse_utc(start), ephemeris_tiles.parse_utc(end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be ISO-8601 UTC timestamps.")
+    names = [name.strip() for name in bodies.split(",") if name.strip()] if bodies else None
+    try:
+        czml = await run_in_threadpool(ephemeris_tiles.tracks_czml, start_s, end_s, names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return czml_encoder.CZMLResponse(await run_in_threadpool(czml_encoder.dumps, czml))
+
+@app.get("/scene")
+async def get_scene(
+    layers: str = None, start: str = None, end: str = None, format: str = "czml",
+    x_session_id: str = Header(None),
+):
+    """
+    Several viewer layers in one response, assembled from cached pre-encoded fragments.
+    `layers` is a comma-separated subset of planets, moon, catalog, impactor (CZML) and
+    neo_list, curated_list (JSON, multipart only). format=czml returns one CZML document;
+    format=multipart returns multipart/mixed with one part per layer, plus the caller's
+    simulation state when an X-Session-Id header is sent.
+    """
+    if format not in ("czml", "multipart"):
+        raise HTTPException(status_code=400, detail="format must be 'czml' or 'multipart'.")
+    if (start is None) != (end is None):
+        raise HTTPException(status_code=400, detail="Give both start and end, or neither.")
+    try:
+        names = scene_bundle.parse_layers(layers, format)
+        window = (ephemeris_tiles.parse_utc(start), ephemeris_tiles.parse_utc(end)) if start else (None, None)
+        if start:
+            scene_bundle.check_window(*window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return Response(content=json.dumps(combined_data), media_type='application/json')
+    try:
+        if format == "czml":
+            content = await run_in_threadpool(scene_bundle.build_czml, names, STATIC_DIR, *window)
+            return czml_encoder.CZMLResponse(content)
+        extra_parts = []
+        if x_session_id:
+            session_id = session_id_from(x_session_id)
+            state = await run_in_threadpool(SESSION_STORE.get, session_id, sim.new_simulation_state)
+            extra_parts.append(("simulation_state", json.dumps(state).encode()))
+        content, media_type = await run_in_threadpool(
+            scene_bundle.build_multipart, names, STATIC_DIR, *window, extra_parts
+        )
+        return Response(content=content, media_type=media_type)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # (Add this to the end of backend/app.py)
 
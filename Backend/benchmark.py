@@ -0,0 +1,451 @@
+# In Backend/benchmark.py
+"""
+Benchmark suite for the backend.
+
+  python benchmark.py run [--sizes 1000,10000,100000] [--output results.json] [--quick]
+  python benchmark.py compare baseline.json candidate.json [--threshold 0.10]
+
+`run` times microbenchmarks (propagation, CZML serialization - stdlib json
+against czml_encoder on the static CZML files, with MB/s - interpolation,
+catalog generation, catalog query/search) and end-to-end requests against the
+FastAPI app driven in-process through httpx's ASGI transport, with an empty
+temporary propagation cache so cold launches are misses in every run. Catalog-sized
+benchmarks use synthetic catalogs of each requested size. Results are written
+as JSON together with the environment they were measured in.
+
+`compare` matches benchmarks by name and flags every one whose median (or p99)
+got slower than the threshold; it exits with status 1 if anything regressed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(PROJECT_ROOT, "static")
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_THRESHOLD = 0.10
+
+# Trajectory choices offered by the frontend (travel days, Delta-V m/s).
+TRAJECTORY_CHOICES = [(25, 7500), (45, 5500), (70, 4200)]
+LAUNCH_TIME_ISO = "2025-10-27T00:00:00"
+
+
+# --- Timing helpers ---
+def summarize(samples_s):
+    """Latency statistics (milliseconds) for a list of durations in seconds."""
+    ms = np.asarray(samples_s) * 1000.0
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "min_ms": float(ms.min()),
+        "max_ms": float(ms.max()),
+    }
+
+
+def time_call(fn, repeat, warmup=1):
+    """Calls `fn` `warmup` times untimed, then `repeat` times timed."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+def with_throughput(stats, n_bytes):
+    """Adds output size and median throughput (MB/s) to a serializer's latency statistics."""
+    stats["bytes"] = n_bytes
+    stats["mb_per_s"] = n_bytes / 1e6 / (stats["p50_ms"] / 1000.0) if stats["p50_ms"] else float("inf")
+    return stats
+
+
+# --- Synthetic data ---
+def synthetic_catalog_rows(n, seed=0):
+    """
+    Random NEO-like rows in the neo_catalog_cache.json column order
+    (spkid, full_name, e, a, i, om, w, ma, epoch, moid, pha, H), as SBDB strings.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(1.0, 3.0, n)
+    e = rng.uniform(0.0, 0.9, n)
+    i = rng.uniform(0.0, 40.0, n)
+    om, w, ma = rng.uniform(0.0, 360.0, (3, n))
+    moid = rng.uniform(0.0, 0.5, n)
+    h = rng.uniform(14.0, 30.0, n)
+    pha = (moid < 0.05) & (h < 22.0)
+    rows = []
+    for k in range(n):
+        spkid = 20000000 + k
+        name = f"{k + 1000} Synth{k} ({2000 + k % 25} S{k % 1000:03d})"
+        rows.append([
+            str(spkid), name, f"{e[k]:.6f}", f"{a[k]:.6f}", f"{i[k]:.4f}", f"{om[k]:.4f}", f"{w[k]:.4f}",
+            f"{ma[k]:.4f}", "2460800.5", f"{moid[k]:.5f}", "Y" if pha[k] else "N", f"{h[k]:.2f}",
+        ])
+    return rows
+
+
+def to_query_rows(rows):
+    """Reorders cache rows into the sbdb_query field order used by generate_catalog."""
+    return [[r[0], r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8], r[11], r[10]] for r in rows]
+
+
+def synthetic_catalog_czml(rows):
+    """Catalog CZML with one static point per object, shaped like static/catalog.czml."""
+    rng = np.random.default_rng(1)
+    positions = rng.normal(0.0, 1.5e11, (len(rows), 3))
+    czml = [{"id": "document", "version": "1.0"}]
+    for row, pos in zip(rows, positions.tolist()):
+        czml.append({
+            "id": f"asteroid_{row[0]}", "name": row[1],
+            "position": {"cartesian": pos, "referenceFrame": "INERTIAL"},
+            "properties": {"isPHA": row[10] == "Y", "classification": "REGULAR"},
+        })
+    return czml
+
+
+# --- Microbenchmarks ---
+def bench_propagation(results, repeat):
+    import spiceypy as spice
+    import kepler
+    import phase3_trajectory as p3_traj
+
+    start_et = spice.str2et(LAUNCH_TIME_ISO)
+    impactor = p3_traj.load_impactor_czml()
+    r0 = np.array([1.4e8, 2.0e7, 0.0])
+    v0 = np.array([-4.0, 29.0, 0.5])
+    times = np.linspace(0.0, 70 * 86400.0, p3_traj.N_POINTS)
+    results["kepler.propagate[200]"] = time_call(lambda: kepler.propagate(r0, v0, times), repeat * 10)
+
+    batch_r0 = np.tile(r0, (1000, 1))
+    batch_v0 = np.tile(v0, (1000, 1))
+    results["kepler.propagate[1000x200]"] = time_call(lambda: kepler.propagate(batch_r0, batch_v0, times), repeat)
+
+    for days, dv in TRAJECTORY_CHOICES:
+        params = {"travel_time_days": days, "required_deltav": dv}
+        pos, vel = p3_traj.compute_launch_state(params, start_et, impactor)
+        for mode in ("fast", "interactive", "accurate"):
+            results[f"propagate_spacecraft[{mode},{days}d]"] = time_call(
+                lambda: p3_traj.propagate_spacecraft(pos, vel, start_et, days * 86400, mode), repeat
+            )
+
+
+def _czml_as_lists(packets):
+    """The CZML as stdlib json would need it: every sample array converted to a list."""
+    return [
+        {**p, "position": {**p["position"], "cartesian": np.asarray(p["position"]["cartesian"]).ravel().tolist()}}
+        if "position" in p else p
+        for p in packets
+    ]
+
+
+def _czml_as_arrays(packets):
+    """The CZML as the producers now emit it: sample lists held as float64 arrays."""
+    return [
+        {**p, "position": {**p["position"], "cartesian": np.asarray(p["position"]["cartesian"], dtype=np.float64)}}
+        if "position" in p else p
+        for p in packets
+    ]
+
+
+def _bench_encoders(results, name, packets, repeat):
+    """json.dumps (lists) vs czml_encoder.dumps (arrays, mm precision) on the same CZML."""
+    import czml_encoder
+
+    as_lists, as_arrays = _czml_as_lists(packets), _czml_as_arrays(packets)
+    results[f"json.dumps[{name}]"] = with_throughput(
+        time_call(lambda: json.dumps(as_lists), repeat), len(json.dumps(as_lists).encode())
+    )
+    results[f"czml_encoder.dumps[{name}]"] = with_throughput(
+        time_call(lambda: czml_encoder.dumps(as_arrays), repeat), len(czml_encoder.dumps(as_arrays))
+    )
+
+
+def bench_serialization(results, repeat, sizes):
+    import spiceypy as spice
+    import phase3_trajectory as p3_traj
+
+    start_et = spice.str2et(LAUNCH_TIME_ISO)
+    travel_seconds = 70 * 86400
+    times = np.linspace(0, travel_seconds, p3_traj.N_POINTS)
+    positions_m = np.random.default_rng(2).normal(0.0, 1.5e11, (p3_traj.N_POINTS, 3))
+    results["build_mitigation_czml"] = time_call(
+        lambda: p3_traj.build_mitigation_czml(start_et, start_et + travel_seconds, times, positions_m), repeat * 10
+    )
+    czml = p3_traj.build_mitigation_czml(start_et, start_et + travel_seconds, times, positions_m)
+    _bench_encoders(results, "mitigation_czml", czml, repeat * 10)
+
+    # The real CZML files shipped in static/.
+    for name in ("impactor2025.czml", "moon.czml", "catalog.czml"):
+        path = os.path.join(STATIC_DIR, name)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                _bench_encoders(results, name, json.load(f), repeat)
+
+    for n in sizes:
+        catalog = synthetic_catalog_czml(synthetic_catalog_rows(n))
+        results[f"json.dumps[catalog_czml,{n}]"] = time_call(lambda: json.dumps(catalog), max(3, repeat // 5))
+
+
+def bench_interpolation(results, repeat):
+    import spiceypy as spice
+    import mitigation_grid
+    import phase3_trajectory as p3_traj
+
+    impactor = p3_traj.load_impactor_czml()
+    start_et = spice.str2et(LAUNCH_TIME_ISO)
+    targets = start_et + np.random.default_rng(3).uniform(0, 90 * 86400, 100)
+    results["get_position_from_czml[x100]"] = time_call(
+        lambda: [p3_traj.get_position_from_czml(impactor, t) for t in targets], repeat
+    )
+
+    integrator = p3_traj.propagation_settings()
+    if mitigation_grid.load_grid() is not None:
+        results["mitigation_grid.lookup"] = time_call(
+            lambda: mitigation_grid.lookup(45, 5500, start_et + 1800.0, integrator), repeat * 10
+        )
+
+
+def bench_catalog(results, repeat, sizes):
+    import spiceypy as spice
+    import catalog_store
+    import generate_catalog
+    import neo_search
+
+    et_now = spice.str2et(LAUNCH_TIME_ISO)
+    for n in sizes:
+        rows = synthetic_catalog_rows(n)
+        if n <= 10000:
+            query_rows = to_query_rows(rows)
+            results[f"generate_catalog.build_catalog_czml[{n}]"] = time_call(
+                lambda: generate_catalog.build_catalog_czml(query_rows, et_now), max(1, repeat // 10), warmup=0
+            )
+        t0 = time.perf_counter()
+        store = catalog_store.CatalogStore(rows)
+        index = neo_search.SearchIndex(store)
+        results[f"catalog_index_build[{n}]"] = summarize([time.perf_counter() - t0])
+        results[f"CatalogStore.query[{n}]"] = time_call(
+            lambda: store.query(classifications=["CITY_KILLER", "PHA"], ranges={"a": (1.0, 2.0)}, sort_by="moid"),
+            repeat * 5,
+        )
+        results[f"SearchIndex.search[prefix,{n}]"] = time_call(lambda: index.search("synth12", 10), repeat * 5)
+        results[f"SearchIndex.search[fuzzy,{n}]"] = time_call(lambda: index.search("snyth 4567", 10), repeat * 5)
+        # Trigrams shared by most of the catalog: the most candidates the fuzzy path has to rank.
+        results[f"SearchIndex.search[fuzzy-common,{n}]"] = time_call(lambda: index.search("synth9999 s999", 10), repeat * 5)
+
+
+# --- End-to-end (in-process ASGI) ---
+async def _drive(client, method, url, requests_total, concurrency, payloads=None):
+    """Sends `requests_total` requests with at most `concurrency` in flight; returns per-request latencies."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(k):
+        async with semaphore:
+            t0 = time.perf_counter()
+            if method == "POST":
+                response = await client.post(url, json=payloads[k % len(payloads)])
+            else:
+                response = await client.get(url)
+            latencies.append(time.perf_counter() - t0)
+            response.raise_for_status()
+            return len(response.content)
+
+    t0 = time.perf_counter()
+    sizes = await asyncio.gather(*(one(k) for k in range(requests_total)))
+    wall = time.perf_counter() - t0
+    stats = summarize(latencies)
+    stats.update(concurrency=concurrency, throughput_rps=requests_total / wall, response_bytes=int(np.mean(sizes)))
+    return stats
+
+
+async def _bench_endpoints(results, repeat, sizes, concurrency):
+    import httpx
+    import app as app_module
+    import catalog_store
+    import neo_search
+    import phase3_trajectory
+    import propagation_cache
+    import simulation
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    original = (app_module.STATIC_DIR, app_module.CATALOG_STORE, app_module.SEARCH_INDEX)
+    workdir = tempfile.mkdtemp(prefix="astroterra_bench_")
+    # An empty cache of the run's own: cold runs stay misses from one run to the next, and the
+    # server's data/propagation_cache is left alone.
+    cache_modules = (app_module, phase3_trajectory, simulation)
+    original_cache = propagation_cache.PROPAGATION_CACHE
+    cache = propagation_cache.PropagationCache(cache_dir=os.path.join(workdir, "propagation_cache"))
+    for module in cache_modules:
+        module.PROPAGATION_CACHE = cache
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            # Mitigation launches at distinct times, so each request is a cache/grid miss unless the grid covers it.
+            payloads = [
+                {
+                    "trajectory": {"travel_time_days": days, "required_deltav": dv},
+                    "launchTimeISO": f"2025-10-27T{k % 24:02d}:{(7 * k) % 60:02d}:00",
+                }
+                for k in range(repeat)
+                for days, dv in TRAJECTORY_CHOICES
+            ]
+            for name, runs in (("POST /simulation/launch_mitigation", payloads),
+                               ("POST /simulation/launch_mitigation[warm]", payloads[:1] * repeat)):
+                before = cache.metrics()
+                results[name] = await _drive(client, "POST", "/simulation/launch_mitigation", len(runs), concurrency, runs)
+                after = cache.metrics()
+                results[name]["cache_hits"] = sum(after[k] - before[k] for k in ("memory_hits", "disk_hits"))
+
+            planets_path = os.path.join(STATIC_DIR, "planets.czml")
+            for n in sizes:
+                rows = synthetic_catalog_rows(n)
+                with open(os.path.join(workdir, "catalog.czml"), "w") as f:
+                    json.dump(synthetic_catalog_czml(rows), f)
+                if os.path.exists(planets_path):
+                    shutil.copy(planets_path, workdir)
+                else:
+                    with open(os.path.join(workdir, "planets.czml"), "w") as f:
+                        json.dump([{"id": "document", "version": "1.0"}], f)
+                store = catalog_store.CatalogStore(rows)
+                app_module.STATIC_DIR = workdir
+                app_module.CATALOG_STORE = store
+                app_module.SEARCH_INDEX = neo_search.SearchIndex(store)
+
+                results[f"GET /czml/catalog[{n}]"] = await _drive(
+                    client, "GET", "/czml/catalog", max(3, repeat // 5), 1
+                )
+                results[f"GET /neos/query[{n}]"] = await _drive(
+                    client, "GET", "/neos/query?classification=CITY_KILLER,PHA&a_max=2&sort=moid&limit=100",
+                    repeat * 5, concurrency,
+                )
+                results[f"GET /neos/search[{n}]"] = await _drive(
+                    client, "GET", "/neos/search?q=synth12&limit=10", repeat * 5, concurrency
+                )
+    finally:
+        app_module.STATIC_DIR, app_module.CATALOG_STORE, app_module.SEARCH_INDEX = original
+        for module in cache_modules:
+            module.PROPAGATION_CACHE = original_cache
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# --- Run / compare ---
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes, repeat, concurrency, groups):
+    import spice_kernels
+
+    spice_kernels.ensure_kernels_loaded()
+    results = {}
+    steps = {
+        "propagation": lambda: bench_propagation(results, repeat),
+        "serialization": lambda: bench_serialization(results, repeat, sizes),
+        "interpolation": lambda: bench_interpolation(results, repeat),
+        "catalog": lambda: bench_catalog(results, repeat, sizes),
+        "endpoints": lambda: asyncio.run(_bench_endpoints(results, repeat, sizes, concurrency)),
+    }
+    for name in groups:
+        print(f"--- Running {name} benchmarks ---")
+        t0 = time.perf_counter()
+        steps[name]()
+        print(f" -> {name} done in {time.perf_counter() - t0:.1f} s")
+    return {
+        "environment": environment(),
+        "config": {"sizes": sizes, "repeat": repeat, "concurrency": concurrency, "groups": groups},
+        "benchmarks": results,
+    }
+
+
+def compare_results(baseline, candidate, threshold=DEFAULT_THRESHOLD):
+    """Returns one row per benchmark present in both runs, with p50/p99 ratios and a regression flag."""
+    rows = []
+    for name in sorted(set(baseline["benchmarks"]) & set(candidate["benchmarks"])):
+        base, cand = baseline["benchmarks"][name], candidate["benchmarks"][name]
+        p50_ratio = cand["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("inf")
+        p99_ratio = cand["p99_ms"] / base["p99_ms"] if base["p99_ms"] else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_p50_ms": base["p50_ms"], "candidate_p50_ms": cand["p50_ms"],
+            "p50_ratio": p50_ratio, "p99_ratio": p99_ratio,
+            "regressed": p50_ratio > 1.0 + threshold or p99_ratio > 1.0 + 2 * threshold,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AstroTerra backend benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                            help="comma-separated synthetic catalog sizes")
+    run_parser.add_argument("--repeat", type=int, default=20)
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--groups", default="propagation,serialization,interpolation,catalog,endpoints")
+    run_parser.add_argument("--output", default="benchmark_results.json")
+    run_parser.add_argument("--quick", action="store_true", help="1k catalog only and few repeats (smoke test)")
+
+    compare_parser = sub.add_parser("compare", help="compare two result files and flag regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="allowed relative slowdown of the median (p99 gets twice this)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = [1000] if args.quick else [int(n) for n in args.sizes.split(",")]
+        repeat = 3 if args.quick else args.repeat
+        report = run_benchmarks(sizes, repeat, args.concurrency, [g.strip() for g in args.groups.split(",")])
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        for name, stats in report["benchmarks"].items():
+            throughput = f"   {stats['mb_per_s']:8.1f} MB/s" if "mb_per_s" in stats else ""
+            print(f"{name:50s} p50 {stats['p50_ms']:10.3f} ms   p99 {stats['p99_ms']:10.3f} ms{throughput}")
+        print(f"--- Results saved to {args.output} ---")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r") as f:
+        candidate = json.load(f)
+    rows = compare_results(baseline, candidate, args.threshold)
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"{row['name']:50s} {row['baseline_p50_ms']:10.3f} -> {row['candidate_p50_ms']:10.3f} ms "
+              f"(x{row['p50_ratio']:.2f} p50, x{row['p99_ratio']:.2f} p99) {flag}")
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    print(f"--- {len(rows)} benchmarks compared, {len(regressions)} regressed ---")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# In Backend/catalog_enrichment.py
+"""
+Derived physics columns for the NEO catalog, computed for every row at once.
+
+From the SBDB elements and magnitudes held by the catalog store:
+  diameter_km   measured diameter where SBDB lists one, else from H and the
+                albedo (DEFAULT_ALBEDO where none is listed)
+  mass_kg       a sphere of that diameter at DENSITY_KG_M3
+  v_inf_km_s    encounter speed relative to Earth from a, e and i (Öpik),
+                assuming Earth on a circular orbit at 1 AU
+  energy_mt     kinetic energy at impact (v_inf plus Earth's escape speed)
+                in megatons of TNT
+  classification  codes into catalog_store.CLASSIFICATIONS
+
+These are order-of-magnitude estimates: the diameter from H alone is good to
+about a factor of two, and the mass assumes a single bulk density.
+"""
+import numpy as np
+
+# --- Configuration ---
+DEFAULT_ALBEDO = 0.14  # Mean NEO geometric albedo
+DENSITY_KG_M3 = 2600.0
+EARTH_ORBITAL_SPEED_KM_S = 29.78
+EARTH_ESCAPE_SPEED_KM_S = 11.19
+JOULES_PER_MEGATON = 4.184e15
+
+# H thresholds of the classifications (same order as catalog_store.CLASSIFICATIONS).
+PLANET_KILLER_MAX_H = 18.0
+CITY_KILLER_MAX_H = 22.0
+
+
+def diameter_km(h_mag, albedo=None, measured=None):
+    """Diameter from absolute magnitude and albedo: D = 1329 / sqrt(p) * 10^(-H/5); measured values win."""
+    h_mag = np.asarray(h_mag, dtype=np.float64)
+    albedo = np.full(h_mag.shape, np.nan) if albedo is None else np.asarray(albedo, dtype=np.float64)
+    albedo = np.where(np.isfinite(albedo) & (albedo > 0.0), albedo, DEFAULT_ALBEDO)
+    diameter = 1329.0 / np.sqrt(albedo) * 10.0 ** (-h_mag / 5.0)
+    if measured is not None:
+        measured = np.asarray(measured, dtype=np.float64)
+        diameter = np.where(np.isfinite(measured) & (measured > 0.0), measured, diameter)
+    return diameter
+
+
+def mass_kg(diameter):
+    radius_m = np.asarray(diameter, dtype=np.float64) * 500.0
+    return 4.0 / 3.0 * np.pi * radius_m**3 * DENSITY_KG_M3
+
+
+def v_infinity_km_s(a, e, i_deg):
+    """
+    Öpik encounter speed with Earth: U^2 = 3 - 1/a - 2 sqrt(a (1 - e^2)) cos i, in units of Earth's
+    orbital speed (a in AU). NaN for unbound or invalid elements.
+    """
+    a, e = np.asarray(a, dtype=np.float64), np.asarray(e, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        u_squared = 3.0 - 1.0 / a - 2.0 * np.sqrt(a * (1.0 - e**2)) * np.cos(np.radians(i_deg))
+        u_squared = np.where((a > 0.0) & (e < 1.0), np.maximum(u_squared, 0.0), np.nan)
+    return np.sqrt(u_squared) * EARTH_ORBITAL_SPEED_KM_S
+
+
+def impact_energy_mt(mass, v_inf):
+    """Kinetic energy at impact in megatons: the hyperbolic excess speed plus Earth's escape speed."""
+    speed_m_s = np.sqrt(np.asarray(v_inf, dtype=np.float64)**2 + EARTH_ESCAPE_SPEED_KM_S**2) * 1000.0
+    return 0.5 * np.asarray(mass, dtype=np.float64) * speed_m_s**2 / JOULES_PER_MEGATON
+
+
+def classify(h_mag, pha):
+    """Classification codes (indexes into catalog_store.CLASSIFICATIONS); a missing H falls through to PHA/REGULAR."""
+    h_mag = np.asarray(h_mag, dtype=np.float64)
+    return np.select(
+        [h_mag < PLANET_KILLER_MAX_H, h_mag < CITY_KILLER_MAX_H, np.asarray(pha, dtype=bool)],
+        [0, 1, 2],
+        default=3,
+    ).astype(np.int8)
+
+
+def enrich(columns, pha):
+    """
+    Derived columns for `columns` (float arrays H, a, e, i, and optionally albedo and diameter).
+    Returns ({name: array}, classification codes).
+    """
+    diameter = diameter_km(columns["H"], columns.get("albedo"), columns.get("diameter"))
+    mass = mass_kg(diameter)
+    v_inf = v_infinity_km_s(columns["a"], columns["e"], columns["i"])
+    derived = {
+        "diameter_km": diameter,
+        "mass_kg": mass,
+        "v_inf_km_s": v_inf,
+        "energy_mt": impact_energy_mt(mass, v_inf),
+    }
+    return derived, classify(columns["H"], pha)
@@ -0,0 +1,139 @@
+# In Backend/catalog_store.py
+"""
+In-memory columnar store for the NEO catalog.
+
+The SBDB rows cached in data/neo_catalog_cache.json are loaded once into
+NumPy columns. Every numeric column gets a pre-sorted index and every
+classification gets a boolean bitmap, so a filtered, sorted and paginated
+query is a handful of vectorized operations instead of a Python loop.
+Derived physics (diameter, mass, encounter speed, impact energy) and the
+classification come from catalog_enrichment, once for all rows at load.
+"""
+import json
+import os
+
+import numpy as np
+
+import catalog_enrichment
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+CATALOG_CACHE_PATH = os.path.join(DATA_DIR, "neo_catalog_cache.json")
+
+# Column order of the rows in neo_catalog_cache.json (used when the cache has no "fields" key).
+CACHE_FIELDS = ["spkid", "full_name", "e", "a", "i", "om", "w", "ma", "epoch", "moid", "pha", "H"]
+# Physical parameters fetched after CACHE_FIELDS when available; SBDB leaves them empty for most objects.
+OPTIONAL_FIELDS = ["albedo", "diameter"]
+
+CLASSIFICATIONS = ["PLANET_KILLER", "CITY_KILLER", "PHA", "REGULAR"]
+
+# Columns that can be filtered (min/max) and sorted on.
+QUERY_COLUMNS = ["H", "a", "e", "i", "q", "moid", "diameter_km", "mass_kg", "v_inf_km_s", "energy_mt"]
+
+MAX_PAGE_SIZE = 500
+
+
+def float_column(values):
+    """Converts SBDB string values to float64, using NaN for missing entries."""
+    return np.array([float(v) if v not in (None, "") else np.nan for v in values], dtype=np.float64)
+
+
+class CatalogStore:
+    """Columnar NumPy view of the catalog with sorted indexes and classification bitmaps."""
+
+    def __init__(self, rows, fields=None):
+        fields = fields or CACHE_FIELDS
+        col = {name: [row[idx] for row in rows] for idx, name in enumerate(fields)}
+        self.size = len(rows)
+
+        # --- Raw columns ---
+        self.spkid = np.array([int(v) for v in col["spkid"]], dtype=np.int64)
+        self.names = np.array([str(v) for v in col["full_name"]], dtype=object)
+        self.pha = np.array([v == "Y" for v in col["pha"]], dtype=bool)
+        self.columns = {name: float_column(col[name]) for name in ("H", "a", "e", "i", "om", "w", "ma", "epoch")}
+        self.columns["moid"] = float_column(col["moid"]) if "moid" in col else np.full(self.size, np.nan)
+        self.columns["q"] = self.columns["a"] * (1.0 - self.columns["e"])
+        physical = {name: float_column(col[name]) for name in OPTIONAL_FIELDS if name in col}
+
+        # --- Derived columns, classification codes and bitmaps ---
+        derived, self.classification = catalog_enrichment.enrich(dict(self.columns, **physical), self.pha)
+        self.columns.update(derived)
+        self.class_masks = {name: self.classification == code for code, name in enumerate(CLASSIFICATIONS)}
+
+        # --- Sorted indexes (NaN sorts last) ---
+        self.sorted_index = {name: np.argsort(self.columns[name], kind="stable") for name in QUERY_COLUMNS}
+        self.sorted_values = {name: self.columns[name][idx] for name, idx in self.sorted_index.items()}
+
+    def range_mask(self, column, low=None, high=None):
+        """Returns a boolean mask of rows with low <= column <= high using the sorted index."""
+        values = self.sorted_values[column]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        # NaNs sort to the end, so an open upper bound must stop before them.
+        stop = np.searchsorted(values, np.inf if high is None else high, side="right")
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.sorted_index[column][start:stop]] = True
+        return mask
+
+    def query(self, classifications=None, pha=None, ranges=None, sort_by="H", descending=False, offset=0, limit=50):
+        """
+        Filters, sorts and paginates the catalog.
+        `ranges` maps a column name from QUERY_COLUMNS to a (min, max) tuple; either bound may be None.
+        """
+        if sort_by not in QUERY_COLUMNS:
+            raise ValueError(f"Cannot sort by '{sort_by}'. Choose one of {QUERY_COLUMNS}.")
+
+        mask = np.ones(self.size, dtype=bool)
+        if classifications:
+            class_mask = np.zeros(self.size, dtype=bool)
+            for name in classifications:
+                if name not in self.class_masks:
+                    raise ValueError(f"Unknown classification '{name}'. Choose from {CLASSIFICATIONS}.")
+                class_mask |= self.class_masks[name]
+            mask &= class_mask
+        if pha is not None:
+            mask &= self.pha if pha else ~self.pha
+        for column, (low, high) in (ranges or {}).items():
+            if column not in QUERY_COLUMNS:
+                raise ValueError(f"Cannot filter on '{column}'. Choose one of {QUERY_COLUMNS}.")
+            if low is not None or high is not None:
+                mask &= self.range_mask(column, low, high)
+
+        order = self.sorted_index[sort_by]
+        order = order[mask[order]]
+        if descending:
+            # Keep rows with a missing value at the end of the list.
+            valid = ~np.isnan(self.columns[sort_by][order])
+            order = np.concatenate([order[valid][::-1], order[~valid]])
+
+        limit = max(0, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+        page = order[offset:offset + limit]
+        return {
+            "total": int(order.size),
+            "offset": offset,
+            "limit": limit,
+            "results": [self.row(i) for i in page],
+        }
+
+    def row(self, i):
+        """Builds the JSON representation of a single catalog row."""
+        result = {
+            "spkid": int(self.spkid[i]),
+            "name": self.names[i],
+            "classification": CLASSIFICATIONS[self.classification[i]],
+            "pha": bool(self.pha[i]),
+        }
+        for name in QUERY_COLUMNS:
+            value = self.columns[name][i]
+            result[name] = None if np.isnan(value) else float(value)
+        return result
+
+
+def load_catalog_store(path=CATALOG_CACHE_PATH):
+    """Builds the CatalogStore from the SBDB catalog cache file."""
+    with open(path, "r") as f:
+        cache = json.load(f)
+    store = CatalogStore(cache.get("data", []), cache.get("fields"))
+    print(f"--- Catalog store ready: {store.size} objects indexed ---")
+    return store
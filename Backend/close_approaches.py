@@ -0,0 +1,109 @@
+# In Backend/close_approaches.py
+"""
+Earth close-approach calendar for the NEO catalog.
+
+precompute_close_approaches.py finds every approach closer than
+MAX_DISTANCE_AU over a multi-decade window and writes one table:
+
+  data/close_approaches.npz  columns time (POSIX s, UTC), dist_au, v_rel_km_s, spkid,
+                             name, classification; rows sorted by time
+
+The time column is the index. A date-range query is two binary searches that
+give one contiguous slice, and the distance and classification filters are
+vectorized masks over that slice only. Queries therefore take microseconds
+to milliseconds however large the table is, and serving needs no SPICE call.
+"""
+import os
+import threading
+
+import numpy as np
+
+import catalog_store
+import ephemeris_tiles
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+TABLE_PATH = os.path.join(PROJECT_ROOT, "data", "close_approaches.npz")
+MAX_DISTANCE_AU = 0.05  # Approaches stored by the precompute (the PHA MOID limit)
+AU_KM = 149597870.7
+LUNAR_DISTANCE_AU = 384400.0 / AU_KM
+MAX_RESULTS = 500
+
+THREAT_CLASSIFICATIONS = ["PLANET_KILLER", "CITY_KILLER"]
+THREAT_WINDOW_YEARS = 10
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def load_table():
+    """Loads the approach table once. Returns None if it was never built."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            if not os.path.exists(TABLE_PATH):
+                _table = {}
+            else:
+                with np.load(TABLE_PATH, allow_pickle=False) as data:
+                    _table = {name: data[name] for name in data.files}
+                print(f"--- Close-approach table loaded: {len(_table['time'])} approaches ---")
+    return _table or None
+
+
+def _row(table, k):
+    dist_au = float(table["dist_au"][k])
+    return {
+        "spkid": int(table["spkid"][k]),
+        "name": str(table["name"][k]),
+        "classification": catalog_store.CLASSIFICATIONS[table["classification"][k]],
+        "date": ephemeris_tiles.format_utc(float(table["time"][k])),
+        "dist_au": dist_au,
+        "dist_ld": dist_au / LUNAR_DISTANCE_AU,
+        "v_rel_km_s": float(table["v_rel_km_s"][k]),
+    }
+
+
+def query(start, end, max_dist_au=MAX_DISTANCE_AU, classifications=None, sort="date", limit=100):
+    """
+    Approaches in [start, end] (POSIX seconds) closer than `max_dist_au`, sorted by date or distance.
+    Raises ValueError for bad arguments or if the table has not been built.
+    """
+    table = load_table()
+    if table is None:
+        raise ValueError("The close-approach table has not been built. Run precompute_close_approaches.py.")
+    if end < start:
+        raise ValueError("'to' must not be before 'from'.")
+    if sort not in ("date", "dist"):
+        raise ValueError("sort must be 'date' or 'dist'.")
+
+    times = table["time"]
+    lo = int(np.searchsorted(times, start, side="left"))
+    hi = int(np.searchsorted(times, end, side="right"))
+    mask = table["dist_au"][lo:hi] <= max_dist_au
+    if classifications:
+        codes = []
+        for name in classifications:
+            if name not in catalog_store.CLASSIFICATIONS:
+                raise ValueError(f"Unknown classification '{name}'. Choose from {catalog_store.CLASSIFICATIONS}.")
+            codes.append(catalog_store.CLASSIFICATIONS.index(name))
+        mask &= np.isin(table["classification"][lo:hi], codes)
+    rows = lo + np.flatnonzero(mask)
+    if sort == "dist":
+        rows = rows[np.argsort(table["dist_au"][rows], kind="stable")]
+
+    limit = max(0, min(int(limit), MAX_RESULTS))
+    return {
+        "from": ephemeris_tiles.format_utc(start),
+        "to": ephemeris_tiles.format_utc(end),
+        "max_dist_au": max_dist_au,
+        "total": int(rows.size),
+        "results": [_row(table, k) for k in rows[:limit]],
+    }
+
+
+def coverage():
+    """(start, end) POSIX seconds of the precompute window, or None."""
+    table = load_table()
+    if table is None:
+        return None
+    return float(table["window"][0]), float(table["window"][1])
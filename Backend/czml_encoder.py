@@ -0,0 +1,133 @@
+# In Backend/czml_encoder.py
+"""
+JSON encoder for CZML that writes NumPy arrays without per-element Python objects.
+
+`dumps()` encodes the packet structure with the stdlib encoder and splices
+in every float64 array, such as a position's "cartesian" samples, in one
+vectorized pass: values are rounded to `decimals` places (millimetres for
+metres, by default) and their digits are written into a byte matrix with one
+row per value. A mask then drops leading zeros, trailing zeros and unused sign
+bytes. Arrays are written flat, which is the layout CZML's sampled properties
+expect.
+
+`Raw` wraps bytes that are already JSON (cached fragments). `CZMLResponse`
+returns the encoded bytes as-is, so FastAPI does not encode them again.
+"""
+import json
+
+import numpy as np
+from fastapi import Response
+
+# --- Configuration ---
+DEFAULT_DECIMALS = 3  # Millimetre precision for positions in metres
+MAX_ABS_SCALED = 9.0e18  # Rounded values must fit in an int64
+SMALL_ARRAY = 32  # Shorter arrays go through the stdlib encoder
+
+_encode_scalar = json.JSONEncoder(separators=(",", ":")).encode
+_encode_finite = json.JSONEncoder(separators=(",", ":"), allow_nan=False).encode
+_PLACEHOLDER = "\x00czml_encoder\x00"
+_ENCODED_PLACEHOLDER = json.dumps(_PLACEHOLDER).encode()
+
+
+class Raw:
+    """Pre-encoded JSON, inserted verbatim by `dumps()`."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+def encode_array(values, decimals=DEFAULT_DECIMALS):
+    """Comma-separated JSON numbers (bytes, no brackets) for a numeric array, flattened in C order."""
+    a = np.asarray(values)
+    if a.dtype.kind == "b":
+        return _encode_scalar(a.ravel().tolist())[1:-1].encode()
+    if a.dtype.kind in "iu":
+        decimals = 0
+    if a.size < SMALL_ARRAY:
+        # Per-call setup outweighs the vectorized path for single positions and similar.
+        flat = a.ravel().tolist()
+        if decimals:
+            flat = [round(v, decimals) for v in flat]
+        return _encode_finite(flat)[1:-1].encode()
+    a = a.ravel().astype(np.float64, copy=False)
+    if not np.isfinite(a).all():
+        raise ValueError("CZML cannot encode NaN or infinite values.")
+    scaled = np.rint(a * 10.0 ** decimals)
+    if np.abs(scaled).max() >= MAX_ABS_SCALED:
+        raise ValueError(f"Values are too large to encode with {decimals} decimals.")
+    ints = scaled.astype(np.int64)
+    magnitude = np.abs(ints)
+
+    # Significant digits per value: integer digits (at least one) and fraction digits
+    # up to the last non-zero one.
+    n_int = max(len(str(int(magnitude.max()))) - decimals, 1)
+    int_part, frac_part = np.divmod(magnitude, 10 ** decimals)
+    n_sig_int = np.ones(a.size, dtype=np.int64)
+    for k in range(1, n_int):
+        n_sig_int += int_part >= 10 ** k
+    n_frac = np.full(a.size, decimals, dtype=np.int64)
+    for k in range(1, decimals + 1):
+        n_frac -= frac_part % 10 ** k == 0
+
+    # Byte matrix [sign | integer digits | '.' | fraction digits | ','], one row per value,
+    # filled from the least significant digit; `keep` masks the bytes each value needs.
+    point = 1 + n_int
+    n_cols = point + decimals + 2 if decimals else point + 1
+    chars = np.empty((a.size, n_cols), dtype=np.uint8)
+    chars[:, 0] = ord("-")
+    rest = magnitude
+    for column in range(n_cols - 2, 0, -1):
+        if decimals and column == point:
+            continue
+        quotient = rest // 10
+        chars[:, column] = rest - quotient * 10 + ord("0")
+        rest = quotient
+    chars[:, -1] = ord(",")
+    columns = np.arange(n_cols)
+    keep = columns >= (point - n_sig_int)[:, None]
+    keep[:, 0] = ints < 0
+    if decimals:
+        chars[:, point] = ord(".")
+        keep[:, point] = n_frac > 0
+        keep[:, point + 1:-1] = columns[point + 1:-1] <= (point + n_frac)[:, None]
+    return chars[keep].tobytes()[:-1]
+
+
+def dumps(obj, decimals=DEFAULT_DECIMALS):
+    """Compact JSON bytes for `obj`; NumPy arrays are written flat, rounded to `decimals` places."""
+    chunks = []
+
+    def default(value):
+        # Arrays and Raw fragments become placeholders in the stdlib output and are spliced in below.
+        if isinstance(value, np.ndarray):
+            chunks.append(b"[" + encode_array(value, decimals) + b"]")
+            return _PLACEHOLDER
+        if isinstance(value, Raw):
+            chunks.append(value.data)
+            return _PLACEHOLDER
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    text = json.dumps(obj, separators=(",", ":"), default=default).encode()
+    if not chunks:
+        return text
+    parts = text.split(_ENCODED_PLACEHOLDER)
+    out = [parts[0]]
+    for chunk, part in zip(chunks, parts[1:]):
+        out.append(chunk)
+        out.append(part)
+    return b"".join(out)
+
+
+class CZMLResponse(Response):
+    """JSON response for content that may hold NumPy arrays; bytes are sent without re-encoding."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
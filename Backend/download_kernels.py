@@ -1,22 +1,261 @@
 # Backend/download_kernels.py
-import requests
+"""
+Downloads the SPICE kernels listed in KERNELS and writes kernels/meta_kernel.txt.
+
+Kernels are fetched concurrently (MAX_WORKERS) over one pooled session:
+  - Data streams into <name>.part as it arrives (reads of at most
+    READ_BYTES), so a dropped connection loses nothing already received. An
+    interrupted download resumes from the part file's size with an HTTP
+    Range request. The request carries If-Range with the ETag (or
+    Last-Modified) the part was started from, so a file that changed on the
+    server is sent whole instead of being spliced onto the old part.
+  - A finished file is checked before an atomic rename to its final name.
+    Its size must match the server's total, its SHA-256 the pinned or
+    recorded checksum, and a binary kernel's DAF header must describe no
+    more data than the file holds.
+  - Kernels already present get the same checks. Git LFS pointers and
+    truncated files are detected and downloaded again.
+
+Checksums of completed downloads are recorded in kernels/manifest.json, so
+later runs can verify files that have no checksum pinned in KERNELS.
+
+Each SPK in SUBSET_KERNELS is then cut down with subset_kernels.py to the
+bodies and years the app uses; spice_kernels.py loads the subset in place of
+the full file. With --drop-full the full file is deleted once its subset is
+written, and later runs keep the subset instead of fetching the full file
+again (delete the subset to get it back). Set
+ASTROTERRA_KERNELS_URL to fetch every kernel from <url>/<name> instead, e.g.
+from fixture_server.py --kernels-dir.
+"""
+import argparse
+import hashlib
+import json
 import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 
 # --- KERNEL CONFIGURATION ---
-# This version uses a stable, hardcoded link to a general-purpose asteroid kernel.
-# This avoids the previous errors caused by changing filenames.
+# sha256/size are pinned where a trusted value is known (the files committed in kernels/, and the
+# LFS pointer committed for codes_300ast); other kernels are verified against manifest.json after
+# their first download.
 KERNELS = {
-    "naif0012.tls": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/lsk/naif0012.tls",
-    "pck00010.tpc": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/pck/pck00010.tpc",
-    "de440.bsp": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/spk/planets/de440.bsp",
-    "codes_300ast_20100725.bsp": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/spk/asteroids/codes_300ast_20100725.bsp",
+    "naif0012.tls": {
+        "url": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/lsk/naif0012.tls",
+        "sha256": "678e32bdb5a744117a467cd9601cd6b373f0e9bc9bbde1371d5eee39600a039b",
+        "size": 5257,
+    },
+    "pck00010.tpc": {
+        "url": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/pck/pck00010.tpc",
+        "sha256": "59468328349aa730d18bf1f8d7e86efe6e40b75dfb921908f99321b3a7a701d2",
+        "size": 126143,
+    },
+    "de440.bsp": {"url": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/spk/planets/de440.bsp"},
+    "codes_300ast_20100725.bsp": {
+        "url": "https://naif.jpl.nasa.gov/pub/naif/generic_kernels/spk/asteroids/codes_300ast_20100725.bsp",
+        "sha256": "7bb92faaadac29ec0b62aa96041a37c92ae24b9a5460de03d3fcaa2f63fe51f0",
+        "size": 61864960,
+    },
 }
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+KERNELS_DIR = os.path.join(BASE_DIR, "kernels")
+MANIFEST_NAME = "manifest.json"
+MIRROR_URL = os.environ.get("ASTROTERRA_KERNELS_URL")
+# Planetary SPKs replaced by their subset (subset_kernels.py) after download.
+SUBSET_KERNELS = ["de440.bsp"]
+MAX_WORKERS = 4
+CHUNK_BYTES = 1024 * 1024  # Checksum block size
+READ_BYTES = 64 * 1024  # Largest network read; each read returns what has arrived
+MAX_ATTEMPTS = 5
+TIMEOUT = (10, 60)  # Connect, read (seconds)
+
+LFS_POINTER_PREFIX = b"version https://git-lfs"
+DAF_RECORD_BYTES = 1024
+
+_manifest_lock = threading.Lock()
+
+
+class KernelError(Exception):
+    """A kernel file failed verification or could not be downloaded."""
+
+
+def kernel_url(filename):
+    return f"{MIRROR_URL.rstrip('/')}/{filename}" if MIRROR_URL else KERNELS[filename]["url"]
+
+
+def load_manifest(kernels_dir=KERNELS_DIR):
+    path = os.path.join(kernels_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _record(kernels_dir, filename, sha256, size):
+    path = os.path.join(kernels_dir, MANIFEST_NAME)
+    with _manifest_lock:
+        manifest = load_manifest(kernels_dir)
+        manifest[filename] = {"sha256": sha256, "size": size, "url": kernel_url(filename), "downloaded": time.time()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_structure(path):
+    """
+    Raises KernelError for a Git LFS pointer or a truncated binary (DAF) kernel.
+    A DAF file record stores the first free address (in 8-byte words); a complete file reaches it.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(DAF_RECORD_BYTES)
+    if head.startswith(LFS_POINTER_PREFIX):
+        raise KernelError("file is a Git LFS pointer, not kernel data")
+    if not head.startswith(b"DAF/") and not head.startswith(b"NAIF/DAF"):
+        return  # Text kernel
+    if len(head) < DAF_RECORD_BYTES:
+        raise KernelError("truncated DAF file record")
+    endian = "<" if head[88:96] == b"LTL-IEEE" else ">"
+    _, _, _, _, _, free = struct.unpack(endian + "ii60siii", head[8:88])  # ND, NI, name, FWARD, BWARD, FREE
+    if size < (free - 1) * 8:
+        raise KernelError(f"truncated: {size} bytes, DAF data runs to {(free - 1) * 8}")
+
+
+def verify(path, filename, manifest=None, expected_size=None):
+    """Checks structure, size and checksum of a kernel file; returns its SHA-256 or raises KernelError."""
+    check_structure(path)
+    pinned = KERNELS[filename]
+    recorded = (manifest or {}).get(filename, {})
+    size = os.path.getsize(path)
+    for expected in (expected_size, pinned.get("size"), recorded.get("size")):
+        if expected is not None and size != expected:
+            raise KernelError(f"size {size} does not match the expected {expected}")
+    sha256 = file_sha256(path)
+    expected_sha = pinned.get("sha256") or recorded.get("sha256")
+    if expected_sha and sha256 != expected_sha:
+        raise KernelError(f"SHA-256 {sha256} does not match the expected {expected_sha}")
+    return sha256
+
+
+def _session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _total_size(response, offset):
+    """Full file size from a 200 or 206 response, or None if the server does not say."""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    length = response.headers.get("Content-Length")
+    if length is None:
+        return None
+    return int(length) + (offset if response.status_code == 206 else 0)
+
+
+def _validator(response):
+    """The value for If-Range: a strong ETag, else Last-Modified, else None."""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def download(session, filename, kernels_dir=KERNELS_DIR):
+    """
+    Downloads one kernel into <name>.part (resuming a previous part), verifies it and renames
+    it into place. Interrupted transfers resume; raises KernelError after MAX_ATTEMPTS attempts in
+    a row that make no progress, on a 4xx response, or if the finished file fails verification.
+    """
+    path = os.path.join(kernels_dir, filename)
+    part_path = path + ".part"
+    validator_path = part_path + ".validator"  # ETag/Last-Modified of the response the part came from
+    url = kernel_url(filename)
+    failures = 0
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if os.path.exists(validator_path):
+                with open(validator_path, "r") as f:
+                    headers["If-Range"] = f.read()
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code == 416:
+                    # The part already holds the whole file.
+                    total = offset
+                else:
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        offset = 0  # Server ignored the Range header or the file changed (If-Range): start over
+                    total = _total_size(response, offset)
+                    if not offset:
+                        validator = _validator(response)
+                        if validator is not None:
+                            with open(validator_path, "w") as f:
+                                f.write(validator)
+                        elif os.path.exists(validator_path):
+                            os.remove(validator_path)
+                    with open(part_path, "ab" if offset else "wb") as f:
+                        try:
+                            # read1 hands over whatever has arrived, so a connection cut mid-read
+                            # leaves every received byte in the part file.
+                            for chunk in iter(lambda: response.raw.read1(READ_BYTES, decode_content=True), b""):
+                                f.write(chunk)
+                        finally:
+                            f.flush()
+                            os.fsync(f.fileno())
+            size = os.path.getsize(part_path)
+            if total is not None and size < total:
+                raise requests.ConnectionError(f"connection closed at {size} of {total} bytes")
+            try:
+                sha256 = verify(part_path, filename, expected_size=total)
+            except KernelError:
+                os.remove(part_path)  # Complete but wrong: resuming it cannot help
+                if os.path.exists(validator_path):
+                    os.remove(validator_path)
+                raise
+            os.replace(part_path, path)
+            if os.path.exists(validator_path):
+                os.remove(validator_path)
+            _record(kernels_dir, filename, sha256, size)
+            return size
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code < 500:
+                raise KernelError(str(e))
+            # Only attempts that added nothing to the part file count towards giving up.
+            grew = os.path.exists(part_path) and os.path.getsize(part_path) > offset
+            failures = 0 if grew else failures + 1
+            if failures >= MAX_ATTEMPTS:
+                raise KernelError(f"download failed after {failures} attempts without progress: {e}")
+            wait = min(2 ** failures, 30) if failures else 0.5
+            print(f" -> '{filename}': {e}; resuming in {wait} s")
+            time.sleep(wait)
+
 
 def create_meta_kernel(kernel_list, base_dir):
     """Creates the meta_kernel.txt file with the correct relative paths."""
     meta_kernel_path = os.path.join(base_dir, 'kernels', 'meta_kernel.txt')
     print(f" -> Creating/updating meta-kernel file: {meta_kernel_path}")
-    
+
     with open(meta_kernel_path, 'w') as f:
         f.write('\\begindata\n')
         f.write('    KERNELS_TO_LOAD = (\n')
@@ -27,43 +266,96 @@ def create_meta_kernel(kernel_list, base_dir):
         f.write('\\beginintext\n')
     print(" -> Meta-kernel is ready.")
 
-def download_kernels():
-    """Checks for and downloads required SPICE kernels if they are missing."""
-    base_dir = os.path.dirname(__file__)
-    kernels_dir = os.path.join(base_dir, 'kernels')
-    os.makedirs(kernels_dir, exist_ok=True)
-    print(f"--- Ensuring kernels are present in '{kernels_dir}' ---")
 
-    downloaded_files = []
-    all_files_present = True
+def _ensure(session, filename, manifest, kernels_dir):
+    path = os.path.join(kernels_dir, filename)
+    if os.path.exists(path):
+        try:
+            verify(path, filename, manifest)
+            print(f" -> Found '{filename}' already present and verified.")
+            return True
+        except KernelError as e:
+            print(f" -> '{filename}' is present but invalid ({e}); downloading it again.")
+    print(f"Downloading '{filename}'...")
+    start = time.perf_counter()
+    try:
+        size = download(session, filename, kernels_dir)
+    except KernelError as e:
+        print(f" -> FATAL ERROR downloading '{filename}': {e}")
+        return False
+    seconds = time.perf_counter() - start
+    print(f" -> Success: '{filename}' downloaded and verified ({size / 1e6:.1f} MB in {seconds:.1f} s).")
+    return True
 
-    for filename, url in KERNELS.items():
-        filepath = os.path.join(kernels_dir, filename)
-        if not os.path.exists(filepath):
-            print(f"Downloading '{filename}'...")
+
+def _subset_only(filename, kernels_dir):
+    """True for a SUBSET_KERNELS file that was dropped after its subset was written (--drop-full)."""
+    import spice_kernels
+
+    path = os.path.join(kernels_dir, filename)
+    return filename in SUBSET_KERNELS and not os.path.exists(path) and os.path.exists(spice_kernels.subset_path(path))
+
+
+def build_subsets(kernels_dir=KERNELS_DIR, drop_full=False):
+    """
+    Writes the subset of every SUBSET_KERNELS file that has none or an older one, and with
+    `drop_full` deletes the full file once its subset exists. Returns False if a subset failed.
+    """
+    import spice_kernels
+    import subset_kernels
+
+    ok = True
+    for filename in SUBSET_KERNELS:
+        path = os.path.join(kernels_dir, filename)
+        subset = spice_kernels.subset_path(path)
+        if not os.path.exists(path):
+            continue
+        if not os.path.exists(subset) or os.path.getmtime(subset) < os.path.getmtime(path):
             try:
-                response = requests.get(url, stream=True, timeout=30)
-                response.raise_for_status()
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                print(f" -> Success: '{filename}' downloaded.")
-                downloaded_files.append(filename)
-            except requests.RequestException as e:
-                print(f" -> FATAL ERROR downloading '{filename}'. Cannot proceed. Error: {e}")
-                if os.path.exists(filepath): os.remove(filepath)
-                all_files_present = False
-                break # Stop if any file fails to download
+                subset_kernels.subset_spk(source=path, output=subset, leapseconds=os.path.join(kernels_dir, "naif0012.tls"))
+            except Exception as e:  # SpiceyError, or ValueError if the subset does not match
+                print(f" -> FATAL ERROR subsetting '{filename}': {e}")
+                ok = False
+                continue
         else:
-            print(f" -> Found '{filename}' already present.")
-            downloaded_files.append(filename)
-    
+            print(f" -> Found the subset of '{filename}' up to date.")
+        if drop_full:
+            os.remove(path)
+            print(f" -> Deleted '{filename}'; {os.path.basename(subset)} is loaded in its place.")
+    return ok
+
+
+def download_kernels(kernels_dir=KERNELS_DIR, workers=MAX_WORKERS, subset=True, drop_full=False):
+    """
+    Checks for and downloads required SPICE kernels if they are missing or invalid, then
+    writes the subsets of SUBSET_KERNELS (see build_subsets).
+    """
+    os.makedirs(kernels_dir, exist_ok=True)
+    print(f"--- Ensuring kernels are present in '{kernels_dir}' ---")
+    manifest = load_manifest(kernels_dir)
+    session = _session()
+    names = [name for name in KERNELS if not (subset and _subset_only(name, kernels_dir))]
+    for name in sorted(set(KERNELS) - set(names)):
+        print(f" -> '{name}' was dropped after subsetting; keeping its subset.")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(names, pool.map(lambda name: _ensure(session, name, manifest, kernels_dir), names)))
+    if subset and all(results.values()):
+        results["subsets"] = build_subsets(kernels_dir, drop_full)
+
     print("-" * 20)
-    if all_files_present and len(downloaded_files) == len(KERNELS):
-        create_meta_kernel(downloaded_files, base_dir)
+    if all(results.values()):
+        create_meta_kernel(list(KERNELS), os.path.dirname(kernels_dir))
         print("\n--- KERNEL SETUP COMPLETE. All files are ready. ---")
-    else:
-        print("\n--- KERNEL SETUP FAILED. Not all files were secured. ---")
+        return True
+    failed = [name for name, ok in results.items() if not ok]
+    print(f"\n--- KERNEL SETUP FAILED. Not secured: {', '.join(failed)}. Rerun to resume. ---")
+    return False
+
 
 if __name__ == "__main__":
-    download_kernels()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download and verify the SPICE kernels.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--no-subset", action="store_true", help="Keep only the full kernels (no subset_kernels.py run)")
+    parser.add_argument("--drop-full", action="store_true", help="Delete each full SPK once its subset is written")
+    args = parser.parse_args()
+    download_kernels(workers=args.workers, subset=not args.no_subset, drop_full=args.drop_full)
@@ -0,0 +1,295 @@
+# In Backend/encounter.py
+"""
+B-plane encounter analysis and impact corridor for the Phase 1 impactor.
+
+For a geocentric state (or a batch of clone states), the approach is treated
+as a two-body hyperbola about the Earth. The b-plane is the plane through the
+geocentre normal to the incoming asymptote. Its coordinates (xi, zeta) follow
+Öpik/Valsecchi: zeta is opposite to the projection of the Earth's
+heliocentric velocity, and xi completes the right-handed set. A clone hits
+when its impact parameter is below the gravitationally focused Earth radius.
+
+For impacting clones, the point where the hyperbola meets the Earth's surface
+is rotated into the Earth-fixed frame. The rotation comes from the IAU
+pole/prime-meridian model in pck00010.tpc, with its constants read via
+bodvrd. It is evaluated for every clone at once, so thousands of clones take
+one vectorized pass. Binning the impact points along the corridor's long
+axis gives the risk corridor polyline.
+"""
+import numpy as np
+import spiceypy as spice
+
+import spice_kernels
+
+# --- Configuration ---
+MU_EARTH_M3_S2 = 3.986004418e14
+APPROACH_DISTANCE_M = 3.0e8  # Two-body hand-off distance from the geocentre; see approach_time()
+CORRIDOR_BINS = 40
+MAX_CLONES = 20000
+IMPACT_CLONES = 2000  # Clones behind the impact probability (the session's and /simulation/encounter's default)
+
+
+def earth_constants():
+    """Pole, prime meridian (deg, deg/century, deg/day) and mean radius (m) of the Earth from the loaded PCK."""
+    spice_kernels.ensure_kernels_loaded()
+    radii_km = spice.bodvrd("EARTH", "RADII", 3)[1]
+    return {
+        "pole_ra": np.array(spice.bodvrd("EARTH", "POLE_RA", 3)[1]),
+        "pole_dec": np.array(spice.bodvrd("EARTH", "POLE_DEC", 3)[1]),
+        "pm": np.array(spice.bodvrd("EARTH", "PM", 3)[1]),
+        "radius_m": float(np.mean(radii_km)) * 1000.0,
+    }
+
+
+def earth_fixed_rotation(et, constants):
+    """(N, 3, 3) J2000 -> Earth-fixed rotation matrices for ET(s), as pxform('J2000', 'IAU_EARTH', et)."""
+    et = np.atleast_1d(np.asarray(et, dtype=np.float64))
+    d = et / 86400.0
+    t = d / 36525.0
+    alpha = np.radians(constants["pole_ra"][0] + constants["pole_ra"][1] * t + constants["pole_ra"][2] * t**2)
+    delta = np.radians(constants["pole_dec"][0] + constants["pole_dec"][1] * t + constants["pole_dec"][2] * t**2)
+    w = np.radians(constants["pm"][0] + constants["pm"][1] * d + constants["pm"][2] * d**2)
+
+    def rot(angle, axis):
+        c, s = np.cos(angle), np.sin(angle)
+        m = np.zeros(angle.shape + (3, 3))
+        i, j = [(1, 2), (2, 0), (0, 1)][axis]
+        m[:, axis, axis] = 1.0
+        m[:, i, i] = c
+        m[:, j, j] = c
+        m[:, i, j] = s
+        m[:, j, i] = -s
+        return m
+
+    # R3(W) R1(pi/2 - dec) R3(pi/2 + ra), the IAU body-fixed convention used by SPICE.
+    return rot(w, 2) @ rot(np.pi / 2 - delta, 0) @ rot(np.pi / 2 + alpha, 2)
+
+
+def _unit(v):
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def b_plane(r, v, earth_velocity, earth_radius_m, mu=MU_EARTH_M3_S2):
+    """
+    B-plane analysis of geocentric states r, v ((3,) or (N, 3), m and m/s).
+    `earth_velocity` is the Earth's heliocentric velocity (any units), which fixes the zeta axis;
+    with None, xi and zeta are NaN (the hit test does not depend on them).
+    Returns a dict of arrays: xi, zeta, b (m), b_earth (focused Earth radius, m), v_inf (m/s), hit,
+    plus the conic elements used by `impact_points`.
+    """
+    r = np.atleast_2d(np.asarray(r, dtype=np.float64))
+    v = np.atleast_2d(np.asarray(v, dtype=np.float64))
+    rn = np.linalg.norm(r, axis=1)
+    vn2 = np.einsum("ij,ij->i", v, v)
+    h = np.cross(r, v)
+    hn = np.linalg.norm(h, axis=1)
+    e_vec = ((vn2 - mu / rn)[:, None] * r - np.einsum("ij,ij->i", r, v)[:, None] * v) / mu
+    e = np.linalg.norm(e_vec, axis=1)
+    energy = 0.5 * vn2 - mu / rn
+    v_inf = np.sqrt(np.maximum(2.0 * energy, 0.0))
+
+    e_hat = e_vec / e[:, None]
+    h_hat = h / hn[:, None]
+    p_hat = np.cross(h_hat, e_hat)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Incoming asymptote direction (geocentric velocity far from the Earth).
+        s_hat = e_hat / e[:, None] + np.sqrt(np.maximum(1.0 - 1.0 / e**2, 0.0))[:, None] * p_hat
+        b = hn / v_inf
+        b_vec = b[:, None] * np.cross(s_hat, h_hat)
+
+        # Öpik frame: eta along S, zeta opposite to the Earth's velocity projected on the b-plane.
+        earth_v = np.full(3, np.nan) if earth_velocity is None else np.asarray(earth_velocity, dtype=np.float64)
+        zeta_hat = _unit(-(earth_v - np.einsum("ij,j->i", s_hat, earth_v)[:, None] * s_hat))
+        xi_hat = np.cross(zeta_hat, s_hat)
+        b_earth = earth_radius_m * np.sqrt(1.0 + 2.0 * mu / (earth_radius_m * v_inf**2))
+    return {
+        "xi": np.einsum("ij,ij->i", b_vec, xi_hat),
+        "zeta": np.einsum("ij,ij->i", b_vec, zeta_hat),
+        "b": b,
+        "b_earth": b_earth,
+        "v_inf": v_inf,
+        "hit": (e > 1.0) & (b < b_earth),
+        "e": e, "p": hn**2 / mu, "e_hat": e_hat, "p_hat": p_hat, "r": rn, "r_dot_v": np.einsum("ij,ij->i", r, v),
+    }
+
+
+def surface_crossing(bp, earth_radius_m, mu=MU_EARTH_M3_S2):
+    """
+    Where each conic in `bp` (from `b_plane`) meets the surface on its incoming branch.
+    Returns (mask of clones that reach the surface, true anomaly there, time to get there from bp's states s).
+    """
+    e, p = bp["e"], bp["p"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_nu = (p / earth_radius_m - 1.0) / e
+        nu_imp = -np.arccos(np.clip(cos_nu, -1.0, 1.0))  # Incoming branch
+        cos_nu0 = np.clip((p / bp["r"] - 1.0) / e, -1.0, 1.0)
+        nu0 = np.where(bp["r_dot_v"] < 0, -np.arccos(cos_nu0), np.arccos(cos_nu0))
+        a = p / (1.0 - e**2)  # Negative for hyperbolas
+
+        def mean_anomaly(nu):
+            f = 2.0 * np.arctanh(np.sqrt((e - 1.0) / (e + 1.0)) * np.tan(nu / 2.0))
+            return e * np.sinh(f) - f
+
+        dt = (mean_anomaly(nu_imp) - mean_anomaly(nu0)) / np.sqrt(mu / (-a) ** 3)
+    reaches = bp["hit"] & (np.abs(cos_nu) <= 1.0) & (nu0 <= nu_imp)
+    return reaches, nu_imp, dt
+
+
+def impact_points(bp, et0, earth_radius_m, constants, mu=MU_EARTH_M3_S2):
+    """
+    Surface crossing of every impacting conic in `bp` (from `b_plane` at ET(s) et0).
+    Returns (mask of clones that reach the surface, lat deg, lon deg, impact ET); lat/lon are planetocentric.
+    """
+    reaches, nu_imp, dt = surface_crossing(bp, earth_radius_m, mu)
+    position = earth_radius_m * (np.cos(nu_imp)[:, None] * bp["e_hat"] + np.sin(nu_imp)[:, None] * bp["p_hat"])
+    et_imp = et0 + np.where(reaches, dt, 0.0)
+    fixed = np.einsum("nij,nj->ni", earth_fixed_rotation(et_imp, constants), position)
+    lat = np.degrees(np.arcsin(np.clip(fixed[:, 2] / earth_radius_m, -1.0, 1.0)))
+    lon = np.degrees(np.arctan2(fixed[:, 1], fixed[:, 0]))
+    return reaches, lat, lon, et_imp
+
+
+def approach_time(estimate, t_impact, distance_m=APPROACH_DISTANCE_M):
+    """Time (s since the trajectory epoch) at which the fitted trajectory is `distance_m` from the geocentre."""
+    import orbit_determination as od
+
+    t = np.linspace(0.0, t_impact, 4096)
+    distance = np.linalg.norm(od.model_positions(estimate, t), axis=1)
+    k = int(np.argmax(distance < distance_m))
+    return float(t[max(k, 1) - 1]) if distance[-1] < distance_m else float(t_impact)
+
+
+def clone_parameters(estimate, covariance, n, seed=0):
+    """Trajectory parameters of the nominal orbit (row 0) and n clones drawn from the OD covariance."""
+    # The covariance mixes metres and m/s^2 and is nearly singular once the orbit is well observed:
+    # factor it in sigma units, with round-off negative eigenvalues clipped.
+    scale = np.sqrt(np.diag(covariance))
+    scale = np.where(scale > 0, scale, 1.0)
+    values, vectors = np.linalg.eigh(covariance / np.outer(scale, scale))
+    factor = vectors * np.sqrt(np.clip(values, 0.0, None))
+    z = np.random.default_rng(seed).standard_normal((n, len(estimate)))
+    return np.vstack([estimate, estimate + (z @ factor.T) * scale])
+
+
+def clone_states(params, t0, distance_m=APPROACH_DISTANCE_M):
+    """
+    Position/velocity of every clone where its own path is about `distance_m` from the geocentre.
+    Clones spread along the track, so a common epoch would catch some already past the Earth:
+    each clone is moved from t0 to its straight-line closest approach, then back by distance/speed.
+    Returns (r, v, t) with per-clone times.
+    """
+    def state(t):
+        return (params[:, 0:3] + params[:, 3:6] * t[:, None] + 0.5 * params[:, 6:9] * t[:, None] ** 2,
+                params[:, 3:6] + params[:, 6:9] * t[:, None])
+
+    t = np.full(len(params), float(t0))
+    r, v = state(t)
+    speed2 = np.einsum("ij,ij->i", v, v)
+    t = t - np.einsum("ij,ij->i", r, v) / speed2 - distance_m / np.sqrt(speed2)
+    r, v = state(t)
+    return r, v, t
+
+
+def corridor_polyline(lat, lon, bins=CORRIDOR_BINS):
+    """
+    Risk corridor through impact points: the points are binned along their principal axis (on the unit
+    sphere) and each bin's mean is a vertex. Returns (lon, lat) arrays of the polyline in degrees.
+    """
+    if lat.size < 2:
+        return lon, lat
+    la, lo = np.radians(lat), np.radians(lon)
+    xyz = np.column_stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)])
+    centred = xyz - xyz.mean(axis=0)
+    axis = np.linalg.svd(centred, full_matrices=False)[2][0]
+    coord = centred @ axis
+    edges = np.linspace(coord.min(), coord.max(), bins + 1)
+    which = np.clip(np.searchsorted(edges, coord, side="right") - 1, 0, bins - 1)
+    counts = np.bincount(which, minlength=bins)
+    sums = np.stack([np.bincount(which, weights=xyz[:, k], minlength=bins) for k in range(3)], axis=1)
+    vertices = _unit(sums[counts > 0])
+    return np.degrees(np.arctan2(vertices[:, 1], vertices[:, 0])), np.degrees(np.arcsin(vertices[:, 2]))
+
+
+def corridor_czml(lat, lon, nominal=None, impact_fraction=None):
+    """CZML packets (document, corridor polyline, nominal impact point) for the impacting clones."""
+    corridor_lon, corridor_lat = corridor_polyline(lat, lon)
+    czml = [{"id": "document", "name": "Impact Risk Corridor", "version": "1.0"}]
+    if corridor_lon.size >= 2:
+        czml.append({
+            "id": "impact_corridor",
+            "name": "Impact Risk Corridor",
+            "polyline": {
+                "positions": {
+                    "cartographicDegrees": np.column_stack([corridor_lon, corridor_lat, np.zeros(corridor_lon.size)])
+                },
+                "width": 6,
+                "clampToGround": True,
+                "material": {"solidColor": {"color": {"rgba": [255, 40, 40, 200]}}},
+            },
+            "properties": {"impact_fraction": impact_fraction, "n_impacts": int(lat.size)},
+        })
+    if nominal is not None:
+        czml.append({
+            "id": "impact_point_nominal",
+            "name": "Nominal Impact Point",
+            "position": {"cartographicDegrees": [nominal[1], nominal[0], 0.0]},
+            "point": {"pixelSize": 10, "color": {"rgba": [255, 255, 0, 255]}},
+        })
+    return czml
+
+
+def impact_probability(estimate, covariance, t_impact, n_clones=IMPACT_CLONES, seed=0):
+    """
+    Fraction of `n_clones` clones of an OD solution that reach the Earth's surface. This is the
+    impact_fraction of `analyze` for the same seed, without the Öpik frame and impact locations.
+    """
+    estimate = np.asarray(estimate, dtype=np.float64)
+    radius_m = earth_constants()["radius_m"]
+    params = clone_parameters(estimate, np.asarray(covariance, dtype=np.float64), n_clones, seed)
+    r, v, _ = clone_states(params, approach_time(estimate, t_impact))
+    reaches, _, _ = surface_crossing(b_plane(r, v, None, radius_m), radius_m)
+    return float(reaches[1:].mean())
+
+
+def analyze(estimate, covariance, epoch_utc, t_impact, n_clones=IMPACT_CLONES, seed=0, earth_velocity=None):
+    """
+    Full encounter analysis for an OD solution (see orbit_determination.py), whose times count from
+    `epoch_utc`: b-plane of the nominal orbit and of `n_clones` clones, impact fraction, impact
+    locations and the corridor CZML.
+    """
+    import ephemeris_cache
+
+    estimate = np.asarray(estimate, dtype=np.float64)
+    covariance = np.asarray(covariance, dtype=np.float64)
+    constants = earth_constants()
+    epoch_et = spice.str2et(epoch_utc.replace("+00:00", ""))
+    t0 = approach_time(estimate, t_impact)
+    et0 = epoch_et + t0
+    if earth_velocity is None:
+        earth_velocity = ephemeris_cache.lookup_state(399, et0, ref="J2000", obs=10)[3:6]
+
+    params = clone_parameters(estimate, covariance, n_clones, seed)
+    r, v, t = clone_states(params, t0)
+    bp = b_plane(r, v, earth_velocity, constants["radius_m"])
+    reaches, lat, lon, et_imp = impact_points(bp, epoch_et + t, constants["radius_m"], constants)
+    clones = slice(1, None)
+    hits = reaches[clones]
+    nominal_hit = (float(lat[0]), float(lon[0])) if reaches[0] else None
+    return {
+        "approach_et": et0,
+        "nominal": {
+            "xi_m": float(bp["xi"][0]), "zeta_m": float(bp["zeta"][0]), "b_m": float(bp["b"][0]),
+            "b_earth_m": float(bp["b_earth"][0]), "v_inf_m_s": float(bp["v_inf"][0]),
+            "impact": None if nominal_hit is None else {
+                "lat_deg": nominal_hit[0], "lon_deg": nominal_hit[1],
+                "utc": spice.et2utc(float(et_imp[0]), "ISOC", 0),
+            },
+        },
+        "clones": {
+            "n": int(n_clones),
+            "impact_fraction": float(hits.mean()) if n_clones else None,
+            "xi_sigma_m": float(np.nanstd(bp["xi"][clones])) if n_clones else None,
+            "zeta_sigma_m": float(np.nanstd(bp["zeta"][clones])) if n_clones else None,
+        },
+        "czml": corridor_czml(lat[clones][hits], lon[clones][hits], nominal_hit, float(hits.mean()) if n_clones else None),
+    }
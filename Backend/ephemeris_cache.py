@@ -0,0 +1,203 @@
+# In Backend/ephemeris_cache.py
+"""
+In-process ephemeris cache: Chebyshev fits of the major bodies' SSB states.
+
+`python ephemeris_cache.py` samples SPICE once over a configured window and
+fits fixed-length Chebyshev segments per body (the same representation the
+DE kernels use). The coefficients are saved as .npy files under
+data/ephemeris_cache/ and memory-mapped at runtime, so any thread or process
+can evaluate `state(body, et_array)` with pure NumPy - no SPICE calls and no
+SPICE lock. The build step verifies the fit against SPICE at off-node times
+and records the worst position error in the index.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "ephemeris_cache")
+INDEX_PATH = os.path.join(CACHE_DIR, "index.json")
+
+WINDOW_START_UTC = os.environ.get("ASTROTERRA_EPHEMERIS_START", "2020-01-01T00:00:00")
+WINDOW_END_UTC = os.environ.get("ASTROTERRA_EPHEMERIS_END", "2040-01-01T00:00:00")
+DEGREE = 15
+
+# NAIF ID -> segment length in days. Fast movers (Earth, Moon, Mercury) need short segments.
+BODY_SEGMENT_DAYS = {
+    10: 32,    # Sun
+    1: 8,      # Mercury barycenter
+    2: 16,     # Venus barycenter
+    3: 16,     # Earth-Moon barycenter
+    399: 4,    # Earth
+    301: 4,    # Moon
+    4: 16,     # Mars barycenter
+    5: 32,     # Jupiter barycenter
+    6: 32,     # Saturn barycenter
+    7: 32,     # Uranus barycenter
+    8: 32,     # Neptune barycenter
+}
+
+# J2000 -> ECLIPJ2000 is a fixed rotation about X by the J2000 obliquity (84381.448 arcsec).
+_OBLIQUITY = np.radians(84381.448 / 3600.0)
+J2000_TO_ECLIPJ2000 = np.array([
+    [1.0, 0.0, 0.0],
+    [0.0, np.cos(_OBLIQUITY), np.sin(_OBLIQUITY)],
+    [0.0, -np.sin(_OBLIQUITY), np.cos(_OBLIQUITY)],
+])
+
+
+def _chebyshev_basis(x, degree):
+    """Returns T_k(x) and dT_k/dx for k = 0..degree, each of shape (len(x), degree + 1)."""
+    n = len(x)
+    t = np.empty((n, degree + 1))
+    u = np.empty((n, degree + 1))  # Chebyshev polynomials of the second kind
+    t[:, 0] = 1.0
+    u[:, 0] = 1.0
+    if degree >= 1:
+        t[:, 1] = x
+        u[:, 1] = 2.0 * x
+    for k in range(2, degree + 1):
+        t[:, k] = 2.0 * x * t[:, k - 1] - t[:, k - 2]
+        u[:, k] = 2.0 * x * u[:, k - 1] - u[:, k - 2]
+    dt = np.zeros((n, degree + 1))
+    dt[:, 1:] = np.arange(1, degree + 1) * u[:, :-1]  # T_k' = k * U_{k-1}
+    return t, dt
+
+
+class EphemerisCache:
+    """Memory-mapped Chebyshev coefficients for the bodies in BODY_SEGMENT_DAYS."""
+
+    def __init__(self, index, coefficients):
+        self.index = index
+        self.coefficients = coefficients
+        self.start_et = index["start_et"]
+        self.end_et = index["end_et"]
+
+    @classmethod
+    def load(cls, cache_dir=CACHE_DIR):
+        with open(os.path.join(cache_dir, "index.json"), "r") as f:
+            index = json.load(f)
+        coefficients = {
+            int(body): np.load(os.path.join(cache_dir, f"{body}.npy"), mmap_mode="r") for body in index["bodies"]
+        }
+        return cls(index, coefficients)
+
+    def covers(self, body, et):
+        et = np.asarray(et)
+        return int(body) in self.coefficients and bool(np.all((et >= self.start_et) & (et <= self.end_et)))
+
+    def _ssb_state(self, body, et):
+        meta = self.index["bodies"][str(body)]
+        coeffs = self.coefficients[body]
+        length = meta["segment_seconds"]
+        seg = np.clip(((et - self.start_et) // length).astype(np.int64), 0, coeffs.shape[0] - 1)
+        x = 2.0 * (et - (self.start_et + seg * length)) / length - 1.0
+        t, dt = _chebyshev_basis(x, coeffs.shape[1] - 1)
+        c = coeffs[seg]  # (N, degree + 1, 3)
+        pos = np.einsum("nk,nkj->nj", t, c)
+        vel = np.einsum("nk,nkj->nj", dt, c) * (2.0 / length)
+        return np.hstack([pos, vel])
+
+    def state(self, body, et, frame="J2000", observer=0):
+        """
+        Returns the state (km, km/s) of `body` relative to `observer` for a scalar or array of ETs.
+        Output shape is (6,) for a scalar ET and (N, 6) for an array.
+        """
+        scalar = np.ndim(et) == 0
+        et = np.atleast_1d(np.asarray(et, dtype=np.float64))
+        result = self._ssb_state(int(body), et)
+        if int(observer) != 0:
+            result = result - self._ssb_state(int(observer), et)
+        if frame == "ECLIPJ2000":
+            result = np.hstack([result[:, :3] @ J2000_TO_ECLIPJ2000.T, result[:, 3:] @ J2000_TO_ECLIPJ2000.T])
+        elif frame != "J2000":
+            raise ValueError(f"Unsupported frame '{frame}'. Use 'J2000' or 'ECLIPJ2000'.")
+        return result[0] if scalar else result
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the shared EphemerisCache, loading it on first use, or None if it was never built."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EphemerisCache.load() if os.path.exists(INDEX_PATH) else False
+            if _cache:
+                print(f"--- Ephemeris cache loaded: {len(_cache.coefficients)} bodies ---")
+    return _cache or None
+
+
+def lookup_state(targ, et, ref="J2000", obs=0):
+    """
+    Drop-in replacement for the state part of spice.spkgeo: serves from the Chebyshev cache
+    when it covers the bodies and times, and falls back to SPICE otherwise.
+    """
+    cache = get_cache()
+    if cache is not None and cache.covers(targ, et) and (int(obs) == 0 or cache.covers(obs, et)):
+        return cache.state(targ, et, frame=ref, observer=obs)
+
+    import spiceypy as spice
+    if np.ndim(et) == 0:
+        return np.array(spice.spkgeo(targ=int(targ), et=float(et), ref=ref, obs=int(obs))[0])
+    return np.array([spice.spkgeo(targ=int(targ), et=float(t), ref=ref, obs=int(obs))[0] for t in et])
+
+
+# --- Cache construction (requires SPICE kernels) ---
+def _fit_body(spice, body, start_et, n_segments, segment_seconds, degree):
+    """Least-squares Chebyshev fit of SPICE positions on 2 * (degree + 1) Chebyshev nodes per segment."""
+    n_nodes = 2 * (degree + 1)
+    nodes = np.cos(np.pi * (np.arange(n_nodes) + 0.5) / n_nodes)
+    basis, _ = _chebyshev_basis(nodes, degree)
+    pinv = np.linalg.pinv(basis)
+    coeffs = np.empty((n_segments, degree + 1, 3))
+    for seg in range(n_segments):
+        seg_start = start_et + seg * segment_seconds
+        ets = seg_start + (nodes + 1.0) * 0.5 * segment_seconds
+        positions = np.array([spice.spkgeo(targ=body, et=t, ref="J2000", obs=0)[0][:3] for t in ets])
+        coeffs[seg] = pinv @ positions
+    return coeffs
+
+
+def build_ephemeris_cache(start_utc=WINDOW_START_UTC, end_utc=WINDOW_END_UTC, degree=DEGREE, n_checks=2000):
+    import spiceypy as spice
+
+    print(f"--- Building ephemeris cache {start_utc} -> {end_utc} (degree {degree}) ---")
+    start_et = spice.str2et(start_utc)
+    end_et = spice.str2et(end_utc)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    index = {"start_utc": start_utc, "end_utc": end_utc, "start_et": start_et, "end_et": end_et,
+             "degree": degree, "frame": "J2000", "observer": 0, "bodies": {}}
+    rng = np.random.default_rng(0)
+    for body, segment_days in BODY_SEGMENT_DAYS.items():
+        segment_seconds = segment_days * 86400.0
+        n_segments = int(np.ceil((end_et - start_et) / segment_seconds))
+        coeffs = _fit_body(spice, body, start_et, n_segments, segment_seconds, degree)
+        np.save(os.path.join(CACHE_DIR, f"{body}.npy"), coeffs)
+
+        # Verify against SPICE at random (off-node) times.
+        index["bodies"][str(body)] = {"segment_seconds": segment_seconds, "n_segments": n_segments}
+        cache = EphemerisCache(index, {body: coeffs})
+        check_ets = rng.uniform(start_et, end_et, n_checks)
+        fitted = cache.state(body, check_ets)
+        truth = np.array([spice.spkgeo(targ=body, et=t, ref="J2000", obs=0)[0] for t in check_ets])
+        pos_err_m = float(np.max(np.linalg.norm(fitted[:, :3] - truth[:, :3], axis=1)) * 1000)
+        vel_err_mms = float(np.max(np.linalg.norm(fitted[:, 3:] - truth[:, 3:], axis=1)) * 1e6)
+        index["bodies"][str(body)].update(max_position_error_m=pos_err_m, max_velocity_error_mm_s=vel_err_mms)
+        print(f" -> {body:>4}: {n_segments} segments, max error {pos_err_m:.4f} m, {vel_err_mms:.4f} mm/s")
+
+    with open(INDEX_PATH, "w") as f:
+        json.dump(index, f, indent=2)
+    print(f"--- Ephemeris cache saved to {CACHE_DIR} ---")
+
+
+if __name__ == "__main__":
+    import spice_kernels
+    spice_kernels.ensure_kernels_loaded()
+    build_ephemeris_cache()
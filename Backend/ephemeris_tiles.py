@@ -0,0 +1,185 @@
+# In Backend/ephemeris_tiles.py
+"""
+Tile store of planet and Moon tracks for CZML, valid for any date in its span.
+
+precompute_ephemeris_tiles.py samples each body's SSB position (J2000, m)
+on a UTC grid, in fixed 30-day tiles covering several decades:
+
+  data/ephemeris_tiles/<body>.npy  float64 [tile, sample, xyz]
+  data/ephemeris_tiles/index.json  tile origin/length and per-body sample step
+
+Tile k covers [origin + k * TILE_SECONDS, origin + (k + 1) * TILE_SECONDS].
+Each tile includes both end points, so tiles can be assembled independently.
+The time axis is UTC (POSIX seconds), so serving a track needs no SPICE call.
+`tracks_czml()` slices only the tiles that overlap the requested interval.
+It returns packets shaped like the ones precompute_planets.py and
+precompute_moon.py wrote, with the samples kept as arrays for czml_encoder.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+TILES_DIR = os.path.join(PROJECT_ROOT, "data", "ephemeris_tiles")
+INDEX_PATH = os.path.join(TILES_DIR, "index.json")
+
+ORIGIN_UTC = "2000-01-01T00:00:00"
+TILE_DAYS = 30
+TILE_SECONDS = TILE_DAYS * 86400
+MAX_INTERVAL_DAYS = 800
+
+# Display properties and sample steps. The Moon keeps the hourly step of moon.czml; slower bodies need fewer samples.
+TRACK_BODIES = {
+    "Mercury": {"naif_id": 1, "step_seconds": 6 * 3600, "color": [180, 150, 100, 255], "pixelSize": 8},
+    "Venus":   {"naif_id": 2, "step_seconds": 12 * 3600, "color": [220, 180, 100, 255], "pixelSize": 12},
+    "Mars":    {"naif_id": 4, "step_seconds": 12 * 3600, "color": [255, 100, 50, 255], "pixelSize": 10},
+    "Jupiter": {"naif_id": 5, "step_seconds": 86400, "color": [200, 150, 100, 255], "pixelSize": 18},
+    "Saturn":  {"naif_id": 6, "step_seconds": 86400, "color": [220, 200, 150, 255], "pixelSize": 16},
+    "Uranus":  {"naif_id": 7, "step_seconds": 86400, "color": [180, 220, 220, 255], "pixelSize": 14},
+    "Neptune": {"naif_id": 8, "step_seconds": 86400, "color": [100, 150, 255, 255], "pixelSize": 14},
+    "Pluto":   {"naif_id": 9, "step_seconds": 86400, "color": [200, 180, 170, 255], "pixelSize": 6},
+    "Moon":    {"naif_id": 301, "step_seconds": 3600, "color": [200, 200, 200, 255], "pixelSize": 10},
+}
+PLANETS = [name for name in TRACK_BODIES if name != "Moon"]
+
+
+def parse_utc(iso):
+    """ISO-8601 UTC string (with or without 'Z'/offset) -> POSIX seconds."""
+    dt = datetime.fromisoformat(iso.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def format_utc(posix_seconds):
+    return datetime.fromtimestamp(posix_seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+ORIGIN_POSIX = parse_utc(ORIGIN_UTC)
+
+_tiles = None
+_tiles_lock = threading.Lock()
+
+
+def load_tiles():
+    """Loads the index and memory-maps every body's tiles once. Returns None if the store was never built."""
+    global _tiles
+    with _tiles_lock:
+        if _tiles is None:
+            if not os.path.exists(INDEX_PATH):
+                _tiles = {}
+            else:
+                with open(INDEX_PATH, "r") as f:
+                    index = json.load(f)
+                _tiles = {
+                    "index": index,
+                    "positions": {
+                        name: np.load(os.path.join(TILES_DIR, f"{name}.npy"), mmap_mode="r") for name in index["bodies"]
+                    },
+                }
+                print(f"--- Ephemeris tiles loaded: {len(index['bodies'])} bodies x {index['n_tiles']} tiles ---")
+    return _tiles or None
+
+
+def coverage():
+    """(start, end) of the tile store in POSIX seconds, or None."""
+    tiles = load_tiles()
+    if tiles is None:
+        return None
+    index = tiles["index"]
+    return index["origin_posix"], index["origin_posix"] + index["n_tiles"] * index["tile_seconds"]
+
+
+def assemble(name, start, end):
+    """
+    Returns (times, positions_m) for one body with all samples in [start, end] (POSIX seconds),
+    stitched from the overlapping tiles. Raises ValueError outside the store's coverage.
+    """
+    tiles = load_tiles()
+    if tiles is None:
+        raise ValueError("Ephemeris tiles have not been built. Run precompute_ephemeris_tiles.py.")
+    index = tiles["index"]
+    if name not in index["bodies"]:
+        raise ValueError(f"Unknown body '{name}'. Choose from {sorted(index['bodies'])}.")
+    covered_start, covered_end = coverage()
+    if start < covered_start or end > covered_end or end <= start:
+        raise ValueError(
+            f"Interval must lie within {format_utc(covered_start)}/{format_utc(covered_end)} and end after it starts."
+        )
+
+    tile_seconds = index["tile_seconds"]
+    step = index["bodies"][name]["step_seconds"]
+    data = tiles["positions"][name]
+    first = int((start - covered_start) // tile_seconds)
+    last = min(int((end - covered_start) // tile_seconds), index["n_tiles"] - 1)
+
+    # Drop each tile's last sample (it repeats the next tile's first one) except in the final tile.
+    block = np.concatenate([data[first:last, :-1].reshape(-1, 3), data[last]])
+    times = covered_start + first * tile_seconds + np.arange(len(block)) * step
+    # Keep one sample either side of the interval so interpolation covers its ends.
+    lo = max(0, int(np.searchsorted(times, start, side="right")) - 1)
+    hi = min(len(times), int(np.searchsorted(times, end, side="left")) + 1)
+    return times[lo:hi], block[lo:hi]
+
+
+def _track_packet(name, epoch_posix, times, positions_m):
+    body = TRACK_BODIES[name]
+    is_moon = name == "Moon"
+    packet = {
+        "id": f"moon_{name}" if is_moon else f"planet_{name}",
+        "name": name,
+        "label": {
+            "text": name,
+            "fillColor": {"rgba": [255, 255, 255, 255]},
+            "font": "12pt Segoe UI",
+            "horizontalOrigin": "LEFT",
+            "pixelOffset": {"cartesian2": [15, 0]},
+            "show": True
+        },
+        "point": {
+            "color": {"rgba": body["color"]},
+            "pixelSize": body["pixelSize"],
+            "outlineWidth": 1,
+            "outlineColor": {"rgba": [255, 255, 255, 100]}
+        },
+        "position": {
+            "epoch": format_utc(epoch_posix),
+            "cartesian": np.column_stack([times - epoch_posix, positions_m]),
+            "interpolationAlgorithm": "LAGRANGE",
+            "interpolationDegree": 5,
+            "referenceFrame": "INERTIAL"
+        },
+        "properties": {"entity_type": "moon" if is_moon else "planet"}
+    }
+    if is_moon:
+        packet["path"] = {
+            "material": {"solidColor": {"color": {"rgba": [255, 255, 255, 100]}}},
+            "width": 1,
+            "resolution": 120
+        }
+    return packet
+
+
+def tracks_czml(start, end, bodies=None):
+    """CZML (document packet + one packet per body) for the interval [start, end] in POSIX seconds."""
+    if end - start > MAX_INTERVAL_DAYS * 86400:
+        raise ValueError(f"Interval is longer than {MAX_INTERVAL_DAYS} days.")
+    bodies = bodies or list(TRACK_BODIES)
+    czml = [{
+        "id": "document",
+        "name": "EphemerisTracks",
+        "version": "1.0",
+        "clock": {
+            "interval": f"{format_utc(start)}/{format_utc(end)}",
+            "currentTime": format_utc(start),
+            "multiplier": 3600,
+        }
+    }]
+    for name in bodies:
+        times, positions_m = assemble(name, start, end)
+        czml.append(_track_packet(name, start, times, positions_m))
+    return czml
@@ -0,0 +1,209 @@
+# In Backend/fixture_server.py
+"""
+Local stand-in for the JPL SBDB APIs, for offline ingestion runs.
+
+Serves sbdb_query.api (fields, limit, limit-from) and sbdb.api (spk) from a
+synthetic catalog built by benchmark.synthetic_catalog_rows, or from
+data/neo_catalog_cache.json with --rows 0. The rows use the same column order
+and string values as SBDB.
+
+With --kernels-dir it also serves the files of a directory under /kernels/,
+with HTTP Range and If-Range support (ETag and Last-Modified validators), as
+a stand-in for the NAIF kernel server (download_kernels.py).
+
+It can also play the parts of the real service that a client has to survive:
+per-request latency, a bandwidth cap, random 503s, a request rate limit
+answered with 429 and Retry-After, and kernel transfers dropped after
+--drop-after bytes.
+
+  python fixture_server.py --rows 22324 --latency 0.3 --fail-rate 0.05
+  ASTROTERRA_SBDB_URL=http://127.0.0.1:8765 python precompute_neos.py
+  ASTROTERRA_KERNELS_URL=http://127.0.0.1:8765/kernels python download_kernels.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import benchmark
+import catalog_store
+
+# --- Configuration ---
+DEFAULT_PORT = 8765
+CHUNK_BYTES = 64 * 1024
+SIGNATURE = {"version": "1.0", "source": "NASA/JPL SBDB (Small-Body DataBase) Query API"}
+FIELDS = catalog_store.CACHE_FIELDS + catalog_store.OPTIONAL_FIELDS
+
+
+class FixtureState:
+    def __init__(self, rows, latency=0.0, bandwidth=None, fail_rate=0.0, rate_limit=None, seed=0,
+                 kernels_dir=None, drop_after=None):
+        self.rows = [list(row) + [None] * (len(FIELDS) - len(row)) for row in rows]  # Optional fields unknown
+        self.by_spkid = {str(row[0]): row for row in self.rows}
+        self.latency = latency
+        self.bandwidth = bandwidth  # Bytes per second per response, or None
+        self.fail_rate = fail_rate
+        self.rate_limit = rate_limit  # Requests per second, or None
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = []
+        self.requests = 0
+        self.kernels_dir = kernels_dir
+        self.drop_after = drop_after  # Bytes per kernel response before the connection is cut, or None
+
+    def admit(self):
+        """None if the request may proceed, else (status, Retry-After seconds or None)."""
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            if self.rate_limit:
+                self.window = [t for t in self.window if now - t < 1.0]
+                if len(self.window) >= self.rate_limit:
+                    return 429, 1
+                self.window.append(now)
+            if self.fail_rate and self.random.random() < self.fail_rate:
+                return 503, None
+        return None
+
+
+def _object_record(row):
+    col = dict(zip(FIELDS, row))
+    a, ma = float(col["a"]), float(col["ma"])
+    mean_motion = 0.9856076686 / a**1.5  # deg/day
+    col["q"] = f"{a * (1.0 - float(col['e'])):.6f}"
+    col["tp"] = f"{float(col['epoch']) - ma / mean_motion:.6f}"  # Time of perihelion, as SBDB lists it
+    return {
+        "signature": dict(SIGNATURE, source="NASA/JPL Small-Body Database (SBDB) API"),
+        "object": {"spkid": str(col["spkid"]), "fullname": col["full_name"].strip(), "pha": col["pha"] == "Y"},
+        "orbit": {
+            "epoch": col["epoch"],
+            "moid": col["moid"],
+            "elements": [{"name": name, "value": col[name]} for name in ("e", "a", "q", "i", "om", "w", "ma", "tp")],
+        },
+        "phys_par": [{"name": "H", "value": col["H"]}],
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so pooled clients reuse connections
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=(), content_type="application/json", send_bytes=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if send_bytes is not None:
+            body = body[:send_bytes]
+            self.close_connection = True
+        for k in range(0, len(body), CHUNK_BYTES):
+            self.wfile.write(body[k:k + CHUNK_BYTES])
+            if self.state.bandwidth:
+                time.sleep(min(CHUNK_BYTES, len(body) - k) / self.state.bandwidth)
+
+    def _send_kernel(self, name):
+        path = os.path.join(self.state.kernels_dir or "", os.path.basename(name))
+        if not self.state.kernels_dir or not os.path.isfile(path):
+            return self._error(404, "kernel not found")
+        with open(path, "rb") as f:
+            data = f.read()
+        total = len(data)
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+        validators = [("ETag", etag), ("Last-Modified", last_modified), ("Accept-Ranges", "bytes")]
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (if_range is None or if_range in (etag, last_modified)):
+            start = int(match.group(1))
+            if start >= total:
+                return self._send(416, b"", [("Content-Range", f"bytes */{total}")])
+            headers = [("Content-Range", f"bytes {start}-{total - 1}/{total}")] + validators
+            return self._send(206, data[start:], headers, "application/octet-stream", self.state.drop_after)
+        # No range, or the file changed since the client's copy (If-Range mismatch): the whole file.
+        return self._send(200, data, validators, "application/octet-stream", self.state.drop_after)
+
+    def _error(self, status, message, retry_after=None):
+        headers = [("Retry-After", str(retry_after))] if retry_after is not None else []
+        self._send(status, json.dumps({"message": message}).encode(), headers)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        rejected = self.state.admit()
+        if rejected is not None:
+            status, retry_after = rejected
+            return self._error(status, "Too many requests" if status == 429 else "Service unavailable", retry_after)
+
+        if url.path.startswith("/kernels/"):
+            return self._send_kernel(url.path[len("/kernels/"):])
+        if url.path == "/sbdb_query.api":
+            fields = params.get("fields", "spkid,full_name").split(",")
+            unknown = [name for name in fields if name not in FIELDS]
+            if unknown:
+                return self._error(400, f"unknown field(s): {','.join(unknown)}")
+            columns = [FIELDS.index(name) for name in fields]
+            start = int(params.get("limit-from", 0))
+            limit = int(params.get("limit", len(self.state.rows)))
+            page = [[row[c] for c in columns] for row in self.state.rows[start:start + limit]]
+            body = {"signature": SIGNATURE, "count": len(self.state.rows), "fields": fields, "data": page}
+            return self._send(200, json.dumps(body).encode())
+        if url.path == "/sbdb.api":
+            row = self.state.by_spkid.get(params.get("spk", ""))
+            if row is None:
+                return self._error(404, "specified object was not found")
+            return self._send(200, json.dumps(_object_record(row)).encode())
+        self._error(404, "unknown endpoint")
+
+
+def load_rows(n_rows, seed=0):
+    """`n_rows` synthetic catalog rows, or the rows of the local catalog cache when n_rows is 0."""
+    if n_rows:
+        rows = benchmark.synthetic_catalog_rows(n_rows, seed)
+        return [[int(row[0])] + row[1:] for row in rows]
+    with open(catalog_store.CATALOG_CACHE_PATH, "r") as f:
+        return json.load(f)["data"]
+
+
+def start(port=0, rows=None, **options):
+    """Starts the server in a daemon thread; returns (server, base URL). port=0 picks a free port."""
+    handler = type("FixtureHandler", (Handler,), {"state": FixtureState(rows if rows is not None else load_rows(0), **options)})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the JPL SBDB APIs.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rows", type=int, default=22324, help="Synthetic catalog size (0: use the local cache)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Bytes per second per response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second before 429")
+    parser.add_argument("--kernels-dir", default=None, help="Directory served under /kernels/ (with Range support)")
+    parser.add_argument("--drop-after", type=int, default=None, help="Cut kernel transfers after this many bytes")
+    args = parser.parse_args()
+    server, base_url = start(
+        args.port, load_rows(args.rows), latency=args.latency, bandwidth=args.bandwidth,
+        fail_rate=args.fail_rate, rate_limit=args.rate_limit, kernels_dir=args.kernels_dir, drop_after=args.drop_after,
+    )
+    print(f"--- SBDB fixture server on {base_url} ({len(server.RequestHandlerClass.state.rows)} rows) ---")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
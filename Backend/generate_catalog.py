@@ -1,11 +1,15 @@
-import requests
+import httpx
 import json
 import os
 import math
-import time
 import spiceypy as sp
 from datetime import datetime, timezone
 
+import catalog_enrichment
+import catalog_store
+import ephemeris_cache
+import sbdb_client
+
 # --- Constants and Setup ---
 # Ensure paths are correct relative to this script's location
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -20,14 +24,7 @@ def load_spice_kernels():
     sp.furnsh(os.path.join(KERNELS_DIR, "naif0012.tls"))
     sp.furnsh(META_KERNEL)
 
-def get_asteroid_classification(h_mag, is_pha):
-    if h_mag is not None:
-        if h_mag < 18.0: return "PLANET_KILLER"
-        if h_mag < 22.0: return "CITY_KILLER"
-    if is_pha: return "PHA"
-    return "REGULAR"
-
-def get_geocentric_cartesian(elements_dict, et_now):
+def get_geocentric_cartesian(elements_dict, et_now, earth_state_wrt_sun=None):
     GM_SUN_KM3_S2 = 1.32712440018e11
     a_km = elements_dict['a'] * AU_TO_KM
     elts = [
@@ -37,48 +34,61 @@ def get_geocentric_cartesian(elements_dict, et_now):
         sp.utc2et(f"JD {elements_dict['epoch']}"), GM_SUN_KM3_S2
     ]
     ast_state_wrt_sun = sp.conics(elts, et_now)
-    earth_state_wrt_sun, _ = sp.spkgeo(targ=399, et=et_now, ref='J2000', obs=10)
+    if earth_state_wrt_sun is None:
+        earth_state_wrt_sun = ephemeris_cache.lookup_state(399, et_now, ref='J2000', obs=10)
     geocentric_pos_km = [ast_state_wrt_sun[i] - earth_state_wrt_sun[i] for i in range(3)]
     return [pos * 1000 for pos in geocentric_pos_km]
 
 # --- Main Generation Logic ---
+def build_catalog_czml(rows, et_now):
+    """Builds the catalog CZML (document packet + one point per asteroid) from SBDB query rows."""
+    all_czml = [{"id": "document", "version": "1.0"}]
+    # Every object is placed at the same epoch, so Earth's state is looked up once.
+    earth_state_wrt_sun = ephemeris_cache.lookup_state(399, et_now, ref='J2000', obs=10)
+    h_mags = catalog_store.float_column([item[9] for item in rows])
+    codes = catalog_enrichment.classify(h_mags, [item[10] == 'Y' for item in rows])
+
+    for item, code in zip(rows, codes):
+        try:
+            spkid, fullname, e, a, i, om, w, ma, epoch, h, pha = item
+            elements_dict = {'e': float(e), 'a': float(a), 'i': float(i), 'om': float(om), 'w': float(w), 'ma': float(ma), 'epoch': float(epoch)}
+            pos_m = get_geocentric_cartesian(elements_dict, et_now, earth_state_wrt_sun)
+            is_pha = pha == 'Y'
+            classification = catalog_store.CLASSIFICATIONS[code]
+
+            packet = {
+                "id": f"asteroid_{spkid}", "name": fullname,
+                "position": {"cartesian": pos_m, "referenceFrame": "INERTIAL"},
+                "properties": {"isPHA": is_pha, "classification": classification}
+            }
+            all_czml.append(packet)
+        except Exception as e:
+            print(f"Error processing asteroid {item[0] if item else 'Unknown'}: {e}")
+            continue
+    return all_czml
+
 def generate_czml_file():
     print("--- Starting CZML catalog generation... ---")
     load_spice_kernels()
 
     try:
-        limit = 200
-        url = "https://ssd-api.jpl.nasa.gov/sbdb_query.api"
-        params = {"limit": limit, "fields": "spkid,full_name,e,a,i,om,w,ma,epoch,H,pha", "sb-class": "APO"}
+        # The whole APO catalog, paged through concurrent pooled requests (see sbdb_client.py).
         print("Fetching catalog data from JPL API...")
-        start_time = time.time()
-        response = requests.get(url, params=params, timeout=10) # 10-second timeout
-        response.raise_for_status()
-        end_time = time.time()
-        print(f"JPL API request took {end_time - start_time:.2f} seconds.")
-        catalog = response.json()
-
-        et_now = sp.utc2et(datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'))
-        all_czml = [{"id": "document", "version": "1.0"}]
+        catalog = sbdb_client.query(catalog_store.CACHE_FIELDS + catalog_store.OPTIONAL_FIELDS, {"sb-class": "APO"})
+        stats = catalog.pop("stats")
+        print(f"JPL API: {catalog['count']} rows, {stats['pages']} pages, {stats['bytes'] / 1e6:.1f} MB "
+              f"in {stats['seconds']:.2f} seconds ({stats['retries']} retries).")
 
-        for item in catalog.get("data", []):
-            try:
-                spkid, fullname, e, a, i, om, w, ma, epoch, h, pha = item
-                elements_dict = {'e': float(e), 'a': float(a), 'i': float(i), 'om': float(om), 'w': float(w), 'ma': float(ma), 'epoch': float(epoch)}
-                pos_m = get_geocentric_cartesian(elements_dict, et_now)
-                is_pha = pha == 'Y'
-                h_mag = float(h) if h is not None else None
-                classification = get_asteroid_classification(h_mag, is_pha)
+        # The catalog cache feeds the catalog store (/neos/query, /neos/search) and the close-approach precompute.
+        os.makedirs(catalog_store.DATA_DIR, exist_ok=True)
+        with open(catalog_store.CATALOG_CACHE_PATH, 'w') as f:
+            json.dump(catalog, f)
+        print(f" -> Saved catalog cache to {catalog_store.CATALOG_CACHE_PATH}")
 
-                packet = {
-                    "id": f"asteroid_{spkid}", "name": fullname,
-                    "position": {"cartesian": pos_m, "referenceFrame": "INERTIAL"},
-                    "properties": {"isPHA": is_pha, "classification": classification}
-                }
-                all_czml.append(packet)
-            except Exception as e:
-                print(f"Error processing asteroid {item[0] if item else 'Unknown'}: {e}")
-                continue
+        # build_catalog_czml takes rows as (spkid, full_name, e, a, i, om, w, ma, epoch, H, pha).
+        rows = [row[:9] + [row[11], row[10]] for row in catalog["data"]]
+        et_now = sp.utc2et(datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'))
+        all_czml = build_catalog_czml(rows, et_now)
 
         # Ensure the static directory exists
         os.makedirs(STATIC_DIR, exist_ok=True)
@@ -89,7 +99,7 @@ def generate_czml_file():
             json.dump(all_czml, f)
 
         print(f"--- Successfully generated and saved CZML catalog to {output_path} ---")
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print("Gateway timeout: The JPL API took too long to respond.")
     except Exception as e:
         print(f"An error occurred during CZML generation: {e}")
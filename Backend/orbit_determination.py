@@ -0,0 +1,218 @@
+# In Backend/orbit_determination.py
+"""
+Batch least-squares orbit determination for the Phase 1 impactor.
+
+Each observation night adds synthetic astrometry: right ascension and
+declination of the impactor, seen from a few ground observatories that rotate
+with the Earth, with Gaussian noise of SIGMA_ARCSEC. The true path is the
+impactor CZML, which is geocentric.
+
+The fitted trajectory has constant acceleration: x(t) = p + v t + a t^2 / 2,
+with 9 parameters. That is exactly the shape precompute_impactor.py draws.
+A differential-correction (Gauss-Newton) solver refits the parameters and
+their covariance to all measurements so far, with the discovery estimate as
+a prior. The partials for every measurement are computed in one vectorized
+pass.
+
+The covariance, propagated to the impact epoch and projected on the plane
+normal to the approach, gives the miss-distance uncertainty. The impact
+probability comes from encounter.py's clones, the same model as the b-plane
+analysis.
+"""
+import functools
+import json
+import os
+
+import numpy as np
+
+# --- Configuration ---
+SIGMA_ARCSEC = 0.5
+SIGMA_RAD = np.radians(SIGMA_ARCSEC / 3600.0)
+EARTH_RADIUS_M = 6371.0e3
+EARTH_ROTATION_RAD_S = 7.2921159e-5
+MIN_ELEVATION_DEG = 20.0
+
+# (name, latitude deg, longitude deg)
+OBSERVATORIES = [
+    ("Catalina", 32.42, -110.73),
+    ("Pan-STARRS", 20.71, -156.26),
+    ("La Silla", -29.26, -70.73),
+]
+# Day (since the start of the impactor trajectory) of each observation night.
+OBSERVATION_DAYS = [3, 12, 25, 45, 70]
+EXPOSURES_PER_NIGHT = 12  # Per observatory
+CANDIDATE_STEP_S = 600.0
+
+# 1-sigma uncertainty of the discovery estimate (position m, velocity m/s, acceleration m/s^2).
+PRIOR_SIGMA = np.array([3.0e9] * 3 + [300.0] * 3 + [3.0e-4] * 3)
+MAX_ITERATIONS = 15
+CONVERGENCE = 1e-6  # Largest correction, in prior sigmas
+
+
+@functools.lru_cache(maxsize=4)
+def _load_truth(path, mtime_ns):
+    with open(path, "r") as f:
+        packet = json.load(f)[1]
+    samples = np.asarray(packet["position"]["cartesian"], dtype=np.float64).reshape(-1, 4)
+    return samples[:, 0], samples[:, 1:], packet["position"]["epoch"]
+
+
+def load_truth(path):
+    """(times s, positions m) of the impactor CZML's samples; cached until the file changes."""
+    return _load_truth(path, os.stat(path).st_mtime_ns)[:2]
+
+
+def load_truth_epoch(path):
+    """UTC epoch (ISO string) that the impactor CZML's sample times count from."""
+    return _load_truth(path, os.stat(path).st_mtime_ns)[2]
+
+
+def design(t):
+    """(N, 3, 9) partials of x(t) with respect to (p, v, a)."""
+    t = np.asarray(t, dtype=np.float64)
+    eye = np.eye(3)
+    return np.concatenate([
+        np.broadcast_to(eye, t.shape + (3, 3)),
+        t[..., None, None] * eye,
+        0.5 * t[..., None, None] ** 2 * eye,
+    ], axis=-1)
+
+
+def model_positions(params, t):
+    params = np.asarray(params, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    return params[0:3] + params[3:6] * t + 0.5 * params[6:9] * t**2
+
+
+def fit_truth_parameters(times, positions):
+    """Least-squares (p, v, a) through the true samples; exact for precompute_impactor.py's curve."""
+    coeffs = np.polynomial.polynomial.polyfit(times, positions, 2)  # (3 powers, 3 axes)
+    return np.concatenate([coeffs[0], coeffs[1], 2.0 * coeffs[2]])
+
+
+def site_positions(t, site_index):
+    """Geocentric positions (m) of the observatories at times t, with a simple rotating Earth."""
+    lat = np.radians(np.array([s[1] for s in OBSERVATORIES]))[site_index]
+    lon = np.radians(np.array([s[2] for s in OBSERVATORIES]))[site_index]
+    angle = lon + EARTH_ROTATION_RAD_S * np.asarray(t)
+    return EARTH_RADIUS_M * np.stack([
+        np.cos(lat) * np.cos(angle), np.cos(lat) * np.sin(angle), np.broadcast_to(np.sin(lat), angle.shape),
+    ], axis=-1)
+
+
+def angles(rho):
+    """Topocentric RA/Dec (rad) of line-of-sight vectors rho (N, 3)."""
+    return np.arctan2(rho[:, 1], rho[:, 0]), np.arcsin(rho[:, 2] / np.linalg.norm(rho, axis=1))
+
+
+def simulate_night(times, positions, day, rng):
+    """
+    Noisy astrometry for one night: for every observatory, EXPOSURES_PER_NIGHT evenly spread
+    exposures while the impactor is above MIN_ELEVATION_DEG. Returns (t, site_index, ra, dec).
+    """
+    candidates = day * 86400.0 + np.arange(0.0, 86400.0, CANDIDATE_STEP_S)
+    n_sites = len(OBSERVATORIES)
+    site_index = np.repeat(np.arange(n_sites), len(candidates))
+    t = np.tile(candidates, n_sites)
+    truth = np.column_stack([np.interp(t, times, positions[:, k]) for k in range(3)])
+    site = site_positions(t, site_index)
+    rho = truth - site
+    elevation = np.arcsin(np.einsum("ij,ij->i", rho, site) / (np.linalg.norm(rho, axis=1) * EARTH_RADIUS_M))
+    visible = elevation > np.radians(MIN_ELEVATION_DEG)
+
+    chosen = []
+    for s in range(n_sites):
+        idx = np.flatnonzero(visible & (site_index == s))
+        if idx.size:
+            chosen.append(idx[np.unique(np.linspace(0, idx.size - 1, EXPOSURES_PER_NIGHT).round().astype(int))])
+    chosen = np.concatenate(chosen) if chosen else np.array([], dtype=int)
+    ra, dec = angles(rho[chosen])
+    ra = ra + rng.normal(0.0, SIGMA_RAD, ra.size) / np.cos(dec)
+    dec = dec + rng.normal(0.0, SIGMA_RAD, dec.size)
+    return t[chosen], site_index[chosen], ra, dec
+
+
+def measurements(times, positions, seed, n_nights):
+    """All measurements of the first `n_nights` nights; regenerated identically from the seed."""
+    nights = [
+        simulate_night(times, positions, day, np.random.default_rng([seed, night]))
+        for night, day in enumerate(OBSERVATION_DAYS[:n_nights])
+    ]
+    return tuple(np.concatenate(column) for column in zip(*nights))
+
+
+def prior(truth_params, seed):
+    """Discovery estimate: the truth perturbed by PRIOR_SIGMA, with the matching covariance."""
+    rng = np.random.default_rng([seed, 1_000_000])
+    return truth_params + rng.normal(0.0, PRIOR_SIGMA), np.diag(PRIOR_SIGMA**2)
+
+
+def residuals_and_partials(params, t, site, ra, dec):
+    """
+    Weighted residuals (2N,) and their partials (2N, 9) for all measurements at once.
+    RA residuals are scaled by cos(dec) so both angles have the same noise.
+    """
+    rho = model_positions(params, t) - site
+    x, y, z = rho[:, 0], rho[:, 1], rho[:, 2]
+    rxy2 = x**2 + y**2
+    r2 = rxy2 + z**2
+    rxy = np.sqrt(rxy2)
+    ra_c, dec_c = np.arctan2(y, x), np.arcsin(z / np.sqrt(r2))
+
+    d_ra = np.stack([-y / rxy2, x / rxy2, np.zeros_like(x)], axis=1)
+    d_dec = np.stack([-x * z, -y * z, rxy2], axis=1) / (r2 * rxy)[:, None]
+    h = design(t)  # d rho / d params
+    cos_dec = np.cos(dec_c)
+    j_ra = np.einsum("ni,nij->nj", d_ra, h) * cos_dec[:, None]
+    j_dec = np.einsum("ni,nij->nj", d_dec, h)
+
+    res_ra = (np.angle(np.exp(1j * (ra - ra_c)))) * cos_dec  # Wrapped to [-pi, pi]
+    res_dec = dec - dec_c
+    return np.concatenate([res_ra, res_dec]) / SIGMA_RAD, np.concatenate([j_ra, j_dec]) / SIGMA_RAD
+
+
+def differential_correction(t, site, ra, dec, prior_mean, prior_cov, initial=None):
+    """
+    Gauss-Newton fit of the 9 parameters to the measurements with a Gaussian prior.
+    Returns (estimate, covariance, iterations, rms_arcsec).
+    """
+    # Work in prior-sigma units so the normal matrix is well conditioned.
+    scale = np.sqrt(np.diag(prior_cov))
+    prior_info = np.linalg.inv(prior_cov / np.outer(scale, scale))
+    estimate = np.array(prior_mean if initial is None else initial, dtype=np.float64)
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        res, jac = residuals_and_partials(estimate, t, site, ra, dec)
+        jac = jac * scale
+        normal = jac.T @ jac + prior_info
+        rhs = jac.T @ res + prior_info @ ((prior_mean - estimate) / scale)
+        step = np.linalg.solve(normal, rhs)
+        estimate = estimate + step * scale
+        if np.abs(step).max() < CONVERGENCE:
+            break
+    res, jac = residuals_and_partials(estimate, t, site, ra, dec)
+    jac = jac * scale
+    covariance = np.linalg.inv(jac.T @ jac + prior_info) * np.outer(scale, scale)
+    rms_arcsec = float(np.sqrt(np.mean(res**2)) * SIGMA_ARCSEC) if res.size else 0.0
+    return estimate, covariance, iteration, rms_arcsec
+
+
+def miss_uncertainty(estimate, covariance, t_impact):
+    """
+    Miss vector and its covariance in the plane normal to the approach velocity at `t_impact`.
+    Returns (1-sigma semi-major axis m, predicted miss distance m).
+    """
+    phi = design(t_impact)  # (3, 9)
+    miss = model_positions(estimate, t_impact)
+    cov = phi @ covariance @ phi.T
+    velocity = estimate[3:6] + estimate[6:9] * t_impact
+    u = velocity / np.linalg.norm(velocity)
+    e1 = np.cross(u, [0.0, 0.0, 1.0])
+    if np.linalg.norm(e1) < 1e-8:
+        e1 = np.cross(u, [1.0, 0.0, 0.0])
+    e1 /= np.linalg.norm(e1)
+    e2 = np.cross(u, e1)
+    basis = np.stack([e1, e2])
+    b = basis @ miss
+    cov_b = basis @ cov @ basis.T
+    sigma_major = float(np.sqrt(np.linalg.eigvalsh(cov_b).max()))
+    return sigma_major, float(np.linalg.norm(b))
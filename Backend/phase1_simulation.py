@@ -3,6 +3,15 @@ from datetime import datetime, timedelta, timezone
 import math
 import os
 import json
+import secrets
+
+import encounter
+import mitigation_grid
+import orbit_determination as od
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+# static/impactor2025.czml, written by precompute_impactor.py; Phase 3 and the launch grid read the same file.
+IMPACTOR_CZML_PATH = mitigation_grid.IMPACTOR_CZML_PATH
 
 # --- Vector Math Helpers ---
 
@@ -50,87 +59,150 @@ def get_orientation_quaternion(start_point, end_point):
     ]
 
 # --- Simulation State ---
-# This dictionary will hold the state of our fictional mission
-SIMULATION_STATE = {
-    "active": False,
-    "phase": "briefing",  # briefing -> observation -> confirmation -> decision
-    "observation_level": 0,
-    "max_observations": 5,
-    "impact_probability": 0.05,
-    "cone_scale": 1.0,  # Represents the size of the uncertainty cone (1.0 = 100%)
-}
-
-# --- Core Logic ---
-
-def start_simulation():
-    """Resets the simulation to its initial state."""
-    global SIMULATION_STATE
-    SIMULATION_STATE = {
-        "active": True,
-        "phase": "briefing",
+# Per-user states live in session_store; this module-level state is only the default
+# for callers that do not pass one.
+def new_simulation_state(active=False):
+    """Returns the initial state of our fictional mission."""
+    return {
+        "active": active,
+        "phase": "briefing",  # briefing -> observation -> confirmation -> decision
         "observation_level": 0,
-        "max_observations": 5,
+        "max_observations": len(od.OBSERVATION_DAYS),
         "impact_probability": 0.05,
-        "cone_scale": 1.0,
+        "cone_scale": 1.0,  # Represents the size of the uncertainty cone (1.0 = 100%)
+        "miss_sigma_m": None,  # 1-sigma miss-distance uncertainty at impact, from the orbit fit
+        "od": None,  # Orbit determination: seed, estimate and covariance (see orbit_determination.py)
     }
-    print("--- New Simulation Started. State:", SIMULATION_STATE)
-    return SIMULATION_STATE
 
-def perform_observation():
+SIMULATION_STATE = new_simulation_state()
+
+# --- Core Logic ---
+
+def _log_summary(event, state):
+    """One line per event; the state itself carries the 9x9 covariance."""
+    sigma_m = state["miss_sigma_m"]
+    print(f"--- {event}: phase={state['phase']} level={state['observation_level']}/{state['max_observations']} "
+          f"impact_probability={state['impact_probability']:.4f} "
+          f"miss_sigma_km={'n/a' if sigma_m is None else f'{sigma_m / 1000.0:.1f}'}")
+
+def start_simulation(state=None):
+    """Resets the simulation (the given state, or the module default) to its initial, active state."""
+    if state is None:
+        state = SIMULATION_STATE
+    state.clear()
+    state.update(new_simulation_state(active=True))
+    # Each run gets its own discovery estimate and measurement noise.
+    seed = secrets.randbelow(2**31)
+    truth_times, truth_positions = od.load_truth(IMPACTOR_CZML_PATH)
+    prior_mean, prior_cov = od.prior(od.fit_truth_parameters(truth_times, truth_positions), seed)
+    probability = encounter.impact_probability(prior_mean, prior_cov, truth_times[-1], seed=seed)
+    sigma_m, _ = od.miss_uncertainty(prior_mean, prior_cov, truth_times[-1])
+    state.update(impact_probability=probability, miss_sigma_m=sigma_m)
+    state["od"] = {
+        "seed": seed, "estimate": prior_mean.tolist(), "covariance": prior_cov.tolist(),
+        "prior_sigma_m": sigma_m, "n_measurements": 0, "rms_arcsec": None, "iterations": 0,
+    }
+    _log_summary("New Simulation Started", state)
+    return state
+
+def _refine_orbit(state):
+    """Adds the next night of astrometry and refits the orbit to every measurement so far."""
+    od_state = state["od"]
+    truth_times, truth_positions = od.load_truth(IMPACTOR_CZML_PATH)
+    prior_mean, prior_cov = od.prior(od.fit_truth_parameters(truth_times, truth_positions), od_state["seed"])
+    t, site_index, ra, dec = od.measurements(truth_times, truth_positions, od_state["seed"], state["observation_level"])
+    estimate, covariance, iterations, rms_arcsec = od.differential_correction(
+        t, od.site_positions(t, site_index), ra, dec, prior_mean, prior_cov, initial=od_state["estimate"],
+    )
+    probability = encounter.impact_probability(estimate, covariance, truth_times[-1], seed=od_state["seed"])
+    sigma_m, miss_m = od.miss_uncertainty(estimate, covariance, truth_times[-1])
+    od_state.update(
+        estimate=estimate.tolist(), covariance=covariance.tolist(), n_measurements=int(2 * t.size),
+        rms_arcsec=rms_arcsec, iterations=iterations, predicted_miss_m=miss_m,
+    )
+    state["impact_probability"] = probability
+    state["miss_sigma_m"] = sigma_m
+    state["cone_scale"] = sigma_m / od_state["prior_sigma_m"]
+
+def perform_observation(state=None):
     """
-    Simulates making an observation. This reduces uncertainty (cone_scale)
-    and increases the impact probability.
+    Simulates making an observation: a night of synthetic astrometry followed by a
+    least-squares orbit fit. The fitted covariance sets the uncertainty (cone_scale,
+    miss_sigma_m) and the impact probability. Updates `state` in place.
     """
-    global SIMULATION_STATE
-    if not SIMULATION_STATE.get("active") or SIMULATION_STATE.get("phase") == "decision":
+    if state is None:
+        state = SIMULATION_STATE
+    if not state.get("active") or state.get("phase") == "decision":
         return None # Can't observe if the simulation isn't in the right phase
 
-    obs_level = SIMULATION_STATE["observation_level"]
-    max_obs = SIMULATION_STATE["max_observations"]
+    obs_level = state["observation_level"]
+    max_obs = state["max_observations"]
 
     if obs_level < max_obs:
-        SIMULATION_STATE["observation_level"] += 1
-        SIMULATION_STATE["phase"] = "observation"
-        
-        progress = SIMULATION_STATE["observation_level"] / max_obs
-        SIMULATION_STATE["cone_scale"] = 1.0 - (progress ** 1.5)
-        SIMULATION_STATE["impact_probability"] = 0.05 + (0.95 * (progress ** 2))
-        SIMULATION_STATE["impact_probability"] = min(SIMULATION_STATE["impact_probability"], 1.0)
+        state["observation_level"] += 1
+        state["phase"] = "observation"
+        _refine_orbit(state)
 
-    if SIMULATION_STATE["observation_level"] >= max_obs:
-        SIMULATION_STATE["phase"] = "confirmation"
-        SIMULATION_STATE["impact_probability"] = 1.0
-        SIMULATION_STATE["cone_scale"] = 0.0
+    if state["observation_level"] >= max_obs:
+        # Tracking is complete: the trajectory is shown instead of the cone.
+        state["phase"] = "confirmation"
+        state["cone_scale"] = 0.0
 
-    print("--- Observation Performed. State:", SIMULATION_STATE)
-    return SIMULATION_STATE
+    _log_summary("Observation Performed", state)
+    return state
+
+def encounter_analysis(state=None, n_clones=encounter.IMPACT_CLONES):
+    """
+    B-plane analysis and impact corridor for the current orbit solution (see encounter.py),
+    or None if no simulation is running. With the default n_clones its impact_fraction is the
+    session's impact_probability.
+    """
+    if state is None:
+        state = SIMULATION_STATE
+    od_state = state.get("od")
+    if not state.get("active") or not od_state:
+        return None
+    truth_times, _ = od.load_truth(IMPACTOR_CZML_PATH)
+    return encounter.analyze(
+        od_state["estimate"], od_state["covariance"], od.load_truth_epoch(IMPACTOR_CZML_PATH),
+        float(truth_times[-1]), n_clones, seed=od_state["seed"],
+    )
+
+_impactor_czml_cache = {}
+
+def load_impactor_czml():
+    """
+    The parsed impactor2025.czml, reused until its modification time changes. The same packet
+    objects are returned on every call (session_channel caches their digests); treat them as read-only.
+    """
+    mtime = os.path.getmtime(IMPACTOR_CZML_PATH)
+    if _impactor_czml_cache.get("mtime") != mtime:
+        with open(IMPACTOR_CZML_PATH, "r") as f:
+            _impactor_czml_cache.update(mtime=mtime, data=json.load(f))
+    return _impactor_czml_cache["data"]
 
-def generate_threat_czml():
+def generate_threat_czml(state=None):
     """
     Generates the CZML for the 'Impactor 2025' threat, using the pre-computed
-    impactor.czml file as the true trajectory.
+    impactor2025.czml file as the true trajectory.
     """
-    global SIMULATION_STATE
-    if not SIMULATION_STATE.get("active"):
+    if state is None:
+        state = SIMULATION_STATE
+    if not state.get("active"):
         return []
 
     # Load the pre-computed impactor data
-    PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
-    STATIC_DIR = os.path.join(PROJECT_ROOT, "static")
-    impactor_czml_path = os.path.join(STATIC_DIR, "impactor.czml")
-
-    if not os.path.exists(impactor_czml_path):
+    if not os.path.exists(IMPACTOR_CZML_PATH):
         # This should not happen if precompute_impactor.py has been run
-        print("--- ERROR: impactor.czml not found! ---")
+        print("--- ERROR: impactor2025.czml not found! ---")
         return []
 
-    with open(impactor_czml_path, "r") as f:
-        impactor_czml = json.load(f)
+    impactor_czml = load_impactor_czml()
 
     doc_packet = impactor_czml[0]
     impactor_packet = impactor_czml[1]
 
-    cone_scale = SIMULATION_STATE["cone_scale"]
+    cone_scale = state["cone_scale"]
 
     if cone_scale > 0.0:
         # Extract the full trajectory data
@@ -151,8 +223,12 @@ def generate_threat_czml():
         ]
         orientation_quat = get_orientation_quaternion(start_pos, end_pos)
 
-        # The radius of the cone is a percentage of the total trajectory length
-        uncertainty_radius = (length * 0.02) * cone_scale 
+        # The cone's base (bottomRadius, twice this radius) is the fitted 3-sigma miss uncertainty,
+        # capped at its size before any observation: 4% of the trajectory length.
+        if state.get("miss_sigma_m") is not None:
+            uncertainty_radius = min(3.0 * state["miss_sigma_m"], length * 0.04) / 2
+        else:
+            uncertainty_radius = (length * 0.02) * cone_scale
         principal_axis_length = length / 2.0
 
         threat_packet = {
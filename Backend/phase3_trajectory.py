@@ -1,13 +1,36 @@
-import rebound
 import spiceypy as spice
 import numpy as np
 import os
 import json
 
+import ephemeris_cache
+import kepler
+import metrics
+import mitigation_grid
+import propagation_config
+import sampling
+import spice_kernels
+import trajectory_store
+from propagation_cache import PROPAGATION_CACHE, canonical_key
+
 # --- Configuration ---
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 KERNELS_DIR = os.path.join(PROJECT_ROOT, "kernels")
-spice.furnsh(os.path.join(KERNELS_DIR, "meta_kernel.txt"))
+
+N_POINTS = 200
+# The mitigation force model has always been Sun-only; "fast" keeps it and runs on the analytic path.
+DEFAULT_MODE = "fast"
+# The spacecraft starts at Earth's centre with its heliocentric departure velocity (a patched-conic
+# launch), so the Earth-Moon barycenter is left out of the perturbers, as simulation.py does for Earth:
+# as a point mass ~4,700 km away it would capture the spacecraft.
+LAUNCH_EXCLUDE = (3,)
+
+def czml_epoch_to_et(epoch):
+    """Converts a CZML ISO-8601 epoch to ET. SPICE's str2et rejects the '+00:00' and 'Z' UTC suffixes."""
+    for suffix in ("+00:00", "Z"):
+        if epoch.endswith(suffix):
+            epoch = epoch[:-len(suffix)]
+    return spice.str2et(epoch)
 
 def get_position_from_czml(czml_data, target_et):
     """
@@ -22,7 +45,7 @@ def get_position_from_czml(czml_data, target_et):
     if not position_prop or 'cartesian' not in position_prop:
         raise ValueError("Impactor packet does not contain cartesian position data.")
 
-    epoch_et = spice.str2et(position_prop['epoch'])
+    epoch_et = czml_epoch_to_et(position_prop['epoch'])
     cartesian_data = position_prop['cartesian']
 
     # Reshape the flat data array into a (N, 4) array of [time, x, y, z]
@@ -51,47 +74,150 @@ def get_position_from_czml(czml_data, target_et):
     
     return interpolated_pos_meters / 1000.0 # Convert from meters to km
 
-def generate_mitigation_czml(trajectory_params, start_time_et):
+_impactor_czml_cache = {}
+
+def load_impactor_czml():
     """
-    Calculates the spacecraft trajectory using the "Hybrid Directional Kick" method.
-    This respects the user's chosen Delta-V to create different trajectory types.
+    Loads the fictional Impactor 2025 trajectory from the static CZML file.
+    The parsed file is reused until its modification time changes; treat it as read-only.
     """
-    print("--- GENERATING SPACECRAFT CZML (Hybrid Directional Kick Method) ---")
+    mtime = os.path.getmtime(mitigation_grid.IMPACTOR_CZML_PATH)
+    if _impactor_czml_cache.get("mtime") != mtime:
+        with open(mitigation_grid.IMPACTOR_CZML_PATH, 'r') as f:
+            _impactor_czml_cache.update(mtime=mtime, data=json.load(f))
+    return _impactor_czml_cache["data"]
 
-    # 1. GET PARAMETERS FROM USER'S CHOICE
-    travel_time_days = int(trajectory_params['travel_time_days'])
+def compute_launch_state(trajectory_params, start_time_et, impactor_czml_data):
+    """
+    Returns the spacecraft's launch position and velocity (km, km/s, ECLIPJ2000 wrt SSB):
+    Earth's state plus a Delta-V kick aimed at where the asteroid will be at arrival.
+    """
+    travel_time_seconds = int(trajectory_params['travel_time_days']) * 86400
     delta_v_mps = int(trajectory_params['required_deltav'])
-    travel_time_seconds = travel_time_days * 86400
     arrival_time_et = start_time_et + travel_time_seconds
 
-    # 2. GET INITIAL & FINAL STATES
-    # Earth state from SPICE
-    earth_state_launch, _ = spice.spkgeo(targ=399, et=start_time_et, ref='ECLIPJ2000', obs=0)
+    # Earth state from the ephemeris cache (SPICE outside its window)
+    with metrics.span("mitigation.spice_lookup"):
+        earth_state_launch = ephemeris_cache.lookup_state(399, start_time_et, ref='ECLIPJ2000')
     earth_pos_launch = np.array(earth_state_launch[:3])
     earth_vel_launch = np.array(earth_state_launch[3:])
-    
+
     # Asteroid state from our fictional CZML
-    static_dir = os.path.join(PROJECT_ROOT, "static")
-    impactor_czml_path = os.path.join(static_dir, "impactor2025.czml")
-    with open(impactor_czml_path, 'r') as f:
-        impactor_czml_data = json.load(f)
-    
-    asteroid_pos_arrival = get_position_from_czml(impactor_czml_data, arrival_time_et)
+    with metrics.span("mitigation.czml_interpolation"):
+        asteroid_pos_arrival = get_position_from_czml(impactor_czml_data, arrival_time_et)
 
-    # 3. CALCULATE THE SPACECRAFT'S INITIAL VELOCITY
     direction_vector = asteroid_pos_arrival - earth_pos_launch
     norm_direction = direction_vector / np.linalg.norm(direction_vector)
     delta_v_kms = delta_v_mps / 1000.0
     kick_velocity = norm_direction * delta_v_kms
-    spacecraft_initial_velocity = earth_vel_launch + kick_velocity
+    return earth_pos_launch, earth_vel_launch + kick_velocity
+
+def propagation_settings(mode=None):
+    """
+    The settings that determine a spacecraft propagation (used in cache keys and the launch grid).
+    Sun-only force models use the analytic Kepler propagator instead of REBOUND.
+    """
+    settings = propagation_config.integrator_config(mode or DEFAULT_MODE, exclude=LAUNCH_EXCLUDE)
+    if not settings["perturbers"]:
+        return {"mode": settings["mode"], "method": "kepler", "perturbers": [], "mu": kepler.GM_SUN_KM3_S2}
+    return {**settings, "method": "rebound"}
+
+def mitigation_trajectory_id(trajectory_params, start_time_et, mode=None):
+    """Registers a launch in trajectory_store; returns the ID that answers state queries along it."""
+    return trajectory_store.register(
+        "mitigation",
+        travel_time_days=int(trajectory_params['travel_time_days']),
+        delta_v_mps=int(trajectory_params['required_deltav']),
+        start_et=float(start_time_et),
+        mode=propagation_settings(mode)["mode"],
+    )
+
+def build_mitigation_trajectory(trajectory_id, travel_time_days, delta_v_mps, start_et, mode):
+    """trajectory_store builder: re-runs a launch's propagation, archiving it, without sampling for CZML."""
+    spice_kernels.ensure_kernels_loaded()
+    trajectory_params = {"travel_time_days": travel_time_days, "required_deltav": delta_v_mps}
+    earth_pos_launch, spacecraft_initial_velocity = compute_launch_state(trajectory_params, start_et, load_impactor_czml())
+    propagate_spacecraft(earth_pos_launch, spacecraft_initial_velocity, start_et, travel_time_days * 86400, mode,
+                         n_points=2, trajectory_id=trajectory_id)
+
+def generate_mitigation_czml(trajectory_params, start_time_et, mode=None):
+    """
+    Calculates the spacecraft trajectory using the "Hybrid Directional Kick" method.
+    This respects the user's chosen Delta-V to create different trajectory types.
+    `mode` selects a propagation_config mode (accuracy vs latency); None uses the default.
+    """
+    print("--- GENERATING SPACECRAFT CZML (Hybrid Directional Kick Method) ---")
+    spice_kernels.ensure_kernels_loaded()
+
+    # 1. GET PARAMETERS FROM USER'S CHOICE
+    travel_time_days = int(trajectory_params['travel_time_days'])
+    delta_v_mps = int(trajectory_params['required_deltav'])
+    travel_time_seconds = travel_time_days * 86400
+    arrival_time_et = start_time_et + travel_time_seconds
+    integrator = propagation_settings(mode)
+
+    # 2. ANSWER FROM THE PRECOMPUTED LAUNCH GRID WHEN THE LAUNCH FALLS INSIDE IT
+    with metrics.span("mitigation.grid_lookup"):
+        grid_positions = mitigation_grid.lookup(travel_time_days, delta_v_mps, start_time_et, integrator)
+    if grid_positions is not None:
+        times = np.linspace(0, travel_time_seconds, len(grid_positions))
+        with metrics.span("mitigation.czml_build"):
+            return build_mitigation_czml(start_time_et, arrival_time_et, times, grid_positions)
+
+    # 3. OTHERWISE COMPUTE THE LAUNCH STATE LIVE
+    with metrics.span("mitigation.file_load"):
+        impactor_czml_data = load_impactor_czml()
+    earth_pos_launch, spacecraft_initial_velocity = compute_launch_state(
+        trajectory_params, start_time_et, impactor_czml_data
+    )
     
     print(f"Chosen Δv: {delta_v_mps} m/s. Total initial velocity: {np.linalg.norm(spacecraft_initial_velocity):.2f} km/s")
 
-    # 4. PROPAGATE THE ORBIT WITH REBOUND
-    sim = rebound.Simulation()
-    sim.units = ('s', 'km', 'kg')
-    sim.G = 1.32712440018e11 # Sun's gravitational parameter in km^3/s^2
-    sim.add(m=1) # The Sun
+    # 4. LOOK UP THE PROPAGATION IN THE CACHE
+    # Identical launches (same state, epoch, duration and integrator) reuse the stored CZML.
+    cache_key = canonical_key(
+        "mitigation",
+        state=np.concatenate([earth_pos_launch, spacecraft_initial_velocity]),
+        start_et=start_time_et,
+        duration=travel_time_seconds,
+        n_samples=N_POINTS,
+        integrator=integrator,
+    )
+    with metrics.span("mitigation.cached_propagation"):
+        return PROPAGATION_CACHE.get_or_compute(
+            cache_key,
+            lambda: _propagate_mitigation_czml(earth_pos_launch, spacecraft_initial_velocity, start_time_et, arrival_time_et, travel_time_seconds, mode,
+                                               mitigation_trajectory_id(trajectory_params, start_time_et, mode)),
+        )
+
+def _propagate_mitigation_czml(earth_pos_launch, spacecraft_initial_velocity, start_time_et, arrival_time_et, travel_time_seconds, mode, trajectory_id=None):
+    """Integrates the spacecraft trajectory (archiving it under `trajectory_id`) and builds the mitigation CZML."""
+    with metrics.span("mitigation.integration"):
+        times, positions_m = propagate_spacecraft(earth_pos_launch, spacecraft_initial_velocity, start_time_et, travel_time_seconds, mode,
+                                                  trajectory_id=trajectory_id)
+    with metrics.span("mitigation.czml_build"):
+        return build_mitigation_czml(start_time_et, arrival_time_et, times, positions_m)
+
+def propagate_spacecraft(earth_pos_launch, spacecraft_initial_velocity, start_time_et, travel_time_seconds, mode=None, n_points=N_POINTS,
+                         trajectory_id=None):
+    """
+    Propagates the spacecraft from launch using the given propagation mode.
+    Returns the sample times (seconds from launch) and an (n_points, 3) array of positions in meters.
+    With a `trajectory_id`, the run is also saved to trajectory_store for later state queries.
+    """
+    times = np.linspace(0, travel_time_seconds, n_points)
+    trajectory_meta = {"start_et": float(start_time_et), "duration_s": float(travel_time_seconds), "frame": "ECLIPJ2000", "center": "SSB"}
+    if propagation_settings(mode)["method"] == "kepler":
+        if trajectory_id is not None:
+            sun_state = ephemeris_cache.lookup_state(10, start_time_et, ref='ECLIPJ2000')
+            sun_pos, sun_vel = np.array(sun_state[:3]), np.array(sun_state[3:])
+            trajectory_store.save_analytic(trajectory_id, earth_pos_launch - sun_pos, spacecraft_initial_velocity - sun_vel,
+                                           sun_pos, sun_vel, kepler.GM_SUN_KM3_S2, **trajectory_meta)
+        return times, _propagate_two_body(earth_pos_launch, spacecraft_initial_velocity, start_time_et, times)
+
+    # 5. PROPAGATE THE ORBIT WITH REBOUND
+    # The Sun sits at its SSB state; the mode decides the integrator and which planets perturb.
+    sim = propagation_config.build_heliocentric_simulation(mode or DEFAULT_MODE, start_time_et, exclude=LAUNCH_EXCLUDE)
 
     sim.add(
         m=0,
@@ -99,20 +225,31 @@ def generate_mitigation_czml(trajectory_params, start_time_et):
         vx=spacecraft_initial_velocity[0], vy=spacecraft_initial_velocity[1], vz=spacecraft_initial_velocity[2]
     )
     
-    # 5. INTEGRATE AND COLLECT POINTS FOR CZML
-    n_points = 200
-    times = np.linspace(0, travel_time_seconds, n_points)
-    cartesian_points = []
+    # 6. INTEGRATE AND COLLECT POINTS FOR CZML
+    if trajectory_id is not None:
+        archive = trajectory_store.start_archive(sim, trajectory_id, travel_time_seconds)
+    samples = sampling.sample_positions(sim, times, particle=sim.N - 1, scale=1000)
+    if trajectory_id is not None:
+        trajectory_store.finish_archive(sim, trajectory_id, archive, particle=sim.N - 1, seconds_per_time_unit=1.0,
+                                        scale=1000.0, velocity_scale=1000.0, **trajectory_meta)
+    return times, samples[:, 1:]
+
+def _propagate_two_body(earth_pos_launch, spacecraft_initial_velocity, start_time_et, times):
+    """
+    Sun-only force model: evaluates all sample times in one vectorized Kepler solve.
+    The Sun drifts uniformly from its SSB state, exactly as it does in a Sun + test-particle REBOUND run.
+    """
+    sun_state = ephemeris_cache.lookup_state(10, start_time_et, ref='ECLIPJ2000')
+    sun_pos, sun_vel = np.array(sun_state[:3]), np.array(sun_state[3:])
+    rel_positions, _ = kepler.propagate(earth_pos_launch - sun_pos, spacecraft_initial_velocity - sun_vel, times)
+    return (rel_positions + sun_pos + np.outer(times, sun_vel)) * 1000
+
+def build_mitigation_czml(start_time_et, arrival_time_et, times, positions_m):
+    """Builds the mitigation vehicle CZML from sample times (s) and positions (m)."""
+    # 7. CONSTRUCT THE CZML PACKET
+    # CZML format is a flat [TimeDeltaInSeconds, X_meters, Y_meters, Z_meters, ...], kept as an array for czml_encoder
+    cartesian_points = np.column_stack([times, positions_m]).ravel()
     epoch = spice.et2utc(start_time_et, 'ISOC', 3)
-    
-    for t in times:
-        sim.integrate(t)
-        particle = sim.particles[1]
-        pos_km = np.array([particle.x, particle.y, particle.z])
-        # CZML format is [TimeDeltaInSeconds, X_meters, Y_meters, Z_meters]
-        cartesian_points.extend([t, pos_km[0] * 1000, pos_km[1] * 1000, pos_km[2] * 1000])
-
-    # 6. CONSTRUCT THE CZML PACKET
     arrival_time_iso = spice.et2utc(arrival_time_et, 'ISOC', 3)
     mitigator_czml = [
         {
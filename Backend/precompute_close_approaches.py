@@ -0,0 +1,191 @@
+# In Backend/precompute_close_approaches.py
+"""
+Pre-computes the Earth close-approach table served by close_approaches.py.
+
+Every catalog object whose MOID allows an approach under
+close_approaches.MAX_DISTANCE_AU is propagated over
+[ASTROTERRA_APPROACHES_START, ASTROTERRA_APPROACHES_END), by default
+2020-2070. The propagation is REBOUND in the propagation_config mode
+ASTROTERRA_APPROACHES_MODE (default "accurate": IAS15 with the Sun and all
+planetary barycenters, the Earth-Moon barycenter included). The objects are
+massless test particles started from their osculating SBDB elements, and
+each block is integrated forward and backward from its element epoch. The
+Earth's barycentric state comes from SPICE on the same daily grid.
+
+Objects are split into blocks of CHUNK_OBJECTS that are processed in
+parallel, one simulation per block. Every local minimum of the Earth
+distance is then refined to the time of closest approach by straight-line
+relative motion, which is accurate over the half-day to the nearest sample.
+
+Accuracy: the force model has no Moon (only the Earth-Moon barycenter), no
+non-gravitational forces and no asteroid perturbers, and a deep approach
+makes the motion after it chaotic. Two-body motion, which this replaced,
+drifts from it by a median 0.004 AU after 5 years and 0.07 AU after 40 on
+the test catalog (0.16 AU after 5 years for objects with a planetary
+encounter), against the 0.05 AU cut.
+
+Output (read by close_approaches.py):
+  data/close_approaches.npz  one row per approach, sorted by time
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import spiceypy as spice
+
+import catalog_store
+import close_approaches
+import ephemeris_tiles
+import kepler
+import propagation_config
+import sampling
+import spice_kernels
+
+# --- Configuration ---
+SPAN_START_UTC = os.environ.get("ASTROTERRA_APPROACHES_START", "2020-01-01T00:00:00")
+SPAN_END_UTC = os.environ.get("ASTROTERRA_APPROACHES_END", "2070-01-01T00:00:00")
+PROPAGATION_MODE = os.environ.get("ASTROTERRA_APPROACHES_MODE", "accurate")
+STEP_SECONDS = 86400.0
+CHUNK_OBJECTS = 32  # Objects per worker task
+# SBDB elements are heliocentric ecliptic J2000, so the Earth is sampled in the same frame.
+REFERENCE_FRAME = "ECLIPJ2000"
+J2000_POSIX = ephemeris_tiles.parse_utc("2000-01-01T12:00:00")
+J2000_JD = 2451545.0
+
+_grid = {}
+
+
+def _init_worker(ets, earth_states, meta_kernel_path):
+    spice_kernels.ensure_kernels_loaded(meta_kernel_path)
+    _grid["ets"] = ets
+    _grid["earth"] = earth_states
+
+
+def _propagate_block(r0, v0, epoch_et, ets):
+    """
+    Barycentric states (km, km/s) of a block of objects at every ET of `ets`, as an (M, n, 6) array.
+    r0, v0 are heliocentric at each object's epoch_et. The block starts from its median epoch
+    (SBDB gives a whole query one epoch; any other object is moved there two-body) and is
+    integrated forward for the later samples and backward for the earlier ones.
+    """
+    t_ref = float(np.median(epoch_et))
+    r_ref, v_ref = kepler.propagate(r0, v0, (t_ref - epoch_et)[:, None])
+    states = np.empty((len(r0), ets.size, 6))
+    later = ets >= t_ref
+    for mask in (later, ~later):
+        if not mask.any():
+            continue
+        sim = propagation_config.build_heliocentric_simulation(PROPAGATION_MODE, t_ref)
+        sun, first = sim.particles[0], sim.N
+        for r, v in zip(r_ref[:, 0], v_ref[:, 0]):
+            sim.add(x=sun.x + r[0], y=sun.y + r[1], z=sun.z + r[2],
+                    vx=sun.vx + v[0], vy=sun.vy + v[1], vz=sun.vz + v[2])
+        index = np.flatnonzero(mask)
+        index = index[np.argsort(np.abs(ets[index] - t_ref), kind="stable")]  # Outwards from t_ref
+        snapshots = sampling.sample_snapshots(sim, ets[index] - t_ref)
+        states[:, index] = snapshots[:, first:].transpose(1, 0, 2)
+    return states
+
+
+def _find_approaches(rows, r0, v0, epoch_et):
+    """
+    Approaches under MAX_DISTANCE_AU for one block of objects.
+    Returns (row index, ET of closest approach, distance km, relative speed km/s) arrays.
+    """
+    ets, earth = _grid["ets"], _grid["earth"]
+    states = _propagate_block(r0, v0, epoch_et, ets)
+    rel_r = states[:, :, :3] - earth[None, :, :3]
+    rel_v = states[:, :, 3:] - earth[None, :, 3:]
+    d2 = np.einsum("mnk,mnk->mn", rel_r, rel_r)
+
+    # Interior local minima of the distance, including flat bottoms (first sample of the pair).
+    is_min = (d2[:, 1:-1] <= d2[:, :-2]) & (d2[:, 1:-1] < d2[:, 2:])
+    obj, k = np.nonzero(is_min)
+    k = k + 1
+    r, v = rel_r[obj, k], rel_v[obj, k]
+    speed2 = np.einsum("ij,ij->i", v, v)
+    # Straight-line closest approach, within one step of the sampled minimum.
+    dt = np.clip(-np.einsum("ij,ij->i", r, v) / speed2, -STEP_SECONDS, STEP_SECONDS)
+    distance = np.linalg.norm(r + v * dt[:, None], axis=1)
+    keep = distance <= close_approaches.MAX_DISTANCE_AU * close_approaches.AU_KM
+    return rows[obj[keep]], ets[k[keep]] + dt[keep], distance[keep], np.sqrt(speed2[keep])
+
+
+def _candidates(store):
+    """Row indexes of objects that can come within MAX_DISTANCE_AU (elliptic, MOID small or unknown)."""
+    columns = store.columns
+    elements_ok = np.all([np.isfinite(columns[name]) for name in ("a", "e", "i", "om", "w", "ma", "epoch")], axis=0)
+    moid = columns["moid"]
+    moid_ok = np.isnan(moid) | (moid <= close_approaches.MAX_DISTANCE_AU)
+    return np.flatnonzero(elements_ok & (columns["e"] < 1.0) & (columns["a"] > 0) & moid_ok)
+
+
+def precompute_close_approaches(meta_kernel_path=spice_kernels.META_KERNEL_PATH):
+    print(f"--- Starting Close-Approach Pre-computation ({PROPAGATION_MODE} mode) ---")
+    propagation_config.get_mode(PROPAGATION_MODE)
+    spice_kernels.ensure_kernels_loaded(meta_kernel_path)
+    store = catalog_store.load_catalog_store()
+    rows = _candidates(store)
+    print(f"{rows.size} of {store.size} objects have a MOID under {close_approaches.MAX_DISTANCE_AU} AU")
+
+    # --- Epoch states of every candidate, in one vectorized conversion ---
+    col = {name: store.columns[name][rows] for name in ("a", "e", "i", "om", "w", "ma", "epoch")}
+    r0, v0 = kepler.elements_to_state(
+        col["a"] * close_approaches.AU_KM, col["e"],
+        np.radians(col["i"]), np.radians(col["om"]), np.radians(col["w"]), np.radians(col["ma"]),
+    )
+    epoch_et = (col["epoch"] - J2000_JD) * 86400.0  # SBDB epochs are TDB Julian dates
+
+    # --- Earth on the search grid (barycentric, like the REBOUND simulations) ---
+    start_et = spice.str2et(SPAN_START_UTC)
+    end_et = spice.str2et(SPAN_END_UTC)
+    ets = np.arange(start_et, end_et + STEP_SECONDS, STEP_SECONDS)
+    earth_states = np.asarray(spice.spkezr("399", ets, REFERENCE_FRAME, "NONE", "0")[0])
+    print(f"Search grid: {ets.size} samples from {SPAN_START_UTC} to {SPAN_END_UTC}")
+
+    start_time = time.time()
+    found = []
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(ets, earth_states, meta_kernel_path)) as pool:
+        futures = [
+            pool.submit(_find_approaches, rows[k:k + CHUNK_OBJECTS], r0[k:k + CHUNK_OBJECTS],
+                        v0[k:k + CHUNK_OBJECTS], epoch_et[k:k + CHUNK_OBJECTS])
+            for k in range(0, rows.size, CHUNK_OBJECTS)
+        ]
+        for done, future in enumerate(futures, start=1):
+            found.append(future.result())
+            if done % 20 == 0 or done == len(futures):
+                print(f" -> {done}/{len(futures)} blocks done ({time.time() - start_time:.1f} s)")
+
+    index, et_ca, distance_km, speed = (np.concatenate(column) for column in zip(*found)) if found else [np.array([])] * 4
+    index = index.astype(np.int64)
+    # ET -> UTC: deltet with "ET" gives the offset at an ET epoch.
+    posix = J2000_POSIX + et_ca - np.array([spice.deltet(et, "ET") for et in et_ca])
+    order = np.argsort(posix, kind="stable")
+
+    table = {
+        "time": posix[order],
+        "dist_au": distance_km[order] / close_approaches.AU_KM,
+        "v_rel_km_s": speed[order],
+        "spkid": store.spkid[index[order]],
+        "name": np.array([name.strip() for name in store.names[index[order]]], dtype=str),
+        "classification": store.classification[index[order]],
+        "window": np.array([ephemeris_tiles.parse_utc(SPAN_START_UTC), ephemeris_tiles.parse_utc(SPAN_END_UTC)]),
+        "mode": np.array(PROPAGATION_MODE),
+    }
+    os.makedirs(os.path.dirname(close_approaches.TABLE_PATH), exist_ok=True)
+    tmp_path = close_approaches.TABLE_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **table)
+    os.replace(tmp_path, close_approaches.TABLE_PATH)
+
+    print(f"--- Pre-computation complete in {time.time() - start_time:.1f} s. "
+          f"{posix.size} approaches saved to {close_approaches.TABLE_PATH} ---")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-compute the Earth close-approach table.")
+    parser.add_argument("--meta-kernel", default=spice_kernels.META_KERNEL_PATH)
+    precompute_close_approaches(parser.parse_args().meta_kernel)
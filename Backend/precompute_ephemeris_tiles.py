@@ -0,0 +1,112 @@
+# In Backend/precompute_ephemeris_tiles.py
+"""
+Pre-computes the planet and Moon track tiles served by ephemeris_tiles.py.
+
+Each body is sampled at its own step (see ephemeris_tiles.TRACK_BODIES) over
+[ASTROTERRA_TILES_START, ASTROTERRA_TILES_END), by default 2000-2050. The
+span is split into TILE_DAYS tiles, which are computed in parallel, CHUNK_TILES
+tiles per worker task.
+
+Output (read by ephemeris_tiles.py):
+  data/ephemeris_tiles/<body>.npy  float64 [tile, sample, xyz] in meters, SSB-centred J2000
+  data/ephemeris_tiles/index.json  tile origin/length, per-body steps and kernel list
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import spiceypy as spice
+
+import ephemeris_tiles
+import spice_kernels
+
+# --- Configuration ---
+SPAN_START_UTC = os.environ.get("ASTROTERRA_TILES_START", "2000-01-01T00:00:00")
+SPAN_END_UTC = os.environ.get("ASTROTERRA_TILES_END", "2050-01-01T00:00:00")
+CHUNK_TILES = 12  # Tiles per worker task
+REFERENCE_FRAME = "J2000"
+OBSERVER = "0"  # Solar System Barycenter
+J2000_POSIX = ephemeris_tiles.parse_utc("2000-01-01T12:00:00")
+
+
+def _utc_to_et(posix_seconds):
+    """POSIX UTC seconds -> ephemeris time, without string parsing (deltet adds the leap-second offset)."""
+    utc = np.asarray(posix_seconds, dtype=np.float64) - J2000_POSIX
+    return utc + np.array([spice.deltet(t, "UTC") for t in utc.ravel()]).reshape(utc.shape)
+
+
+def _compute_chunk(naif_id, step_seconds, tile_starts):
+    """Samples one body over a block of tiles; both end points of every tile are included."""
+    offsets = np.arange(0, ephemeris_tiles.TILE_SECONDS + 1, step_seconds, dtype=np.float64)
+    ets = _utc_to_et(np.asarray(tile_starts)[:, None] + offsets[None, :])
+    positions_km, _ = spice.spkpos(str(naif_id), ets.ravel(), REFERENCE_FRAME, "NONE", OBSERVER)
+    return np.asarray(positions_km).reshape(len(tile_starts), len(offsets), 3) * 1000.0
+
+
+def precompute_ephemeris_tiles():
+    print("--- Starting Ephemeris Tile Pre-computation ---")
+    spice_kernels.ensure_kernels_loaded()
+
+    tile_seconds = ephemeris_tiles.TILE_SECONDS
+    # Snap the span to the global tile grid so tile numbers are stable between builds.
+    first_tile = int((ephemeris_tiles.parse_utc(SPAN_START_UTC) - ephemeris_tiles.ORIGIN_POSIX) // tile_seconds)
+    end_tile = -int(-(ephemeris_tiles.parse_utc(SPAN_END_UTC) - ephemeris_tiles.ORIGIN_POSIX) // tile_seconds)
+    origin = ephemeris_tiles.ORIGIN_POSIX + first_tile * tile_seconds
+    n_tiles = end_tile - first_tile
+    tile_starts = origin + np.arange(n_tiles) * tile_seconds
+    print(f"{len(ephemeris_tiles.TRACK_BODIES)} bodies x {n_tiles} tiles of {ephemeris_tiles.TILE_DAYS} days "
+          f"({ephemeris_tiles.format_utc(origin)} to {ephemeris_tiles.format_utc(origin + n_tiles * tile_seconds)})")
+
+    os.makedirs(ephemeris_tiles.TILES_DIR, exist_ok=True)
+    outputs, tmp_paths = {}, {}
+    for name, body in ephemeris_tiles.TRACK_BODIES.items():
+        samples_per_tile = tile_seconds // body["step_seconds"] + 1
+        tmp_paths[name] = os.path.join(ephemeris_tiles.TILES_DIR, f"{name}.tmp.npy")
+        outputs[name] = np.lib.format.open_memmap(
+            tmp_paths[name], mode="w+", dtype=np.float64, shape=(n_tiles, samples_per_tile, 3),
+        )
+
+    start_time = time.time()
+    with ProcessPoolExecutor(initializer=spice_kernels.ensure_kernels_loaded) as pool:
+        futures = {}
+        for name, body in ephemeris_tiles.TRACK_BODIES.items():
+            for k in range(0, n_tiles, CHUNK_TILES):
+                future = pool.submit(_compute_chunk, body["naif_id"], body["step_seconds"], tile_starts[k:k + CHUNK_TILES])
+                futures[future] = (name, k)
+        for done, future in enumerate(futures, start=1):
+            name, k = futures[future]
+            block = future.result()
+            outputs[name][k:k + len(block)] = block
+            if done % 50 == 0 or done == len(futures):
+                print(f" -> {done}/{len(futures)} chunks done ({time.time() - start_time:.1f} s)")
+
+    for name in outputs:
+        outputs[name].flush()
+    outputs.clear()
+    for name, tmp_path in tmp_paths.items():
+        os.replace(tmp_path, os.path.join(ephemeris_tiles.TILES_DIR, f"{name}.npy"))
+
+    index = {
+        "origin_posix": origin,
+        "tile_seconds": tile_seconds,
+        "n_tiles": n_tiles,
+        "frame": REFERENCE_FRAME,
+        "observer": OBSERVER,
+        "units": "m",
+        "bodies": {
+            name: {"naif_id": body["naif_id"], "step_seconds": body["step_seconds"]}
+            for name, body in ephemeris_tiles.TRACK_BODIES.items()
+        },
+        "kernels": [os.path.basename(path) for path in spice_kernels.kernel_paths()],
+    }
+    with open(ephemeris_tiles.INDEX_PATH, "w") as f:
+        json.dump(index, f, indent=2)
+
+    print(f"--- Pre-computation complete in {time.time() - start_time:.1f} s. "
+          f"Tiles saved to {ephemeris_tiles.TILES_DIR} ---")
+
+
+if __name__ == "__main__":
+    precompute_ephemeris_tiles()
@@ -1,6 +1,7 @@
 import numpy as np
 import datetime
-import json
+
+import czml_encoder
 
 # --- Simulation Parameters ---
 START_DATE_UTC = "2025-10-26T00:00:00"
@@ -25,11 +26,8 @@ def create_curved_trajectory(duration_days, num_steps):
     total_seconds = duration_days * 24 * 60 * 60
     times_seconds = np.linspace(0, total_seconds, num_steps)
 
-    positions_meters = []
-    for t_sec in times_seconds:
-        t = t_sec / total_seconds
-        current_pos = ((1 - t)**2 * start_position) + (2 * (1 - t) * t * control_point) + (t**2 * end_position)
-        positions_meters.append(current_pos.tolist())
+    t = (times_seconds / total_seconds)[:, None]
+    positions_meters = ((1 - t)**2 * start_position) + (2 * (1 - t) * t * control_point) + (t**2 * end_position)
 
     print("Trajectory calculated successfully.")
     return positions_meters, times_seconds
@@ -60,9 +58,8 @@ def create_czml_manually(positions_meters, times_seconds):
     czml_packets.append(document_packet)
 
     # --- Packet 2: The Impactor Packet (defines the asteroid) ---
-    cartesian_data = []
-    for i, pos in enumerate(positions_meters):
-        cartesian_data.extend([times_seconds[i], pos[0], pos[1], pos[2]])
+    # [TimeDeltaInSeconds, X, Y, Z] rows, written by czml_encoder without a Python list per sample
+    cartesian_data = np.column_stack([times_seconds, positions_meters])
 
     # --- THIS IS THE KEY CHANGE ---
     # Construct the full, absolute URL to the Bennu model on your frontend server.
@@ -91,7 +88,7 @@ def create_czml_manually(positions_meters, times_seconds):
                 }
             },
             "leadTime": 0,
-            "trailTime": times_seconds[-1]
+            "trailTime": float(times_seconds[-1])
         }
     }
     czml_packets.append(impactor_packet)
@@ -99,8 +96,8 @@ def create_czml_manually(positions_meters, times_seconds):
     # --- Write the data to a file ---
     # Saving it in 'Backend/static/impactor2025.czml'
     output_filename = 'static/impactor2025.czml'
-    with open(output_filename, 'w') as f:
-        json.dump(czml_packets, f, indent=4)
+    with open(output_filename, 'wb') as f:
+        f.write(czml_encoder.dumps(czml_packets))
 
     print(f"CZML file '{output_filename}' has been generated successfully.")
 
@@ -0,0 +1,137 @@
+# In Backend/precompute_mitigation_grid.py
+"""
+Pre-computes the mitigation vehicle trajectory for every trajectory choice
+offered by the frontend at hourly launch times over the impactor window, using the default mitigation propagation mode.
+
+Output (read by mitigation_grid.py):
+  data/mitigation_grid/positions.npy  float64 [choice, launch, sample, xyz] in meters
+  data/mitigation_grid/index.json     grid axes, integrator settings, source file hash and
+                                      the measured interpolation error
+
+The interpolation error is measured after the sweep: ERROR_SAMPLES launches
+half-way between grid launches (where linear interpolation is worst) are
+propagated directly and compared, sample by sample, with the interpolated
+positions.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import mitigation_grid
+import phase3_trajectory as p3_traj
+import spice_kernels
+
+# --- Configuration ---
+# Mirrors the porkchop buttons in Frontend/index.html (data-time / data-deltav).
+TRAJECTORY_CHOICES = [
+    {"travel_time_days": 25, "required_deltav": 7500},
+    {"travel_time_days": 45, "required_deltav": 5500},
+    {"travel_time_days": 70, "required_deltav": 4200},
+]
+LAUNCH_STEP_SECONDS = 3600  # One launch solution per hour
+CHUNK_SIZE = 48  # Launches per worker task
+ERROR_SAMPLES = 48  # Half-way launches checked per choice
+IMPACTOR_CZML_PATH = mitigation_grid.IMPACTOR_CZML_PATH
+
+_impactor_czml = None
+
+
+def _init_worker():
+    global _impactor_czml
+    spice_kernels.ensure_kernels_loaded()
+    _impactor_czml = p3_traj.load_impactor_czml()
+
+
+def _compute_chunk(choice, launch_ets):
+    """Propagates one trajectory choice for a block of launch times."""
+    travel_time_seconds = choice["travel_time_days"] * 86400
+    result = np.empty((len(launch_ets), p3_traj.N_POINTS, 3), dtype=np.float64)
+    for k, launch_et in enumerate(launch_ets):
+        pos, vel = p3_traj.compute_launch_state(choice, launch_et, _impactor_czml)
+        _, result[k] = p3_traj.propagate_spacecraft(pos, vel, launch_et, travel_time_seconds)
+    return result
+
+
+def precompute_mitigation_grid():
+    print("--- Starting Mitigation Launch Grid Pre-computation ---")
+    spice_kernels.ensure_kernels_loaded()
+    impactor_czml = p3_traj.load_impactor_czml()
+    interval = impactor_czml[0]["clock"]["interval"]
+    window_start, window_end = (p3_traj.czml_epoch_to_et(t) for t in interval.split("/"))
+    launch_ets = np.arange(window_start, window_end + 1, LAUNCH_STEP_SECONDS)
+    n_launch = len(launch_ets)
+    print(f"{len(TRAJECTORY_CHOICES)} choices x {n_launch} launches "
+          f"({interval}, every {LAUNCH_STEP_SECONDS} s)")
+
+    os.makedirs(mitigation_grid.GRID_DIR, exist_ok=True)
+    tmp_positions_path = mitigation_grid.POSITIONS_PATH + ".tmp.npy"
+    positions = np.lib.format.open_memmap(
+        tmp_positions_path, mode="w+", dtype=np.float64,
+        shape=(len(TRAJECTORY_CHOICES), n_launch, p3_traj.N_POINTS, 3),
+    )
+
+    start_time = time.time()
+    with ProcessPoolExecutor(initializer=_init_worker) as pool:
+        futures = {}
+        for c, choice in enumerate(TRAJECTORY_CHOICES):
+            for k in range(0, n_launch, CHUNK_SIZE):
+                future = pool.submit(_compute_chunk, choice, launch_ets[k:k + CHUNK_SIZE])
+                futures[future] = (c, k)
+        for done, future in enumerate(futures, start=1):
+            c, k = futures[future]
+            block = future.result()
+            positions[c, k:k + len(block)] = block
+            if done % 20 == 0 or done == len(futures):
+                print(f" -> {done}/{len(futures)} chunks done ({time.time() - start_time:.1f} s)")
+    positions.flush()
+
+    print(f"Measuring the interpolation error at {ERROR_SAMPLES} half-way launches per choice...")
+    interpolation_error = []
+    with ProcessPoolExecutor(initializer=_init_worker) as pool:
+        k = np.linspace(0, n_launch - 2, ERROR_SAMPLES).astype(int)
+        midpoints = launch_ets[k] + LAUNCH_STEP_SECONDS / 2.0
+        futures = [pool.submit(_compute_chunk, choice, midpoints) for choice in TRAJECTORY_CHOICES]
+        for c, (choice, future) in enumerate(zip(TRAJECTORY_CHOICES, futures)):
+            interpolated = 0.5 * (positions[c, k] + positions[c, k + 1])
+            errors = np.linalg.norm(future.result() - interpolated, axis=-1).max(axis=-1)
+            interpolation_error.append({
+                "travel_time_days": choice["travel_time_days"],
+                "required_deltav": choice["required_deltav"],
+                "max_m": float(errors.max()),
+                "median_m": float(np.median(errors)),
+            })
+            print(f" -> {choice['travel_time_days']} d: max {errors.max() / 1000:.3f} km, "
+                  f"median {np.median(errors) / 1000:.3f} km")
+    del positions
+
+    with open(IMPACTOR_CZML_PATH, "rb") as f:
+        impactor_sha256 = hashlib.sha256(f.read()).hexdigest()
+    index = {
+        "choices": TRAJECTORY_CHOICES,
+        "launch_start_et": float(launch_ets[0]),
+        "launch_step_seconds": LAUNCH_STEP_SECONDS,
+        "n_launch": n_launch,
+        "n_points": p3_traj.N_POINTS,
+        "integrator": p3_traj.propagation_settings(),
+        "impactor_sha256": impactor_sha256,
+        "interpolation_error": {
+            "launch_offset_seconds": LAUNCH_STEP_SECONDS / 2.0,
+            "samples_per_choice": ERROR_SAMPLES,
+            "max_m": max(entry["max_m"] for entry in interpolation_error),
+            "choices": interpolation_error,
+        },
+    }
+    os.replace(tmp_positions_path, mitigation_grid.POSITIONS_PATH)
+    with open(mitigation_grid.INDEX_PATH, "w") as f:
+        json.dump(index, f, indent=2)
+
+    print(f"--- Pre-computation complete in {time.time() - start_time:.1f} s. "
+          f"Grid saved to {mitigation_grid.GRID_DIR} ---")
+
+
+if __name__ == "__main__":
+    precompute_mitigation_grid()
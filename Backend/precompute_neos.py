@@ -1,9 +1,12 @@
 # In Backend/precompute_neos.py
 
-import requests
+import httpx
 import json
 import os
-import time
+
+import catalog_enrichment
+import catalog_store
+import sbdb_client
 
 # --- Configuration ---
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -11,14 +14,6 @@ STATIC_DIR = os.path.join(PROJECT_ROOT, "static")
 NEO_LIST_OUTPUT_PATH = os.path.join(STATIC_DIR, "neo_list.json")
 CURATED_LIST_OUTPUT_PATH = os.path.join(STATIC_DIR, "curated_neo_list.json")
 
-# --- Helper Function (copied from app.py) ---
-def get_asteroid_classification(h_mag, is_pha):
-    if h_mag is not None:
-        if h_mag < 18.0: return "PLANET_KILLER"
-        if h_mag < 22.0: return "CITY_KILLER"
-    if is_pha: return "PHA"
-    return "REGULAR"
-
 # --- Main Pre-computation Logic ---
 def precompute_neo_lists():
     """
@@ -32,29 +27,22 @@ def precompute_neo_lists():
 
     try:
         # --- Fetch the data from JPL API ---
-        # We fetch a larger list once to get enough data for both outputs.
-        limit = 500
-        url = "https://ssd-api.jpl.nasa.gov/sbdb_query.api"
-        params = {"limit": limit, "fields": "spkid,full_name,H,pha", "sb-class": "APO"}
-        
-        print(f"Fetching {limit} NEOs from JPL API... (This may take a moment)")
-        start_time = time.time()
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status() # Will raise an error for 4xx/5xx responses
-        end_time = time.time()
-        print(f"JPL API request completed in {end_time - start_time:.2f} seconds.")
-        
-        raw_data = response.json()
+        # The full APO list, paged through concurrent pooled requests (see sbdb_client.py).
+        print("Fetching NEOs from JPL API... (This may take a moment)")
+        raw_data = sbdb_client.query(["spkid", "full_name", "H", "pha"], {"sb-class": "APO"})
+        stats = raw_data["stats"]
+        print(f"JPL API: {raw_data['count']} NEOs in {stats['pages']} pages, completed in {stats['seconds']:.2f} seconds.")
         
         # --- Process the data for both lists simultaneously ---
         full_neo_list = []
         planet_killers, city_killers = [], []
 
-        for item in raw_data.get("data", []):
-            spkid, fullname, h, pha = item
-            h_mag = float(h) if h is not None else None
-            is_pha = pha == 'Y'
-            classification = get_asteroid_classification(h_mag, is_pha)
+        rows = raw_data.get("data", [])
+        codes = catalog_enrichment.classify(
+            catalog_store.float_column([item[2] for item in rows]), [item[3] == 'Y' for item in rows],
+        )
+        for (spkid, fullname, _, _), code in zip(rows, codes):
+            classification = catalog_store.CLASSIFICATIONS[code]
 
             # 1. Add to the full list
             full_neo_list.append({
@@ -80,7 +68,7 @@ def precompute_neo_lists():
             json.dump(curated_list, f, indent=2)
         print(f" -> Successfully saved curated list to {CURATED_LIST_OUTPUT_PATH}")
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"\nFATAL ERROR: Failed to fetch data from JPL API. Error: {e}")
         print("Pre-computation failed. Please check your internet connection and try again.")
         return
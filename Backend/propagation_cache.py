@@ -0,0 +1,184 @@
+# In Backend/propagation_cache.py
+"""
+Content-addressed cache for propagation results.
+
+Results are keyed by a SHA-256 hash of the canonicalized inputs (initial
+state/elements, start ET, duration, sample count and integrator settings).
+Lookups go through an in-memory LRU tier first and a size-bounded on-disk
+tier second; hits, misses and evictions are counted per tier.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "propagation_cache")
+MEMORY_MAX_ENTRIES = int(os.environ.get("ASTROTERRA_CACHE_MEMORY_ENTRIES", 128))
+DISK_MAX_BYTES = int(os.environ.get("ASTROTERRA_CACHE_DISK_MB", 256)) * 1024 * 1024
+
+
+def _canonical(value):
+    """Converts inputs to plain JSON types so equal inputs always serialize identically."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        # repr() round-trips float64 exactly; -0.0 and 0.0 hash the same.
+        return repr(float(value) + 0.0)
+    return value
+
+
+def _json_default(value):
+    """
+    Lets results hold NumPy arrays (e.g. CZML samples). They are stored as flat lists, as
+    czml_encoder writes them, so a disk hit equals a memory hit.
+    """
+    if isinstance(value, np.ndarray):
+        return value.ravel().tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def canonical_key(namespace, **inputs):
+    """Returns the content hash identifying a propagation with the given inputs."""
+    payload = json.dumps([namespace, _canonical(inputs)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PropagationCache:
+    """Two-tier (memory LRU + bounded disk) cache of JSON-serializable results."""
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_max_entries=MEMORY_MAX_ENTRIES, disk_max_bytes=DISK_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "memory_evictions": 0, "disk_evictions": 0, "disk_bytes": 0,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.stats["disk_bytes"] = sum(size for _, size, _ in self._disk_entries())
+
+    # --- Disk tier ---
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _disk_entries(self):
+        """Yields (path, size, last_access) for every entry in the disk tier."""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)  # mtime doubles as the LRU timestamp for disk eviction
+        return value
+
+    def _disk_put(self, key, value):
+        data = json.dumps(value, default=_json_default).encode("utf-8")
+        if len(data) > self.disk_max_bytes:
+            return
+        path = self._path(key)
+        replaced = os.path.getsize(path) if os.path.exists(path) else 0
+        # A unique temp name: thread ids repeat across forked workers that share the directory.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.stats["disk_bytes"] += len(data) - replaced
+            if self.stats["disk_bytes"] > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        """Removes least recently used files until the disk tier fits its budget."""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.stats["disk_evictions"] += 1
+        self.stats["disk_bytes"] = total
+
+    # --- Memory tier ---
+    def _memory_put(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max_entries:
+                self._memory.popitem(last=False)
+                self.stats["memory_evictions"] += 1
+
+    # --- Public API ---
+    def get(self, key):
+        """Returns the cached value or None. Cached values must be treated as read-only."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+        value = self._disk_get(key)
+        if value is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["disk_hits"] += 1
+        self._memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached result for `key`, calling `compute()` and storing its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "memory_entries": len(self._memory),
+                "hit_rate": (lookups - self.stats["misses"]) / lookups if lookups else 0.0,
+            }
+
+
+# Shared instance used by the propagation modules.
+PROPAGATION_CACHE = PropagationCache()
@@ -0,0 +1,241 @@
+# In Backend/propagation_config.py
+"""
+Shared propagation settings for every REBOUND run in the backend.
+
+Callers pick a named mode per request to trade accuracy for latency:
+
+  fast         WHFast, fixed 6 h step, Sun-only force model. Sun-only spacecraft
+               propagations skip REBOUND and use the analytic Kepler path (kepler.py).
+  interactive  IAS15 with a loose tolerance (1e-6), Sun + Venus, Mars and Jupiter.
+  accurate     IAS15 at its default tolerance (1e-9), Sun + all planetary barycenters.
+
+Perturber states come from SPICE (via ephemeris_cache) at the start epoch. Each mode's position
+error is measured against the SPICE ephemerides by propagating real planets
+as test particles, and against a tight-tolerance reference for a spacecraft
+launched from Earth (`python propagation_config.py [--meta-kernel PATH]`); the
+results, with the kernels they were measured against, are written to
+data/propagation_error_bounds.json and served with the mode list. The
+`target_error_km` values below are the budgets those measurements are
+checked against.
+"""
+import json
+import os
+
+import spiceypy as spice
+
+import ephemeris_cache
+import sampling
+import spice_kernels
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+ERROR_BOUNDS_PATH = os.path.join(PROJECT_ROOT, "data", "propagation_error_bounds.json")
+
+GM_SUN_KM3_S2 = 1.32712440018e11
+
+# GM of the perturbing bodies (km^3/s^2, DE440), keyed by NAIF ID.
+PERTURBER_GM = {
+    1: 22031.868551,       # Mercury barycenter
+    2: 324858.592,         # Venus barycenter
+    3: 403503.235502,      # Earth-Moon barycenter
+    4: 42828.375816,       # Mars barycenter
+    5: 126712764.1,        # Jupiter barycenter
+    6: 37940584.8418,      # Saturn barycenter
+    7: 5794556.4,          # Uranus barycenter
+    8: 6836527.10058,      # Neptune barycenter
+}
+
+PROPAGATION_MODES = {
+    "fast": {
+        "integrator": "whfast",
+        "dt_seconds": 6 * 3600.0,
+        "perturbers": [],
+        "target_error_km": 50000.0,
+        "description": "Sun only: analytic Kepler propagation where possible, otherwise WHFast with a 6 h step. Lowest latency.",
+    },
+    "interactive": {
+        "integrator": "ias15",
+        "epsilon": 1e-6,
+        "perturbers": [2, 4, 5],
+        "target_error_km": 5000.0,
+        "description": "IAS15 with a loose tolerance, Sun + Venus, Mars and Jupiter.",
+    },
+    "accurate": {
+        "integrator": "ias15",
+        "epsilon": 1e-9,
+        "perturbers": [1, 2, 3, 4, 5, 6, 7, 8],
+        "target_error_km": 100.0,
+        "description": "IAS15 at default tolerance, Sun + all planetary barycenters from SPICE.",
+    },
+}
+DEFAULT_MODE = "interactive"
+
+
+def get_mode(name=None):
+    """Returns the settings of a named mode, raising ValueError for unknown names."""
+    name = name or DEFAULT_MODE
+    if name not in PROPAGATION_MODES:
+        raise ValueError(f"Unknown propagation mode '{name}'. Choose one of {list(PROPAGATION_MODES)}.")
+    return PROPAGATION_MODES[name]
+
+
+def integrator_config(name=None, exclude=()):
+    """The settings that determine a propagation's result (used in cache keys and grid indexes)."""
+    name = name or DEFAULT_MODE
+    mode = get_mode(name)
+    config = {key: value for key, value in mode.items() if key not in ("description", "target_error_km")}
+    config["perturbers"] = [p for p in mode["perturbers"] if p not in exclude]
+    return {"mode": name, **config}
+
+
+def configure_integrator(sim, name=None, seconds_per_time_unit=1.0):
+    """Applies a mode's integrator and tolerance/step size to a REBOUND simulation."""
+    mode = get_mode(name)
+    sim.integrator = mode["integrator"]
+    if mode["integrator"] == "whfast":
+        sim.dt = mode["dt_seconds"] / seconds_per_time_unit
+    elif "epsilon" in mode:
+        sim.ri_ias15.epsilon = mode["epsilon"]
+
+
+def add_perturbers(sim, name, et, ref="ECLIPJ2000", km_per_length_unit=1.0, seconds_per_time_unit=1.0, exclude=()):
+    """
+    Adds the mode's perturbing planets at their SPICE states (wrt the SSB) to `sim`.
+    Masses are in solar masses, matching simulations where the Sun has m=1.
+    """
+    velocity_scale = seconds_per_time_unit / km_per_length_unit
+    for body in integrator_config(name, exclude)["perturbers"]:
+        state = ephemeris_cache.lookup_state(body, et, ref=ref)
+        sim.add(
+            m=PERTURBER_GM[body] / GM_SUN_KM3_S2,
+            x=state[0] / km_per_length_unit, y=state[1] / km_per_length_unit, z=state[2] / km_per_length_unit,
+            vx=state[3] * velocity_scale, vy=state[4] * velocity_scale, vz=state[5] * velocity_scale,
+        )
+
+
+def build_heliocentric_simulation(name, et, ref="ECLIPJ2000", exclude=()):
+    """
+    Creates a REBOUND simulation in km/s units holding the Sun (at its SSB state) and
+    the mode's perturbers. Test particles added afterwards are massless.
+    """
+    import rebound  # deferred: only REBOUND-backed modes pay for the import
+
+    sim = rebound.Simulation()
+    sim.units = ('s', 'km', 'kg')
+    sim.G = GM_SUN_KM3_S2
+    sun_state = ephemeris_cache.lookup_state(10, et, ref=ref)
+    sim.add(m=1, x=sun_state[0], y=sun_state[1], z=sun_state[2], vx=sun_state[3], vy=sun_state[4], vz=sun_state[5])
+    add_perturbers(sim, name, et, ref=ref, exclude=exclude)
+    sim.N_active = sim.N
+    configure_integrator(sim, name)
+    return sim
+
+
+def load_error_bounds():
+    """Returns the measured error bounds per mode, or an empty dict if they were never measured."""
+    if not os.path.exists(ERROR_BOUNDS_PATH):
+        return {}
+    with open(ERROR_BOUNDS_PATH, "r") as f:
+        return json.load(f)
+
+
+def describe_modes():
+    """Mode list for the API, including measured error bounds where available."""
+    bounds = load_error_bounds()
+    return {
+        "default": DEFAULT_MODE,
+        "modes": {
+            name: {**mode, "measured": bounds.get(name)} for name, mode in PROPAGATION_MODES.items()
+        },
+    }
+
+
+# --- Error bound measurement ---
+SPACECRAFT_REFERENCE_EPSILON = 1e-12
+
+
+def _spacecraft_reference(start_et, state0, times, exclude):
+    """Spacecraft positions (km) from IAS15 at a tight tolerance with every perturber but `exclude`."""
+    sim = build_heliocentric_simulation("accurate", start_et, exclude=exclude)
+    sim.ri_ias15.epsilon = SPACECRAFT_REFERENCE_EPSILON
+    sim.add(m=0, x=state0[0], y=state0[1], z=state0[2], vx=state0[3], vy=state0[4], vz=state0[5])
+    return sampling.sample_positions(sim, times, particle=sim.N - 1)[:, 1:]
+
+
+def measure_error_bounds(start_utc="2025-10-26T00:00:00", horizon_days=70, test_bodies=(2, 3, 4),
+                         spacecraft_delta_v_kms=5.5):
+    """
+    Propagates real bodies in each mode and compares against SPICE.
+    The test body is removed from the perturber list and added from its own initial state. Returns the max position error in km.
+
+    A spacecraft launched from Earth (Earth's state plus `spacecraft_delta_v_kms` along its velocity) is
+    propagated through phase3_trajectory.propagate_spacecraft and compared with a tight-tolerance IAS15
+    run of the full force model; test bodies alone never start next to a perturber.
+    """
+    import time
+    import numpy as np
+    import phase3_trajectory as p3_traj
+
+    start_et = spice.str2et(start_utc)
+    times = np.linspace(0.0, horizon_days * 86400.0, horizon_days + 1)
+    earth0, _ = spice.spkgeo(targ=399, et=start_et, ref="ECLIPJ2000", obs=0)
+    spacecraft0 = np.concatenate([earth0[:3], earth0[3:] * (1.0 + spacecraft_delta_v_kms / np.linalg.norm(earth0[3:]))])
+    spacecraft_truth = _spacecraft_reference(start_et, spacecraft0, times, p3_traj.LAUNCH_EXCLUDE)
+    earth_truth = np.array([spice.spkgeo(targ=399, et=start_et + t, ref="ECLIPJ2000", obs=0)[0][:3] for t in times])
+    results = {}
+    for name in PROPAGATION_MODES:
+        max_error_km, elapsed = 0.0, 0.0
+        for body in test_bodies:
+            truth = np.array([spice.spkgeo(targ=body, et=start_et + t, ref="ECLIPJ2000", obs=0)[0][:3] for t in times])
+            state0, _ = spice.spkgeo(targ=body, et=start_et, ref="ECLIPJ2000", obs=0)
+            t0 = time.perf_counter()
+            sim = build_heliocentric_simulation(name, start_et, exclude=(body,))
+            # The planet keeps its mass: as a test particle the Sun would miss its reflex (~260 km for Venus),
+            # an error massless asteroids do not have.
+            sim.add(m=PERTURBER_GM[body] / GM_SUN_KM3_S2, x=state0[0], y=state0[1], z=state0[2],
+                    vx=state0[3], vy=state0[4], vz=state0[5])
+            sim.N_active = sim.N
+            positions = sampling.sample_positions(sim, times, particle=sim.N - 1)[:, 1:]
+            elapsed += time.perf_counter() - t0
+            max_error_km = max(max_error_km, float(np.max(np.linalg.norm(positions - truth, axis=1))))
+
+        t0 = time.perf_counter()
+        _, spacecraft_m = p3_traj.propagate_spacecraft(spacecraft0[:3], spacecraft0[3:], start_et, times[-1],
+                                                       mode=name, n_points=times.size)
+        spacecraft_seconds = time.perf_counter() - t0
+        spacecraft_km = spacecraft_m / 1000.0
+        spacecraft_error_km = float(np.max(np.linalg.norm(spacecraft_km - spacecraft_truth, axis=1)))
+        results[name] = {
+            "max_error_km": max_error_km,
+            "spacecraft_max_error_km": spacecraft_error_km,
+            "spacecraft_final_earth_distance_km": float(np.linalg.norm(spacecraft_km[-1] - earth_truth[-1])),
+            "within_target": max(max_error_km, spacecraft_error_km) <= PROPAGATION_MODES[name]["target_error_km"],
+            "mean_runtime_ms": 1000.0 * elapsed / len(test_bodies),
+            "spacecraft_runtime_ms": 1000.0 * spacecraft_seconds,
+            "horizon_days": horizon_days,
+            "test_bodies": list(test_bodies),
+            "spacecraft_delta_v_kms": spacecraft_delta_v_kms,
+            "start_utc": start_utc,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure each propagation mode's error against SPICE.")
+    parser.add_argument("--meta-kernel", default=spice_kernels.META_KERNEL_PATH)
+    args = parser.parse_args()
+    spice_kernels.ensure_kernels_loaded(args.meta_kernel)
+    print("--- Measuring propagation mode error bounds against SPICE ---")
+    bounds = measure_error_bounds()
+    for result in bounds.values():
+        result["kernels"] = spice_kernels.status()["kernels"]
+    for mode_name, result in bounds.items():
+        print(f" -> {mode_name:12s} max error {result['max_error_km']:12.3f} km, "
+              f"{result['mean_runtime_ms']:.2f} ms per run; spacecraft {result['spacecraft_max_error_km']:12.3f} km, "
+              f"{result['spacecraft_runtime_ms']:.2f} ms")
+    os.makedirs(os.path.dirname(ERROR_BOUNDS_PATH), exist_ok=True)
+    with open(ERROR_BOUNDS_PATH, "w") as f:
+        json.dump(bounds, f, indent=2)
+    print(f"--- Saved to {ERROR_BOUNDS_PATH} ---")
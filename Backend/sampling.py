@@ -0,0 +1,62 @@
+# In Backend/sampling.py
+"""
+Shared sampling loop for REBOUND propagations.
+
+Positions (and, for `sample_states`, velocities) of all particles are copied
+straight into a preallocated float64 buffer with `serialize_particle_data` at
+every sample time, and relative positions and unit scaling are applied once
+to the whole array afterwards.
+"""
+import numpy as np
+
+
+def sample_positions(sim, times, particle, relative_to=None, scale=1.0):
+    """
+    Integrates `sim` to each of `times` and returns an (n_samples, 4) float64 array of
+    [t, x, y, z] for `particle`, optionally relative to particle `relative_to`.
+    Positions are multiplied by `scale` (e.g. 1000 for km -> m).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    snapshots = np.empty((len(times), sim.N, 3), dtype=np.float64)
+    for k, t in enumerate(times):
+        sim.integrate(t)
+        sim.serialize_particle_data(xyz=snapshots[k])
+
+    samples = np.empty((len(times), 4), dtype=np.float64)
+    samples[:, 0] = times
+    samples[:, 1:] = snapshots[:, particle]
+    if relative_to is not None:
+        samples[:, 1:] -= snapshots[:, relative_to]
+    samples[:, 1:] *= scale
+    return samples
+
+
+def sample_states(sim, times, particle, relative_to=None, scale=1.0, velocity_scale=1.0):
+    """
+    Like `sample_positions`, with velocities: returns an (n_samples, 7) float64 array of
+    [t, x, y, z, vx, vy, vz]. Velocities are multiplied by `velocity_scale`.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    snapshots = sample_snapshots(sim, times)
+
+    samples = np.empty((len(times), 7), dtype=np.float64)
+    samples[:, 0] = times
+    samples[:, 1:] = snapshots[:, particle]
+    if relative_to is not None:
+        samples[:, 1:] -= snapshots[:, relative_to]
+    samples[:, 1:4] *= scale
+    samples[:, 4:] *= velocity_scale
+    return samples
+
+
+def sample_snapshots(sim, times):
+    """
+    Integrates `sim` to each of `times` (which may run backwards from sim.t) and returns the
+    states of all particles as an (n_samples, sim.N, 6) float64 array of [x, y, z, vx, vy, vz].
+    """
+    times = np.asarray(times, dtype=np.float64)
+    snapshots = np.empty((len(times), sim.N, 6), dtype=np.float64)
+    for k, t in enumerate(times):
+        sim.integrate(t)
+        sim.serialize_particle_data(xyzvxvyvz=snapshots[k])
+    return snapshots
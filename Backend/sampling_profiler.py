@@ -0,0 +1,120 @@
+# In Backend/sampling_profiler.py
+"""
+In-process sampling profiler for diagnosing a live worker without a restart.
+
+A daemon thread wakes every `interval` seconds, snapshots every other
+thread's Python stack with sys._current_frames() and counts identical stacks.
+That covers the event loop thread and the threadpool workers alike. The
+result is in the collapsed-stack format ("thread;outer;...;inner count") read
+by flamegraph.pl, speedscope and similar tools.
+
+Modes:
+  wall  every thread is counted on every tick, whether it runs or waits.
+  cpu   each stack is weighted by the CPU time (microseconds) its thread used
+        since the previous tick, so idle and blocked threads drop out.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+MODES = ("wall", "cpu")
+DEFAULT_INTERVAL_S = 0.005
+MAX_DURATION_S = 60.0
+
+# Only one profile may run at a time per process.
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame):
+    """Returns the stack of `frame` as labels from the outermost call to the innermost."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _thread_cpu_time(thread_id):
+    """CPU seconds used by a thread, or None if its clock cannot be read."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (OSError, ValueError, OverflowError):
+        return None
+
+
+class SamplingProfiler:
+    """Samples every thread's stack from a background thread and aggregates collapsed stacks."""
+
+    def __init__(self, mode="wall", interval=DEFAULT_INTERVAL_S):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}'. Choose one of {list(MODES)}.")
+        if mode == "cpu" and not hasattr(time, "pthread_getcpuclockid"):
+            raise ValueError("CPU mode needs per-thread CPU clocks, which this platform does not provide.")
+        self.mode = mode
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_cpu = {}
+
+    def _sample(self, own_id):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            weight = 1
+            if self.mode == "cpu":
+                cpu = _thread_cpu_time(thread_id)
+                previous = self._last_cpu.get(thread_id)
+                self._last_cpu[thread_id] = cpu
+                if cpu is None or previous is None:
+                    continue
+                weight = int(round((cpu - previous) * 1e6))
+                if weight <= 0:
+                    continue
+            stack = [names.get(thread_id, f"thread-{thread_id}")] + _collapse(frame)
+            self.stacks[";".join(stack)] += weight
+        self.samples += 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample(own_id)
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_tick = time.perf_counter()  # fell behind; don't try to catch up
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self):
+        """The aggregated stacks in collapsed format, heaviest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def acquire():
+    """Reserves the profiler for one run; returns False if another profile is in progress."""
+    return _profile_lock.acquire(blocking=False)
+
+
+def release():
+    _profile_lock.release()
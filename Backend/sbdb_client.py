@@ -0,0 +1,261 @@
+# In Backend/sbdb_client.py
+"""
+Client for the JPL SBDB APIs, for full-catalog ingestion.
+
+`query()` pages through an sbdb_query.api result set with `limit`/`limit-from`.
+CONCURRENCY workers share one pooled httpx.AsyncClient and take page offsets
+from a shared counter until a page comes back short. Each response body is
+streamed and its "data" rows are decoded as the bytes arrive (RowStream), so
+a page is never held as one large string or dict.
+
+Failed requests (transport errors, 429, 5xx) are retried with exponential
+backoff and jitter. A 429 or 503 with Retry-After pauses every worker through
+the shared rate limiter, which also spaces requests to MAX_REQUESTS_PER_SECOND.
+
+`fetch_object()` reads one sbdb.api record over a pooled synchronous client,
+with the same retry rules.
+
+Set ASTROTERRA_SBDB_URL to point the client at fixture_server.py for offline runs.
+"""
+import asyncio
+import codecs
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+
+# --- Configuration ---
+SBDB_BASE_URL = os.environ.get("ASTROTERRA_SBDB_URL", "https://ssd-api.jpl.nasa.gov")
+PAGE_SIZE = 2000
+CONCURRENCY = 4
+MAX_REQUESTS_PER_SECOND = 5.0
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RowStream:
+    """
+    Incremental decoder for the "data" array of an SBDB query response.
+    `feed()` takes text chunks and returns the rows completed so far; every other
+    top-level key (fields, count, signature) is kept and parsed by `finish()`.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._head = []
+        self._state = "head"  # head -> rows -> tail
+        self._tail = []
+
+    def feed(self, text):
+        self._buffer += text
+        rows = []
+        if self._state == "head":
+            key = self._buffer.find('"data"')
+            if key < 0:
+                # Keep a short suffix in case the key is split across chunks.
+                self._head.append(self._buffer[:-8])
+                self._buffer = self._buffer[-8:]
+                return rows
+            bracket = self._buffer.find("[", key)
+            if bracket < 0:
+                return rows
+            self._head.append(self._buffer[:bracket])
+            self._buffer = self._buffer[bracket + 1:]
+            self._state = "rows"
+        if self._state == "rows":
+            pos, n = 0, len(self._buffer)
+            while True:
+                while pos < n and self._buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos == n:
+                    break
+                if self._buffer[pos] == "]":
+                    self._state = "tail"
+                    self._tail.append(self._buffer[pos + 1:])
+                    self._buffer = ""
+                    return rows
+                try:
+                    row, end = self._decoder.raw_decode(self._buffer, pos)
+                except json.JSONDecodeError:
+                    break  # Incomplete row; wait for more text
+                rows.append(row)
+                pos = end
+            self._buffer = self._buffer[pos:]
+        elif self._state == "tail":
+            self._tail.append(self._buffer)
+            self._buffer = ""
+        return rows
+
+    def finish(self):
+        """The response without its rows (e.g. {"fields": [...], "count": ...}). Raises ValueError if truncated."""
+        if self._state != "tail":
+            if self._state == "head":
+                # No "data" key: a complete response without rows (or an error document).
+                return json.loads("".join(self._head) + self._buffer)
+            raise ValueError("SBDB response ended inside the data array.")
+        return json.loads("".join(self._head) + "[]" + "".join(self._tail))
+
+
+class RateLimiter:
+    """Spaces request starts to `rate` per second; `pause()` holds every caller back (Retry-After)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff(attempt):
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+async def _fetch_page(client, limiter, params, stats):
+    """(rows, metadata) of one query page, streamed; retried on transport errors, 429 and 5xx."""
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.wait()
+        stats["requests"] += 1
+        try:
+            async with client.stream("GET", "/sbdb_query.api", params=params) as response:
+                if response.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+                    wait = _retry_after(response)
+                    if wait is not None:
+                        limiter.pause(wait)
+                    stats["retries"] += 1
+                    await asyncio.sleep(wait if wait is not None else _backoff(attempt))
+                    continue
+                response.raise_for_status()
+                stream = RowStream()
+                decoder = codecs.getincrementaldecoder("utf-8")()
+                rows = []
+                async for chunk in response.aiter_bytes():
+                    stats["bytes"] += len(chunk)
+                    rows.extend(stream.feed(decoder.decode(chunk)))
+                rows.extend(stream.feed(decoder.decode(b"", final=True)))
+                return rows, stream.finish()
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            stats["retries"] += 1
+            await asyncio.sleep(_backoff(attempt))
+    raise RuntimeError("unreachable")
+
+
+async def query_async(fields, filters=None, page_size=PAGE_SIZE, concurrency=CONCURRENCY,
+                      max_rows=None, base_url=None, rate=MAX_REQUESTS_PER_SECOND):
+    """
+    Every row of an sbdb_query.api query, in server order.
+    `fields` is a list of SBDB field names; `filters` holds extra query parameters (e.g. {"sb-class": "APO"}).
+    Returns {"fields", "count", "signature", "data", "stats"}.
+    """
+    base_params = dict(filters or {}, fields=",".join(fields))
+    if max_rows is not None:
+        page_size = min(page_size, max_rows)
+    limiter = RateLimiter(rate)
+    stats = {"requests": 0, "retries": 0, "bytes": 0, "pages": 0}
+    pages = {}
+    meta = {}
+    next_offset = 0
+    done = False
+
+    async def worker(client):
+        nonlocal next_offset, done
+        while not done:
+            offset = next_offset
+            if max_rows is not None and offset >= max_rows:
+                return
+            next_offset += page_size
+            rows, page_meta = await _fetch_page(client, limiter, dict(base_params, limit=page_size, **{"limit-from": offset}), stats)
+            stats["pages"] += 1
+            pages[offset] = rows
+            meta.setdefault("meta", page_meta)
+            if len(rows) < page_size:
+                done = True
+
+    start = time.perf_counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url or SBDB_BASE_URL, timeout=TIMEOUT, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    data = []
+    for offset in sorted(pages):
+        data.extend(pages[offset])
+        if len(pages[offset]) < page_size:
+            break  # Pages past the first short one are empty
+    if max_rows is not None:
+        data = data[:max_rows]
+    page_meta = meta.get("meta", {})
+    stats["seconds"] = time.perf_counter() - start
+    return {
+        "signature": page_meta.get("signature"),
+        "fields": page_meta.get("fields", list(fields)),
+        "count": len(data),
+        "data": data,
+        "stats": stats,
+    }
+
+
+def query(fields, filters=None, **kwargs):
+    """Synchronous wrapper of `query_async()` for scripts and worker threads."""
+    return asyncio.run(query_async(fields, filters, **kwargs))
+
+
+# --- Single-object lookups ---
+_client = None
+_client_lock = threading.Lock()
+
+
+def _sync_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(base_url=SBDB_BASE_URL, timeout=TIMEOUT)
+        return _client
+
+
+def fetch_object(spkid, phys_par=True):
+    """The sbdb.api record of one object, over the pooled client; retried like query pages."""
+    params = {"spk": spkid}
+    if phys_par:
+        params["phys-par"] = 1
+    client = _sync_client()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = client.get("/sbdb.api", params=params)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        if response.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+            wait = _retry_after(response)
+            time.sleep(wait if wait is not None else _backoff(attempt))
+            continue
+        response.raise_for_status()
+        return response.json()
+    raise RuntimeError("unreachable")
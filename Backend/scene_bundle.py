@@ -0,0 +1,217 @@
+# In Backend/scene_bundle.py
+"""
+Scene bundles: several viewer layers in one response.
+
+Each layer is encoded once into a byte fragment and cached. A CZML layer's
+fragment holds its packets without the document packet; a JSON layer's
+fragment holds the file's bytes. A bundle is only concatenation:
+
+  czml       [<document>, <fragment>, <fragment>, ...] - one CZML document
+  multipart  multipart/mixed, one part per layer (CZML layers as complete documents)
+
+Fragments from static files are keyed by path, size and mtime, so rerunning
+a precompute script invalidates them. Planet and Moon fragments come from the
+ephemeris tile store (falling back to the static files) and are keyed by the
+tile range they cover, so any window inside the same tiles reuses them.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import czml_encoder
+import ephemeris_tiles
+
+# --- Configuration ---
+CZML_LAYERS = {
+    # layer -> static fallback file; planets/moon prefer the tile store.
+    "planets": "planets.czml",
+    "moon": "moon.czml",
+    "catalog": "catalog.czml",
+    "impactor": "impactor2025.czml",
+}
+JSON_LAYERS = {
+    "neo_list": "neo_list.json",
+    "curated_list": "curated_neo_list.json",
+}
+TILED_LAYERS = {"planets": ephemeris_tiles.PLANETS, "moon": ["Moon"]}
+DEFAULT_LAYERS = ["planets", "catalog"]
+DEFAULT_WINDOW_DAYS = 365
+# Tiled layers are cut on whole tiles (up to one extra tile at each end), which must stay within tracks_czml's limit.
+MAX_WINDOW_DAYS = ephemeris_tiles.MAX_INTERVAL_DAYS - 2 * ephemeris_tiles.TILE_DAYS
+MAX_FRAGMENTS = 64
+
+
+def _dumps(obj):
+    return czml_encoder.dumps(obj)
+
+
+class FragmentCache:
+    """Small LRU map of fragment key -> (document packet, encoded bytes)."""
+
+    def __init__(self, max_entries=MAX_FRAGMENTS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        # Built outside the lock; two concurrent misses both build, and the second store wins.
+        value = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+FRAGMENTS = FragmentCache()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def _czml_file_fragment(path):
+    with open(path, "rb") as f:
+        packets = json.load(f)
+    document = packets[0] if packets and packets[0].get("id") == "document" else None
+    body = packets[1:] if document is not None else packets
+    return document, b",".join(_dumps(packet) for packet in body)
+
+
+def _tiled_fragment(layer, first_tile, last_tile):
+    index = ephemeris_tiles.load_tiles()["index"]
+    start = index["origin_posix"] + first_tile * index["tile_seconds"]
+    end = index["origin_posix"] + (last_tile + 1) * index["tile_seconds"]
+    packets = ephemeris_tiles.tracks_czml(start, end, TILED_LAYERS[layer])
+    # The tile range is wider than the request, so its clock is not the scene's.
+    return None, b",".join(_dumps(packet) for packet in packets[1:])
+
+
+def _tile_range(start, end):
+    """Tile numbers covering [start, end], or None if the store is missing or does not cover it."""
+    coverage = ephemeris_tiles.coverage()
+    if coverage is None or start < coverage[0] or end > coverage[1]:
+        return None
+    index = ephemeris_tiles.load_tiles()["index"]
+    first = int((start - coverage[0]) // index["tile_seconds"])
+    return first, min(int((end - coverage[0]) // index["tile_seconds"]), index["n_tiles"] - 1)
+
+
+def layer_fragment(layer, static_dir, start, end):
+    """(document packet or None, encoded bytes) for one layer. Raises FileNotFoundError if it has no data."""
+    if layer in TILED_LAYERS:
+        tiles = _tile_range(start, end)
+        if tiles is not None:
+            return FRAGMENTS.get_or_build((layer,) + tiles, lambda: _tiled_fragment(layer, *tiles))
+    if layer in CZML_LAYERS:
+        path = os.path.join(static_dir, CZML_LAYERS[layer])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No data for layer '{layer}' ({CZML_LAYERS[layer]} not found).")
+        return FRAGMENTS.get_or_build(_file_key(path), lambda: _czml_file_fragment(path))
+    path = os.path.join(static_dir, JSON_LAYERS[layer])
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No data for layer '{layer}' ({JSON_LAYERS[layer]} not found).")
+
+    def read():
+        with open(path, "rb") as f:
+            return None, f.read()
+    return FRAGMENTS.get_or_build(_file_key(path), read)
+
+
+def parse_layers(layers, fmt):
+    """Validates a comma-separated layer list for the given format; raises ValueError."""
+    names = [name.strip() for name in layers.split(",") if name.strip()] if layers else list(DEFAULT_LAYERS)
+    known = list(CZML_LAYERS) + list(JSON_LAYERS)
+    for name in names:
+        if name not in known:
+            raise ValueError(f"Unknown layer '{name}'. Choose from {known}.")
+        if fmt == "czml" and name in JSON_LAYERS:
+            raise ValueError(f"Layer '{name}' is JSON, not CZML; request it with format=multipart.")
+    if len(set(names)) != len(names):
+        raise ValueError("Layers must not repeat.")
+    return names
+
+
+def check_window(start, end):
+    """Raises ValueError unless [start, end] (POSIX seconds) is a non-empty window of at most MAX_WINDOW_DAYS."""
+    if end <= start:
+        raise ValueError("end must be after start.")
+    if end - start > MAX_WINDOW_DAYS * 86400:
+        raise ValueError(f"The scene window may span at most {MAX_WINDOW_DAYS} days.")
+
+
+def _document_packet(start, end, documents):
+    """The bundle's document packet: the requested window, else the first layer clock, else the default window."""
+    if start is None:
+        for document in documents:
+            if document and "clock" in document:
+                return {"id": "document", "name": "AstroTerraScene", "version": "1.0", "clock": document["clock"]}
+        return _document_packet(*default_window(), [])
+    return {
+        "id": "document",
+        "name": "AstroTerraScene",
+        "version": "1.0",
+        "clock": {
+            "interval": f"{ephemeris_tiles.format_utc(start)}/{ephemeris_tiles.format_utc(end)}",
+            "currentTime": ephemeris_tiles.format_utc(start),
+            "multiplier": 3600,
+        },
+    }
+
+
+def default_window():
+    start = time.time()
+    return start, start + DEFAULT_WINDOW_DAYS * 86400
+
+
+def build_czml(layers, static_dir, start=None, end=None):
+    """One CZML document (bytes) with every layer's packets."""
+    window = (start, end) if start is not None else default_window()
+    fragments = [layer_fragment(layer, static_dir, *window) for layer in layers]
+    parts = [_dumps(_document_packet(start, end, [document for document, _ in fragments]))]
+    parts.extend(body for _, body in fragments if body)
+    return b"[" + b",".join(parts) + b"]"
+
+
+def build_multipart(layers, static_dir, start=None, end=None, extra_parts=()):
+    """
+    multipart/mixed body with one part per layer; returns (bytes, content type).
+    `extra_parts` are (name, bytes) JSON parts appended after the layers (e.g. session state).
+    """
+    window = (start, end) if start is not None else default_window()
+    boundary = uuid.uuid4().hex
+    chunks = []
+
+    def add_part(name, content_type, body):
+        chunks.append(
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Disposition: inline; name=\"{name}\"\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode()
+        )
+        chunks.append(body)
+        chunks.append(b"\r\n")
+
+    for layer in layers:
+        document, body = layer_fragment(layer, static_dir, *window)
+        if layer in JSON_LAYERS:
+            add_part(layer, "application/json", body)
+            continue
+        document = _document_packet(start, end, [document])
+        add_part(layer, "application/json", b"[" + b",".join([_dumps(document)] + ([body] if body else [])) + b"]")
+    for name, body in extra_parts:
+        add_part(name, "application/json", body)
+    chunks.append(f"--{boundary}--\r\n".encode())
+    return b"".join(chunks), f"multipart/mixed; boundary={boundary}"
@@ -0,0 +1,146 @@
+# In Backend/serve.py
+"""
+Production launch mode: preload once, fork workers that share it copy-on-write.
+
+  python serve.py --workers 4 --host 0.0.0.0 --port 8001
+
+The parent imports the app and runs its warm-up. That builds the catalog
+store and search index, memory-maps the ephemeris cache and launch grid, and
+parses the impactor CZML. It then freezes the heap (gc.freeze) so garbage
+collection in the children never writes to the shared pages. Finally it binds
+one listening socket and forks the workers. Each worker runs uvicorn on the
+inherited socket and reopens its own SPICE kernel handles.
+
+The parent stays a small supervisor. It restarts workers that die, backing
+off if they crash on startup, and forwards SIGTERM/SIGINT for a graceful
+shutdown. Per-user simulation state lives in session_store (SQLite), not in
+worker memory. Unix only, because it relies on os.fork.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+MIN_UPTIME_S = 5.0
+MAX_BACKOFF_S = 30.0
+
+
+def preload():
+    """Imports and warms the app in the parent so workers inherit it."""
+    # Workers run the lifespan warm-up again; after the parent's warm-up it only reopens kernels.
+    os.environ["ASTROTERRA_STARTUP"] = "eager"
+    import app as app_module
+
+    app_module.warm_up()
+    gc.collect()
+    gc.freeze()
+    return app_module
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock, args):
+    """Child process body: serve the preloaded app on the shared socket."""
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(
+        app_module.app, log_level=args.log_level, access_log=args.access_log,
+        timeout_keep_alive=args.keep_alive, lifespan="on",
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Forks and keeps `n_workers` worker processes alive."""
+
+    def __init__(self, app_module, sock, args):
+        self.app_module = app_module
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid -> (slot, start time)
+        self.backoff = {}  # slot -> seconds to wait before the next restart
+        self.stopping = False
+
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app_module, self.sock, self.args)
+            except BaseException as e:
+                print(f"--- Worker {os.getpid()} failed: {e} ---", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = (slot, time.monotonic())
+        print(f"--- Worker {slot} started (pid {pid}) ---")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.args.workers):
+            self.spawn(slot)
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot, started = self.workers.pop(pid, (None, None))
+            if slot is None or self.stopping:
+                continue
+            uptime = time.monotonic() - started
+            # Workers that die right after starting are probably crash-looping; back off exponentially.
+            delay = 0.0 if uptime >= MIN_UPTIME_S else min(MAX_BACKOFF_S, max(1.0, 2 * self.backoff.get(slot, 0.5)))
+            self.backoff[slot] = delay
+            print(f"--- Worker {slot} (pid {pid}) exited with status {status} after {uptime:.1f} s; "
+                  f"restarting in {delay:.1f} s ---")
+            time.sleep(delay)
+            if not self.stopping:
+                self.spawn(slot)
+        print("--- All workers stopped ---")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the AstroTerra backend with preforked workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--access-log", action="store_true")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork; on this platform run `uvicorn app:app` instead.")
+
+    start = time.perf_counter()
+    app_module = preload()
+    sock = bind_socket(args.host, args.port)
+    print(f"--- Preloaded in {time.perf_counter() - start:.2f} s; serving on {args.host}:{args.port} "
+          f"with {args.workers} workers ---")
+    Supervisor(app_module, sock, args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# In Backend/session_channel.py
+"""
+Delta updates for the per-session WebSocket channel (/ws/session/{id}).
+
+Each connection has a SessionChannel that remembers what its client holds:
+the last simulation state sent, and each CZML packet by id with a digest of
+its encoding. `update(state, czml)` returns only what changed:
+  - state: the top-level fields whose values differ
+  - czml: new packets in full. For a changed packet, its id and the top-level
+    properties that differ. Unchanged packets are left out, and the client
+    keeps its entities. Packets that are gone get {"id": ..., "delete": true}.
+    When a packet lost a property, or a sampled property (one with an
+    "epoch") changed, it is deleted and re-sent in full, because Cesium
+    merges samples rather than replacing them.
+
+The document packet always leads a non-empty CZML delta, as
+CzmlDataSource.process() expects. Packet digests are cached by object
+identity, so the large static packets (the impactor trajectory) are encoded
+once per process rather than once per message.
+
+SessionHub tracks the open connections of each session in this worker, so an
+action on one connection refreshes the session's other connections.
+"""
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+import czml_encoder
+
+# --- Configuration ---
+DIGEST_CACHE_ENTRIES = 256
+DOCUMENT_HEADER = {"id": "document", "version": "1.0"}
+
+_digest_cache = OrderedDict()  # id(packet) -> (packet, digest); the packet reference keeps the id valid
+_digest_lock = threading.Lock()
+
+
+def packet_digest(packet):
+    """SHA-1 of a packet's CZML encoding, cached for packets that are reused (treat them as read-only)."""
+    key = id(packet)
+    with _digest_lock:
+        cached = _digest_cache.get(key)
+        if cached is not None and cached[0] is packet:
+            _digest_cache.move_to_end(key)
+            return cached[1]
+    digest = hashlib.sha1(czml_encoder.dumps(packet)).hexdigest()
+    with _digest_lock:
+        _digest_cache[key] = (packet, digest)
+        while len(_digest_cache) > DIGEST_CACHE_ENTRIES:
+            _digest_cache.popitem(last=False)
+    return digest
+
+
+def _is_sampled(value):
+    return isinstance(value, dict) and "epoch" in value
+
+
+def packet_delta(old, new):
+    """
+    The update that turns packet `old` into `new`: a list of packets (empty if they are equal).
+    """
+    if old is None:
+        return [new]
+    changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    if not changed:
+        return []
+    if any(key not in new for key in old) or any(_is_sampled(old.get(key)) or _is_sampled(value)
+                                                 for key, value in changed.items()):
+        return [{"id": new["id"], "delete": True}, new]
+    return [dict(changed, id=new["id"])]
+
+
+class SessionChannel:
+    """What one client has been sent, and the deltas that bring it up to date."""
+
+    def __init__(self):
+        self.state = None
+        self.packets = {}  # id -> (digest, packet)
+        self.seq = 0
+
+    def reset(self):
+        self.state = None
+        self.packets = {}
+
+    def update(self, state, czml):
+        """
+        Returns (message type, changed state fields, CZML delta) and records the new state and packets.
+        The first update after construction or reset() is a full "snapshot".
+        """
+        kind = "snapshot" if self.state is None else "delta"
+        old_state = self.state or {}
+        state_delta = {key: value for key, value in state.items() if key not in old_state or old_state[key] != value}
+        state_delta.update({key: None for key in old_state if key not in state})
+
+        packets = {}
+        document = None
+        updates = []
+        for packet in czml:
+            if packet.get("id") == "document":
+                document = packet
+                continue
+            digest = packet_digest(packet)
+            packets[packet["id"]] = (digest, packet)
+            previous = self.packets.get(packet["id"])
+            if previous is None:
+                updates.append(packet)
+            elif previous[0] != digest:
+                updates.extend(packet_delta(previous[1], packet))
+        updates.extend({"id": packet_id, "delete": True}
+                       for packet_id in self.packets if packet_id not in packets and packet_id != "document")
+
+        header = DOCUMENT_HEADER
+        if document is not None:
+            digest = packet_digest(document)
+            previous = self.packets.get("document")
+            packets["document"] = (digest, document)
+            if previous is None or previous[0] != digest:
+                header = document
+        if updates or header is not DOCUMENT_HEADER:
+            updates.insert(0, header)
+
+        self.state = state
+        self.packets = packets
+        self.seq += 1
+        return kind, state_delta, updates
+
+    def message(self, state, czml):
+        """The next message for the client, as a dict ready for czml_encoder.dumps()."""
+        kind, state_delta, updates = self.update(state, czml)
+        return {"type": kind, "seq": self.seq, "simulation_state": state_delta, "czml": updates}
+
+
+class SessionHub:
+    """Open connections per session in this worker; `notify()` wakes the others after a change."""
+
+    def __init__(self):
+        self._events = {}
+
+    def connect(self, session_id):
+        event = asyncio.Event()
+        self._events.setdefault(session_id, set()).add(event)
+        return event
+
+    def disconnect(self, session_id, event):
+        events = self._events.get(session_id)
+        if events is not None:
+            events.discard(event)
+            if not events:
+                del self._events[session_id]
+
+    def notify(self, session_id, source=None):
+        for event in self._events.get(session_id, ()):
+            if event is not source:
+                event.set()
+
+
+# Shared instance used by app.py.
+SESSION_HUB = SessionHub()
@@ -0,0 +1,92 @@
+# In Backend/session_store.py
+"""
+Per-user simulation state kept outside worker memory.
+
+States are JSON documents in a SQLite database (WAL mode) keyed by session
+ID, so every worker process sees the same state and a restarted worker loses
+nothing. `update()` runs a read-modify-write inside an IMMEDIATE transaction,
+so concurrent requests for one session are serialized across processes.
+Connections are opened per thread and per process (never shared across a fork).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("ASTROTERRA_SESSION_DB", os.path.join(PROJECT_ROOT, "data", "sessions.sqlite3"))
+SESSION_TTL_SECONDS = float(os.environ.get("ASTROTERRA_SESSION_TTL_HOURS", 24)) * 3600.0
+PURGE_INTERVAL_SECONDS = 3600.0  # app.py purges expired sessions at startup and then this often
+DEFAULT_SESSION_ID = "default"
+MAX_SESSION_ID_LENGTH = 128
+
+
+def valid_session_id(session_id):
+    return bool(session_id) and len(session_id) <= MAX_SESSION_ID_LENGTH and session_id.isprintable()
+
+
+class SessionStore:
+    """SQLite-backed map of session ID -> JSON state."""
+
+    def __init__(self, path=DB_PATH, ttl_seconds=SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, session_id, default_factory=None):
+        """Returns the session's state, or `default_factory()` (not stored) if it has none."""
+        row = self._conn().execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return default_factory() if default_factory else None
+        return json.loads(row[0])
+
+    def put(self, session_id, state):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (id, state, updated) VALUES (?, ?, ?)",
+            (session_id, json.dumps(state), time.time()),
+        )
+
+    def update(self, session_id, fn, default_factory):
+        """
+        Atomically loads the session's state (or a fresh one), calls `fn(state)` - which may
+        mutate it - stores the state and returns whatever `fn` returned.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            state = json.loads(row[0]) if row is not None else default_factory()
+            result = fn(state)
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, updated) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state), time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def purge_expired(self):
+        """Deletes sessions idle for longer than the TTL; returns how many were removed."""
+        cursor = self._conn().execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl_seconds,))
+        return cursor.rowcount
+
+
+# Shared instance used by app.py.
+SESSION_STORE = SessionStore()
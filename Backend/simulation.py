@@ -1,20 +1,26 @@
 import math
-import requests
 import rebound
 import spiceypy as sp
 import numpy as np
 from datetime import datetime, timezone
 
+import ephemeris_cache
+import propagation_config
+import sampling
+import sbdb_client
+import spice_kernels
+import trajectory_store
+from propagation_cache import PROPAGATION_CACHE, canonical_key
+
 # --- Constants ---
 AU_TO_KM = 149597870.7
+N_STEPS = 365
+DURATION_DAYS = 365.0
 
 # --- Helper Function ---
 # This is the corrected function.
 def fetch_and_parse_neo_data(spkid: str) -> dict:
-    url = f"https://ssd-api.jpl.nasa.gov/sbdb.api?spk={spkid}&phys-par=1"
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
-    data = response.json()
+    data = sbdb_client.fetch_object(spkid, phys_par=True)
     
     if "object" not in data or not data.get("orbit"):
         raise Exception(f"Incomplete data for SPK-ID {spkid}.")
@@ -38,14 +44,18 @@ def fetch_and_parse_neo_data(spkid: str) -> dict:
     return parsed_data
 
 # THIS IS THE FINAL VERSION WITH THE CORRECT KEY NAME
-def calculate_orbit(spkid: str, meta_kernel_path: str) -> list:
-    sp.kclear()
-    sp.furnsh(meta_kernel_path)
+def calculate_orbit(spkid: str, meta_kernel_path: str, mode: str = None, return_trajectory_id: bool = False):
+    """
+    One year of the asteroid's geocentric positions (m) from 00:00 UTC today. With `return_trajectory_id`,
+    returns (positions, trajectory ID); the ID answers state queries through trajectory_store.
+    """
+    spice_kernels.ensure_kernels_loaded(meta_kernel_path)
     
     neo_data = fetch_and_parse_neo_data(spkid)
-    et_now = sp.utc2et(datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'))
-    sun_state_w_ssb = sp.spkssb(10, et_now, 'J2000')
-    earth_state_w_ssb = sp.spkssb(399, et_now, 'J2000')
+    # The start epoch is quantized to the day, so every request on a day shares one cache entry and trajectory.
+    et_now = sp.utc2et(datetime.now(timezone.utc).strftime('%Y-%m-%dT00:00:00'))
+    sun_state_w_ssb = ephemeris_cache.lookup_state(10, et_now, 'J2000')
+    earth_state_w_ssb = ephemeris_cache.lookup_state(399, et_now, 'J2000')
     GM_SUN_KM3_S2 = 1.32712440018e11
     orbit_elements = neo_data["orbit"]
 
@@ -77,20 +87,53 @@ def calculate_orbit(spkid: str, meta_kernel_path: str) -> list:
     
     ast_state_w_sun = sp.conics(elts, et_now)
     ast_state_w_ssb = [ast_state_w_sun[i] + ast_state_w_sun[i] for i in range(6)]
+
+    # Identical inputs (SBDB elements, quantized start epoch, sampling and integrator) are answered from the cache.
+    cache_key = canonical_key(
+        "orbit",
+        elements={name: orbit_elements[name] for name in ("a", "e", "i", "om", "w", "ma")}, element_epoch=epoch_jd_str,
+        start_et=et_now, duration=DURATION_DAYS, n_samples=N_STEPS,
+        integrator=propagation_config.integrator_config(mode, exclude=(3,)),
+    )
+    trajectory_id = trajectory_store.register(
+        "orbit",
+        sun_state=list(map(float, sun_state_w_ssb)), earth_state=list(map(float, earth_state_w_ssb)),
+        asteroid_state=list(map(float, ast_state_w_ssb)), start_et=float(et_now),
+        mode=propagation_config.integrator_config(mode)["mode"],
+    )
+    positions = PROPAGATION_CACHE.get_or_compute(
+        cache_key,
+        lambda: _integrate_geocentric_orbit(sun_state_w_ssb, earth_state_w_ssb, ast_state_w_ssb, et_now, mode, trajectory_id),
+    )
+    return (positions, trajectory_id) if return_trajectory_id else positions
+
+def build_orbit_trajectory(trajectory_id, sun_state, earth_state, asteroid_state, start_et, mode):
+    """trajectory_store builder: re-runs an orbit propagation, archiving it."""
+    _integrate_geocentric_orbit(sun_state, earth_state, asteroid_state, start_et, mode, trajectory_id, n_steps=2)
+
+def _integrate_geocentric_orbit(sun_state_w_ssb, earth_state_w_ssb, ast_state_w_ssb, et_now, mode, trajectory_id=None, n_steps=N_STEPS):
+    """
+    Integrates the Sun-Earth-asteroid system, plus the mode's perturbing planets,
+    and returns geocentric asteroid positions in meters. With a `trajectory_id`,
+    the run is also saved to trajectory_store.
+    """
     sim = rebound.Simulation()
     sim.units = ('AU', 'day', 'Msun')
     sim.add(m=1.0, x=sun_state_w_ssb[0]/AU_TO_KM, y=sun_state_w_ssb[1]/AU_TO_KM, z=sun_state_w_ssb[2]/AU_TO_KM, vx=sun_state_w_ssb[3]*86400/AU_TO_KM, vy=sun_state_w_ssb[4]*86400/AU_TO_KM, vz=sun_state_w_ssb[5]*86400/AU_TO_KM)
     sim.add(m=3.003e-6, x=earth_state_w_ssb[0]/AU_TO_KM, y=earth_state_w_ssb[1]/AU_TO_KM, z=earth_state_w_ssb[2]/AU_TO_KM, vx=earth_state_w_ssb[3]*86400/AU_TO_KM, vy=earth_state_w_ssb[4]*86400/AU_TO_KM, vz=earth_state_w_ssb[5]*86400/AU_TO_KM)
+    # Earth is already in the system, so the Earth-Moon barycenter is never added as a perturber.
+    propagation_config.add_perturbers(sim, mode, et_now, ref='J2000', km_per_length_unit=AU_TO_KM, seconds_per_time_unit=86400, exclude=(3,))
     sim.add(m=0, x=ast_state_w_ssb[0]/AU_TO_KM, y=ast_state_w_ssb[1]/AU_TO_KM, z=ast_state_w_ssb[2]/AU_TO_KM, vx=ast_state_w_ssb[3]*86400/AU_TO_KM, vy=ast_state_w_ssb[4]*86400/AU_TO_KM, vz=ast_state_w_ssb[5]*86400/AU_TO_KM)
     sim.move_to_com()
-    N_steps = 365
-    times = np.linspace(0., 365., N_steps)
-    geocentric_coords = []
-    for t in times:
-        sim.integrate(t)
-        earth_pos = sim.particles[1].xyz
-        ast_pos = sim.particles[2].xyz
-        geocentric_pos_au = [ast_pos[i] - earth_pos[i] for i in range(3)]
-        geocentric_pos_m = [coord * AU_TO_KM * 1000 for coord in geocentric_pos_au]
-        geocentric_coords.append(geocentric_pos_m)
-    return geocentric_coords
\ No newline at end of file
+    propagation_config.configure_integrator(sim, mode, seconds_per_time_unit=86400)
+    times = np.linspace(0., DURATION_DAYS, n_steps)
+    if trajectory_id is not None:
+        archive = trajectory_store.start_archive(sim, trajectory_id, DURATION_DAYS)
+    samples = sampling.sample_positions(sim, times, particle=sim.N - 1, relative_to=1, scale=AU_TO_KM * 1000)
+    if trajectory_id is not None:
+        trajectory_store.finish_archive(
+            sim, trajectory_id, archive, particle=sim.N - 1, relative_to=1, seconds_per_time_unit=86400.0,
+            scale=AU_TO_KM * 1000, velocity_scale=AU_TO_KM * 1000 / 86400, start_et=float(et_now),
+            duration_s=DURATION_DAYS * 86400, frame="J2000", center="EARTH",
+        )
+    return samples[:, 1:].tolist()
@@ -0,0 +1,93 @@
+# In Backend/spice_kernels.py
+"""
+Deferred, load-once SPICE kernel loading.
+
+Nothing is furnished at import time. The first caller of
+`ensure_kernels_loaded()` reads kernels/meta_kernel.txt, resolves its entries
+against the Backend directory (so the working directory no longer matters)
+and furnishes them; later calls return immediately. SPICE reads SPK data on
+demand, so even de440.bsp costs little until states are requested.
+
+An SPK entry is replaced by its trimmed copy <name>_subset.bsp when one
+exists (see subset_kernels.py), unless ASTROTERRA_FULL_KERNELS=1. The meta-
+kernel keeps naming the full kernels, so a deployment may ship the subsets
+alone.
+
+Forked processes inherit the parent's open kernel handles, and sharing them
+across processes is unsafe, so the load is tracked per PID: the first call in
+a forked child reopens the kernels in that child.
+"""
+import os
+import re
+import threading
+import time
+
+import spiceypy as spice
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+KERNELS_DIR = os.path.join(PROJECT_ROOT, "kernels")
+META_KERNEL_PATH = os.path.join(KERNELS_DIR, "meta_kernel.txt")
+USE_SUBSETS = os.environ.get("ASTROTERRA_FULL_KERNELS", "0") != "1"
+
+_lock = threading.Lock()
+_state = {"meta_kernel": None, "kernels": [], "load_seconds": None, "error": None, "pid": None}
+
+
+def subset_path(path):
+    """Path of the subset written by subset_kernels.py for an SPK."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_subset{ext}"
+
+
+def kernel_paths(meta_kernel_path=META_KERNEL_PATH, use_subsets=USE_SUBSETS):
+    """Absolute paths of the KERNELS_TO_LOAD entries in a meta-kernel, with SPKs swapped for their subsets."""
+    with open(meta_kernel_path, "r") as f:
+        text = f.read()
+    paths = []
+    for block in re.findall(r"\\begindata(.*?)(?:\\begintext|\\enddata|$)", text, flags=re.S):
+        match = re.search(r"KERNELS_TO_LOAD\s*=\s*\((.*?)\)", block, flags=re.S)
+        if match:
+            paths.extend(re.findall(r"'([^']+)'", match.group(1)))
+    paths = [p if os.path.isabs(p) else os.path.join(PROJECT_ROOT, p) for p in paths]
+    if use_subsets:
+        paths = [subset_path(p) if p.endswith(".bsp") and os.path.exists(subset_path(p)) else p for p in paths]
+    return paths
+
+
+def ensure_kernels_loaded(meta_kernel_path=META_KERNEL_PATH, force=False):
+    """
+    Furnishes the meta-kernel's kernels once per process. Thread-safe; raises the
+    SPICE error (and keeps it for status()) if a kernel cannot be loaded.
+    """
+    if not force and _state["meta_kernel"] == meta_kernel_path and _state["pid"] == os.getpid():
+        return
+    with _lock:
+        if not force and _state["meta_kernel"] == meta_kernel_path and _state["pid"] == os.getpid():
+            return
+        start = time.perf_counter()
+        spice.kclear()
+        _state.update(meta_kernel=None, kernels=[], error=None)
+        try:
+            for path in kernel_paths(meta_kernel_path):
+                spice.furnsh(path)
+                _state["kernels"].append(path)
+        except Exception as e:
+            _state["error"] = f"{type(e).__name__}: {e}"
+            raise
+        _state.update(meta_kernel=meta_kernel_path, load_seconds=time.perf_counter() - start, pid=os.getpid())
+        print(f"--- SPICE kernels loaded: {len(_state['kernels'])} in {_state['load_seconds']:.3f} s ---")
+
+
+def is_loaded():
+    return _state["meta_kernel"] is not None and _state["pid"] == os.getpid()
+
+
+def status():
+    """Load state for readiness checks."""
+    return {
+        "loaded": is_loaded(),
+        "kernels": [os.path.basename(p) for p in _state["kernels"]],
+        "load_seconds": _state["load_seconds"],
+        "error": _state["error"],
+    }
@@ -0,0 +1,210 @@
+# In Backend/subset_kernels.py
+"""
+Cuts the planetary SPK down to the bodies and years the app uses.
+
+de440.bsp (114 MB) covers 1550-2650 for every barycenter plus Mercury, Venus,
+Earth and the Moon. This script copies only the segments for SUBSET_BODIES
+(and the centers they are chained to, down to the Solar System Barycenter)
+over [ASTROTERRA_SUBSET_START, ASTROTERRA_SUBSET_END), by default 2000-2070,
+the widest span any precompute script samples. spksub copies the Chebyshev
+records unchanged, so states read from the subset are bit-identical to the
+full kernel inside the window. The build re-reads both kernels at random
+times and fails if any state differs.
+
+Output (preferred by spice_kernels.py over the full kernel):
+  kernels/de440_subset.bsp  the trimmed SPK; its comment area records source, bodies and window
+
+download_kernels.py runs this after every download; --drop-full there
+deletes the full kernel once the subset is written.
+
+Set ASTROTERRA_FULL_KERNELS=1 to load the full kernel again, e.g. for work
+outside the window.
+
+`python subset_kernels.py --measure [--meta-kernel PATH]` starts fresh worker
+processes with the full kernels and with the subsets and records what each
+pays for its kernels (load time, time to read a batch of states, peak RSS) in
+data/kernel_subset_measurements.json.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import spiceypy as spice
+
+import spice_kernels
+
+# --- Configuration ---
+SOURCE_KERNEL = os.path.join(spice_kernels.KERNELS_DIR, "de440.bsp")
+LEAPSECONDS_KERNEL = os.path.join(spice_kernels.KERNELS_DIR, "naif0012.tls")
+WINDOW_START_UTC = os.environ.get("ASTROTERRA_SUBSET_START", "2000-01-01T00:00:00")
+WINDOW_END_UTC = os.environ.get("ASTROTERRA_SUBSET_END", "2070-01-01T00:00:00")
+
+# Sun, the planetary barycenters, Earth and the Moon: every body the app propagates, draws or samples.
+SUBSET_BODIES = [10, 1, 2, 3, 4, 5, 6, 7, 8, 9, 399, 301]
+N_CHECKS = 2000
+MEASUREMENTS_PATH = os.path.join(spice_kernels.PROJECT_ROOT, "data", "kernel_subset_measurements.json")
+PROBE_STATES = 2000  # Random times per body in each measured worker
+PROBE_REPEATS = 5  # Fresh workers per configuration; the median is recorded
+
+
+def _segments(handle):
+    """(descriptor, ident, target, center, start ET, end ET) of every segment in an open SPK."""
+    segments = []
+    spice.dafbfs(handle)
+    while spice.daffna():
+        descr = spice.dafgs(5)  # ND + (NI + 1) // 2 doubles for an SPK
+        dc, ic = spice.dafus(descr, 2, 6)
+        segments.append((descr, spice.dafgn(), ic[0], ic[1], dc[0], dc[1]))
+    return segments
+
+
+def _with_centers(segments, bodies):
+    """`bodies` plus every center their segments chain through."""
+    centers = {}
+    for _, _, target, center, _, _ in segments:
+        centers.setdefault(target, set()).add(center)
+    keep, pending = set(), list(bodies)
+    while pending:
+        body = pending.pop()
+        if body not in keep:
+            keep.add(body)
+            pending.extend(centers.get(body, ()))
+    keep.discard(0)
+    return keep
+
+
+def _sample_states(kernels, bodies, ets):
+    spice.kclear()
+    for path in kernels:
+        spice.furnsh(path)
+    return {body: np.asarray(spice.spkezr(str(body), ets, "J2000", "NONE", "0")[0]) for body in bodies}
+
+
+def subset_spk(source=SOURCE_KERNEL, output=None, bodies=SUBSET_BODIES,
+               start_utc=WINDOW_START_UTC, end_utc=WINDOW_END_UTC, n_checks=N_CHECKS, leapseconds=LEAPSECONDS_KERNEL):
+    """Writes the subset of `source` for `bodies` over [start_utc, end_utc); returns its path."""
+    output = output or spice_kernels.subset_path(source)
+    print(f"--- Subsetting {os.path.basename(source)}: bodies {bodies}, {start_utc} to {end_utc} ---")
+    spice.kclear()
+    spice.furnsh(leapseconds)
+    start_et = spice.str2et(start_utc)
+    end_et = spice.str2et(end_utc)
+
+    tmp_path = output + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    started = time.perf_counter()
+    source_handle = spice.dafopr(source)
+    try:
+        segments = _segments(source_handle)
+        keep = _with_centers(segments, bodies)
+        missing = set(bodies) - {target for _, _, target, _, _, _ in segments}
+        if missing:
+            raise ValueError(f"{os.path.basename(source)} has no segments for {sorted(missing)}")
+        out_handle = spice.spkopn(tmp_path, os.path.basename(output), 1024)
+        try:
+            for descr, ident, target, center, seg_start, seg_end in segments:
+                begin, end = max(seg_start, start_et), min(seg_end, end_et)
+                if target not in keep or begin >= end:
+                    continue
+                spice.spksub(source_handle, descr, ident, begin, end, out_handle)
+                print(f" -> {target} relative to {center}")
+            spice.dafac(out_handle, [
+                f"Subset of {os.path.basename(source)} written by subset_kernels.py.",
+                f"Bodies: {', '.join(str(body) for body in sorted(keep))}",
+                f"Window: {start_utc} to {end_utc} (ET {start_et:.3f} to {end_et:.3f})",
+            ])
+        finally:
+            spice.spkcls(out_handle)
+    finally:
+        spice.dafcls(source_handle)
+
+    # --- Check the subset against the full kernel at random times in the window ---
+    ets = np.sort(np.random.default_rng(0).uniform(start_et, end_et, n_checks))
+    full = _sample_states([leapseconds, source], bodies, ets)
+    subset = _sample_states([leapseconds, tmp_path], bodies, ets)
+    spice.kclear()
+    worst = max(float(np.max(np.abs(full[body] - subset[body]))) for body in bodies)
+    if worst > 0.0:
+        os.remove(tmp_path)
+        raise ValueError(f"subset states differ from the full kernel by up to {worst} km")
+    os.replace(tmp_path, output)
+
+    size_mb = os.path.getsize(output) / 1e6
+    source_mb = os.path.getsize(source) / 1e6
+    print(f"--- Wrote {output}: {size_mb:.1f} MB (from {source_mb:.1f} MB) in {time.perf_counter() - started:.1f} s; "
+          f"{n_checks} checked states match exactly ---")
+    return output
+
+
+# --- Per-worker cost of the full kernels vs the subsets ---
+def probe_worker(meta_kernel_path=spice_kernels.META_KERNEL_PATH, n_states=PROBE_STATES):
+    """
+    Kernel cost in this (fresh) process: time to load the meta-kernel, time to read the states of
+    SUBSET_BODIES at n_states random times in 2020-2040, and peak RSS afterwards.
+    """
+    import resource
+
+    start = time.perf_counter()
+    spice_kernels.ensure_kernels_loaded(meta_kernel_path)
+    load_seconds = time.perf_counter() - start
+    ets = np.random.default_rng(1).uniform(spice.str2et("2020-01-01"), spice.str2et("2040-01-01"), n_states)
+    start = time.perf_counter()
+    for body in SUBSET_BODIES:
+        spice.spkezr(str(body), ets, "J2000", "NONE", "0")
+    kernels = spice_kernels.status()["kernels"]
+    return {
+        "kernels": kernels,
+        "kernel_mb": sum(os.path.getsize(path) for path in spice_kernels.kernel_paths(meta_kernel_path)) / 1e6,
+        "load_seconds": load_seconds,
+        "states_seconds": time.perf_counter() - start,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+
+
+def measure_workers(meta_kernel_path=spice_kernels.META_KERNEL_PATH, repeats=PROBE_REPEATS):
+    """Runs probe_worker in fresh processes with the full kernels and with the subsets; medians per configuration."""
+    results = {}
+    for label, full_kernels in (("full", "1"), ("subset", "0")):
+        runs = []
+        for _ in range(repeats):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--probe", "--meta-kernel", meta_kernel_path],
+                env=dict(os.environ, ASTROTERRA_FULL_KERNELS=full_kernels), capture_output=True, text=True, check=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        results[label] = {
+            "kernels": runs[0]["kernels"],
+            "kernel_mb": runs[0]["kernel_mb"],
+            **{key: float(np.median([run[key] for run in runs])) for key in ("load_seconds", "states_seconds", "max_rss_mb")},
+            "workers": repeats,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Subset the planetary SPK, or measure the per-worker cost of the subset.")
+    parser.add_argument("--source", default=SOURCE_KERNEL)
+    parser.add_argument("--measure", action="store_true", help="Measure workers with the full kernels and the subsets")
+    parser.add_argument("--meta-kernel", default=spice_kernels.META_KERNEL_PATH)
+    parser.add_argument("--note", default=None, help="Recorded with the measurements (e.g. which ephemeris was used)")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)  # One measured worker (measure_workers)
+    args = parser.parse_args()
+    if args.probe:
+        print(json.dumps(probe_worker(args.meta_kernel)))
+    elif args.measure:
+        results = {**measure_workers(args.meta_kernel), "probe_states": PROBE_STATES, "bodies": SUBSET_BODIES}
+        if args.note:
+            results["note"] = args.note
+        os.makedirs(os.path.dirname(MEASUREMENTS_PATH), exist_ok=True)
+        with open(MEASUREMENTS_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+        print(json.dumps(results, indent=2))
+        print(f"--- Measurements written to {MEASUREMENTS_PATH} ---")
+    else:
+        subset_spk(args.source)
@@ -0,0 +1,29 @@
+# In Backend/tests/conftest.py
+"""Makes the Backend modules importable from the tests (run `python -m pytest tests` in Backend/)."""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def committed_kernels(monkeypatch):
+    """
+    Loads only the committed LSK and PCK in place of the meta-kernel (de440.bsp is downloaded, not
+    committed). Enough for code that needs time conversion and Earth's constants but no ephemeris.
+    """
+    import spiceypy as spice
+    import spice_kernels
+
+    def ensure_kernels_loaded(meta_kernel_path=None, force=False):
+        if not spice.ktotal("ALL"):
+            for name in ("naif0012.tls", "pck00010.tpc"):
+                spice.furnsh(os.path.join(spice_kernels.KERNELS_DIR, name))
+
+    spice.kclear()
+    monkeypatch.setattr(spice_kernels, "ensure_kernels_loaded", ensure_kernels_loaded)
+    yield
+    spice.kclear()
@@ -0,0 +1,182 @@
+# In Backend/tests/test_download_kernels.py
+import os
+import shutil
+import struct
+
+import numpy as np
+import pytest
+import requests
+import spiceypy as spice
+
+import download_kernels
+import fixture_server
+import spice_kernels
+import subset_kernels
+from download_kernels import KernelError
+
+REPO_KERNELS_DIR = download_kernels.KERNELS_DIR
+LSK = "naif0012.tls"
+SPK = "de440.bsp"  # No pinned checksum: verified by structure (and the manifest) only
+
+
+def _daf_kernel(records=3):
+    """A little-endian DAF whose file record says its data fills `records` 1024-byte records."""
+    free = records * download_kernels.DAF_RECORD_BYTES // 8 + 1
+    head = b"DAF/SPK " + struct.pack("<ii60siii", 2, 6, b"test".ljust(60), 2, 2, free) + b"LTL-IEEE"
+    body = os.urandom(records * download_kernels.DAF_RECORD_BYTES - len(head))
+    return head + body
+
+
+def _planetary_spk(path):
+    """A small type 2 SPK with every body subset_kernels keeps, 1990-2080, on made-up constant orbits."""
+    spice.kclear()
+    spice.furnsh(os.path.join(REPO_KERNELS_DIR, LSK))
+    first, last = spice.str2et("1990-01-01"), spice.str2et("2080-01-01")
+    interval = 32 * 86400.0
+    n = int(np.ceil((last - first) / interval))
+    handle = spice.spkopn(str(path), "TEST", 0)
+    for body in subset_kernels.SUBSET_BODIES:
+        center = 3 if body in (399, 301) else 0
+        coefficients = np.zeros((n, 3, 3))
+        coefficients[:, :, 0] = [body * 1.0e6, 0.0, 0.0]
+        spice.spkw02(handle, body, center, "J2000", first, first + n * interval, f"BODY {body}",
+                     interval, n, 2, coefficients.ravel(), first)
+    spice.spkcls(handle)
+    spice.kclear()
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    """
+    Serves a directory through fixture_server as the kernel mirror. Returns start(**options) ->
+    (served directory, local kernels directory); files are placed in the served directory by the test.
+    """
+    monkeypatch.setattr(download_kernels.time, "sleep", lambda seconds: None)
+    served, local = tmp_path / "served", tmp_path / "kernels"  # create_meta_kernel writes to <parent>/kernels
+    served.mkdir()
+    local.mkdir()
+    servers = []
+
+    def start(**options):
+        server, base_url = fixture_server.start(rows=[], kernels_dir=str(served), **options)
+        servers.append(server)
+        monkeypatch.setattr(download_kernels, "MIRROR_URL", f"{base_url}/kernels")
+        return server.RequestHandlerClass.state
+
+    yield start, served, local
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith((".part", ".validator"))]
+
+
+def test_pinned_kernels_match_the_committed_files():
+    for filename in (LSK, "pck00010.tpc"):
+        path = os.path.join(REPO_KERNELS_DIR, filename)
+        assert download_kernels.verify(path, filename) == download_kernels.KERNELS[filename]["sha256"]
+
+
+def test_resume_after_dropped_connections(mirror):
+    start, served, local = mirror
+    shutil.copy(os.path.join(REPO_KERNELS_DIR, LSK), served)
+    state = start(drop_after=1500)
+
+    size = download_kernels.download(requests.Session(), LSK, str(local))
+
+    assert size == 5257
+    # Every cut keeps the 1500 bytes that arrived, so each attempt moves the part file forward.
+    assert state.requests == 4
+    assert download_kernels.file_sha256(str(local / LSK)) == download_kernels.KERNELS[LSK]["sha256"]
+    assert download_kernels.load_manifest(str(local))[LSK]["size"] == 5257
+    assert _leftovers(local) == []
+
+
+def test_if_range_resumes_only_the_same_file(mirror):
+    start, served, local = mirror
+    data = _daf_kernel()
+    (served / SPK).write_bytes(data)
+    start()
+    etag = requests.get(download_kernels.kernel_url(SPK)).headers["ETag"]
+
+    # A part started from the current file resumes.
+    (local / f"{SPK}.part").write_bytes(data[:1000])
+    (local / f"{SPK}.part.validator").write_text(etag)
+    download_kernels.download(requests.Session(), SPK, str(local))
+    assert (local / SPK).read_bytes() == data
+
+    # A part of an older version is replaced by the whole new file, not spliced onto it.
+    os.remove(local / SPK)
+    (local / f"{SPK}.part").write_bytes(os.urandom(1000))
+    (local / f"{SPK}.part.validator").write_text('"0123456789abcdef"')
+    download_kernels.download(requests.Session(), SPK, str(local))
+    assert (local / SPK).read_bytes() == data
+    assert _leftovers(local) == []
+
+
+def test_checksum_mismatch_is_rejected(mirror):
+    start, served, local = mirror
+    data = bytearray((open(os.path.join(REPO_KERNELS_DIR, LSK), "rb")).read())
+    data[-10] ^= 0x01  # Same size, one bit off
+    (served / LSK).write_bytes(bytes(data))
+    start()
+
+    with pytest.raises(KernelError, match="SHA-256"):
+        download_kernels.download(requests.Session(), LSK, str(local))
+    assert not (local / LSK).exists()
+    assert _leftovers(local) == []
+
+
+def test_truncated_kernel_is_downloaded_again(mirror):
+    start, served, local = mirror
+    data = _daf_kernel()
+    (served / SPK).write_bytes(data)
+    (local / SPK).write_bytes(data[:2048])
+    start()
+
+    with pytest.raises(KernelError, match="truncated"):
+        download_kernels.check_structure(str(local / SPK))
+    assert download_kernels._ensure(requests.Session(), SPK, {}, str(local))
+    assert (local / SPK).read_bytes() == data
+
+
+def test_lfs_pointer_is_detected(mirror):
+    start, served, local = mirror
+    pointer = open(os.path.join(REPO_KERNELS_DIR, "codes_300ast_20100725.bsp"), "rb").read()
+    data = _daf_kernel()
+    (served / SPK).write_bytes(data)
+    (local / SPK).write_bytes(pointer)
+    start()
+
+    with pytest.raises(KernelError, match="LFS pointer"):
+        download_kernels.verify(str(local / SPK), SPK)
+    assert download_kernels._ensure(requests.Session(), SPK, {}, str(local))
+    assert (local / SPK).read_bytes() == data
+
+    # A mirror that serves the pointer itself fails verification instead of installing it.
+    (served / SPK).write_bytes(pointer)
+    os.remove(local / SPK)
+    with pytest.raises(KernelError, match="LFS pointer"):
+        download_kernels.download(requests.Session(), SPK, str(local))
+    assert not (local / SPK).exists()
+
+
+def test_download_builds_the_subset_and_can_drop_the_full_kernel(mirror, monkeypatch):
+    start, served, local = mirror
+    for filename in (LSK, "pck00010.tpc"):
+        shutil.copy(os.path.join(REPO_KERNELS_DIR, filename), served)
+    _planetary_spk(served / SPK)
+    monkeypatch.setattr(download_kernels, "KERNELS", {name: download_kernels.KERNELS[name] for name in (LSK, "pck00010.tpc", SPK)})
+    state = start()
+
+    assert download_kernels.download_kernels(str(local), drop_full=True)
+    subset = spice_kernels.subset_path(str(local / SPK))
+    assert os.path.exists(subset) and not (local / SPK).exists()
+
+    # A rerun keeps the subset instead of fetching the dropped kernel again.
+    requests_before = state.requests
+    assert download_kernels.download_kernels(str(local))
+    assert state.requests == requests_before
+    assert os.path.exists(subset) and not (local / SPK).exists()
@@ -0,0 +1,46 @@
+# In Backend/tests/test_neo_search.py
+import numpy as np
+import pytest
+
+import benchmark
+import catalog_store
+import neo_search
+
+
+@pytest.fixture(scope="module")
+def index():
+    return neo_search.SearchIndex(catalog_store.CatalogStore(benchmark.synthetic_catalog_rows(20000)))
+
+
+def _brute_force(index, query, limit, exclude):
+    """Scores every row against every query trigram (the index without candidate pruning)."""
+    query_grams = neo_search.trigrams(query)
+    scores = np.array([len(query_grams & neo_search.trigrams(key)) for key in index.full_keys]) / len(query_grams)
+    scores[list(exclude)] = 0.0
+    rows = np.flatnonzero(scores >= neo_search.FUZZY_MIN_SCORE)
+    order = np.lexsort((index.trigram_counts[rows], -scores[rows]))[:limit]
+    return [(int(row), float(scores[row])) for row in rows[order]]
+
+
+QUERIES = ["snyth 4567", "synth999 s99", "2004 mn4", "90 62", "s004", "1949 ma"]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_fuzzy_matches_brute_force(index, query):
+    query = neo_search.normalize(query)
+    exclude = index.prefix_rows(query, 3)
+    assert index.fuzzy_rows(query, 10, exclude=exclude) == _brute_force(index, query, 10, exclude)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_capped_candidates_rank_the_same(index, query, monkeypatch):
+    monkeypatch.setattr(neo_search, "MAX_FUZZY_CANDIDATES", 200)  # Below the candidate count of most queries
+    query = neo_search.normalize(query)
+    assert index.fuzzy_rows(query, 10) == _brute_force(index, query, 10, ())
+
+
+def test_prefix_rows_exact_first_then_catalog_order(index):
+    rows = index.prefix_rows("synth12", 5)
+    assert index.store.names[rows[0]].split()[1] == "Synth12"
+    assert rows[1:] == sorted(rows[1:])
+    assert len(rows) == 5
@@ -0,0 +1,67 @@
+# In Backend/tests/test_propagation_cache.py
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import spiceypy as spice
+
+import czml_encoder
+import phase3_trajectory
+from propagation_cache import PropagationCache, canonical_key
+
+LEAPSECONDS_KERNEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "kernels", "naif0012.tls")
+
+
+def _mitigation_czml():
+    spice.furnsh(LEAPSECONDS_KERNEL)
+    times = np.linspace(0.0, 86400.0, 25)
+    positions = np.random.default_rng(0).normal(0.0, 1e9, (times.size, 3))
+    return phase3_trajectory.build_mitigation_czml(8e8, 8e8 + 86400.0, times, positions)
+
+
+def test_disk_hit_equals_memory_hit(tmp_path):
+    czml = _mitigation_czml()
+    key = canonical_key("test", n=1)
+    writer = PropagationCache(cache_dir=str(tmp_path))
+    writer.put(key, czml)
+    # A second instance on the same directory stands in for a restarted or another worker.
+    reader = PropagationCache(cache_dir=str(tmp_path))
+
+    from_memory = json.loads(czml_encoder.dumps(writer.get(key)))
+    from_disk = json.loads(czml_encoder.dumps(reader.get(key)))
+    assert reader.metrics()["disk_hits"] == 1
+    # czml_encoder rounds arrays to millimetres; the list read back from disk keeps full precision.
+    memory_samples = from_memory[1]["position"].pop("cartesian")
+    disk_samples = from_disk[1]["position"].pop("cartesian")
+    assert from_disk == from_memory
+    assert all(isinstance(v, (int, float)) for v in disk_samples)
+    np.testing.assert_allclose(disk_samples, memory_samples, rtol=0, atol=1e-3)
+
+
+def test_canonical_key_ignores_container_and_zero_sign():
+    assert canonical_key("orbit", state=np.array([0.0, 1.5])) == canonical_key("orbit", state=(-0.0, 1.5))
+    assert canonical_key("orbit", state=[1.0]) != canonical_key("orbit", state=[1.0 + 1e-15])
+
+
+def _write_repeatedly(cache_dir, key, worker, rounds):
+    cache = PropagationCache(cache_dir=cache_dir)
+    value = {"worker": worker, "samples": [float(worker)] * 20000}
+    for _ in range(rounds):
+        cache._disk_put(key, value)
+
+
+def test_forked_workers_writing_one_key(tmp_path):
+    # Forked children share the parent's thread id, so the temp file name must not depend on it alone.
+    context = multiprocessing.get_context("fork")
+    key = canonical_key("test", n=2)
+    workers = [context.Process(target=_write_repeatedly, args=(str(tmp_path), key, w, 50)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [worker.exitcode for worker in workers] == [0] * 4
+    assert sorted(os.listdir(tmp_path)) == [f"{key}.json"]
+    value = json.loads((tmp_path / f"{key}.json").read_text())
+    assert value["samples"] == [float(value["worker"])] * 20000
@@ -0,0 +1,107 @@
+# In Backend/tests/test_sbdb_client.py
+import codecs
+import json
+import time
+
+import pytest
+
+import benchmark
+import fixture_server
+import sbdb_client
+
+FIELDS = ["spkid", "full_name", "a", "e"]
+
+
+def _rows(n):
+    return [[int(row[0])] + row[1:] for row in benchmark.synthetic_catalog_rows(n, seed=3)]
+
+
+def _expected(rows):
+    columns = [fixture_server.FIELDS.index(name) for name in FIELDS]
+    return [[row[c] for c in columns] for row in rows]
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Starts fixture servers for a test and shuts them down afterwards; returns the base URL."""
+    monkeypatch.setattr(sbdb_client, "BACKOFF_BASE_SECONDS", 0.01)
+    servers = []
+
+    def start(rows, **options):
+        server, base_url = fixture_server.start(rows=rows, **options)
+        servers.append(server)
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_exact_multiple_of_page_size(serve):
+    rows = _rows(40)
+    result = sbdb_client.query(FIELDS, page_size=10, base_url=serve(rows), rate=0)
+    assert result["data"] == _expected(rows)
+    assert result["count"] == 40
+    assert result["fields"] == FIELDS
+    # Four full pages and at least the empty one that ends the scan.
+    assert result["stats"]["pages"] >= 5
+
+
+def test_max_rows_stops_early(serve):
+    rows = _rows(100)
+    result = sbdb_client.query(FIELDS, page_size=10, max_rows=25, concurrency=1, base_url=serve(rows), rate=0)
+    assert result["data"] == _expected(rows)[:25]
+    assert result["stats"]["pages"] == 3
+
+
+def test_503_is_retried(serve):
+    rows = _rows(60)
+    result = sbdb_client.query(FIELDS, page_size=10, base_url=serve(rows, fail_rate=0.2, seed=1), rate=0)
+    assert result["data"] == _expected(rows)
+    assert result["stats"]["retries"] > 0
+
+
+def test_429_retry_after_pauses_every_worker(serve):
+    rows = _rows(50)
+    start = time.perf_counter()
+    result = sbdb_client.query(FIELDS, page_size=10, base_url=serve(rows, rate_limit=2), rate=0)
+    assert result["data"] == _expected(rows)
+    assert result["stats"]["retries"] > 0
+    # Six pages at two requests per second: the Retry-After of 1 s has to be honoured at least twice.
+    assert time.perf_counter() - start >= 2.0
+
+
+def _body(rows):
+    page = _expected(rows)
+    page[0][1] = "99942 Apophis (2004 MN4) é中\U0001f30d"  # Multi-byte UTF-8 that chunks can split
+    return {"signature": fixture_server.SIGNATURE, "count": len(page), "fields": FIELDS, "data": page}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 8, 13, 64, 1000, 10**6])
+def test_row_stream_any_chunk_boundary(chunk_size):
+    body = _body(_rows(12))
+    raw = json.dumps(body, ensure_ascii=False, indent=1).encode("utf-8")
+    stream = sbdb_client.RowStream()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    rows = []
+    for k in range(0, len(raw), chunk_size):
+        rows.extend(stream.feed(decoder.decode(raw[k:k + chunk_size])))
+    rows.extend(stream.feed(decoder.decode(b"", final=True)))
+    assert rows == body["data"]
+    assert stream.finish() == dict(body, data=[])
+
+
+def test_row_stream_without_data_and_truncated():
+    error = {"message": "Service unavailable"}
+    stream = sbdb_client.RowStream()
+    text = json.dumps(error)
+    for k in range(0, len(text), 3):
+        assert stream.feed(text[k:k + 3]) == []
+    assert stream.finish() == error
+
+    raw = json.dumps(_body(_rows(5)))
+    stream = sbdb_client.RowStream()
+    stream.feed(raw[:raw.index("]]") + 1])
+    with pytest.raises(ValueError):
+        stream.finish()
@@ -0,0 +1,66 @@
+# In Backend/tests/test_session_updates.py
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as backend
+import phase1_simulation as sim
+from session_store import SessionStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, committed_kernels):
+    monkeypatch.setattr(backend, "SESSION_STORE", SessionStore(path=str(tmp_path / "sessions.sqlite3")))
+    with TestClient(backend.app) as client:
+        yield client
+
+
+def _receive(ws):
+    text = ws.receive_text()
+    return len(text.encode()), json.loads(text)
+
+
+def test_mission_over_the_channel_against_rest(client):
+    """One session over the channel and one over REST, step by step, on the committed impactor2025.czml."""
+    rest = {"X-Session-Id": "rest-session"}
+    with client.websocket_connect("/ws/session/channel-session") as ws:
+        _, snapshot = _receive(ws)
+        assert snapshot["type"] == "snapshot" and snapshot["czml"] == []
+
+        ws.send_json({"action": "start"})
+        ws_bytes, delta = _receive(ws)
+        rest_bytes = len(client.post("/simulation/start", headers=rest).content)
+        assert delta["simulation_state"]["active"] and "od" not in delta["simulation_state"]
+        assert ws_bytes * 100 < rest_bytes
+
+        for _ in range(sim.new_simulation_state()["max_observations"]):
+            ws.send_json({"action": "observe"})
+            ws_bytes, delta = _receive(ws)
+            response = client.post("/simulation/observe", headers=rest)
+            assert delta["type"] == "delta" and "od" not in delta["simulation_state"]
+            if delta["simulation_state"].get("phase") != "confirmation":
+                assert ws_bytes * 5 < len(response.content)
+
+        # Confirmation sends the trajectory once and deletes the uncertainty cone.
+        assert response.json()["simulation_state"]["phase"] == "confirmation"
+        packets = {packet["id"]: packet for packet in delta["czml"]}
+        assert packets["impactor2025"]["position"]["cartesian"]
+        assert packets["impactor_2025_uncertainty"] == {"id": "impactor_2025_uncertainty", "delete": True}
+
+        # From then on REST resends the whole trajectory; the channel sends an empty delta.
+        ws.send_json({"action": "observe"})
+        ws_bytes, delta = _receive(ws)
+        rest_bytes = len(client.post("/simulation/observe", headers=rest).content)
+        assert delta["simulation_state"] == {} and delta["czml"] == []
+        assert ws_bytes * 1000 < rest_bytes
+
+
+def test_observe_before_start_is_an_error(client):
+    with client.websocket_connect("/ws/session/channel-session") as ws:
+        _receive(ws)
+        ws.send_json({"action": "observe"})
+        _, message = _receive(ws)
+        assert message == {"type": "error", "detail": "Simulation is not in a state where observation is possible."}
+        ws.send_json({"action": "state"})
+        assert _receive(ws)[1]["type"] == "delta"
@@ -0,0 +1,76 @@
+# In Backend/tests/test_simulation_api.py
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as backend
+import mitigation_grid
+import orbit_determination as od
+import phase1_simulation as sim
+from session_store import SessionStore
+
+SESSION = {"X-Session-Id": "test-session"}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, committed_kernels):
+    store = SessionStore(path=str(tmp_path / "sessions.sqlite3"))
+    monkeypatch.setattr(backend, "SESSION_STORE", store)
+    with TestClient(backend.app) as client:
+        yield client, store
+
+
+def test_phase1_reads_the_committed_impactor_czml():
+    assert sim.IMPACTOR_CZML_PATH == mitigation_grid.IMPACTOR_CZML_PATH
+    assert os.path.basename(sim.IMPACTOR_CZML_PATH) == "impactor2025.czml"
+    times, positions = od.load_truth(sim.IMPACTOR_CZML_PATH)
+    assert positions.shape == (times.size, 3)
+    assert np.all(np.diff(times) > 0)
+
+
+def test_start_fits_the_orbit(client):
+    client, store = client
+    response = client.post("/simulation/start", headers=SESSION)
+    assert response.status_code == 200
+    assert response.json()["czml"][1]["id"] == "impactor2025"
+
+    state = store.get(SESSION["X-Session-Id"], sim.new_simulation_state)
+    assert state["active"] and state["observation_level"] == 0
+    assert state["od"]["covariance"]
+    assert 0.0 <= state["impact_probability"] <= 1.0
+
+
+def _circular_earth(targ, et, ref="J2000", obs=0):
+    """Earth on a circular orbit (state relative to the Sun); orients the b-plane, does not move impacts."""
+    speed, radius = 29.78, 1.495978707e8
+    angle = speed / radius * et
+    return [radius * np.cos(angle), radius * np.sin(angle), 0.0, -speed * np.sin(angle), speed * np.cos(angle), 0.0]
+
+
+def test_observe_to_confirmation_and_encounter(client, monkeypatch):
+    import ephemeris_cache
+
+    monkeypatch.setattr(ephemeris_cache, "lookup_state", _circular_earth)
+    client, store = client
+    assert client.get("/simulation/encounter", headers=SESSION).status_code == 400
+    client.post("/simulation/start", headers=SESSION)
+
+    probabilities = []
+    for _ in range(sim.new_simulation_state()["max_observations"]):
+        response = client.post("/simulation/observe", headers=SESSION)
+        assert response.status_code == 200
+        state = response.json()["simulation_state"]
+        probabilities.append(state["impact_probability"])
+        assert state["miss_sigma_m"] > 0
+    assert state["phase"] == "confirmation"
+    assert probabilities[0] < 0.5 and probabilities[-1] == 1.0
+    assert response.json()["czml"][1]["id"] == "impactor2025"  # The uncertainty cone gives way to the track
+
+    encounter = client.get("/simulation/encounter?clones=2000", headers=SESSION).json()
+    assert encounter["clones"]["impact_fraction"] == state["impact_probability"]
+    impact = encounter["nominal"]["impact"]
+    assert -90.0 <= impact["lat_deg"] <= 90.0 and -180.0 <= impact["lon_deg"] <= 180.0
+    ids = [packet["id"] for packet in encounter["czml"]]
+    assert ids == ["document", "impact_corridor", "impact_point_nominal"]
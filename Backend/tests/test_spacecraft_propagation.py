@@ -0,0 +1,34 @@
+# In Backend/tests/test_spacecraft_propagation.py
+import numpy as np
+import pytest
+
+import ephemeris_cache
+import phase3_trajectory as p3_traj
+import propagation_config
+
+AU_KM = 1.495978707e8
+ORBIT_RADII_AU = {1: 0.387, 2: 0.723, 3: 1.0, 4: 1.524, 5: 5.203, 6: 9.537, 7: 19.19, 8: 30.07}
+
+
+def _circular_state(body, et, ref="ECLIPJ2000"):
+    """Planets on circular ecliptic orbits around a fixed Sun; enough to place every perturber."""
+    if body == 10:
+        return [0.0] * 6
+    radius = ORBIT_RADII_AU[3 if body == 399 else body] * AU_KM
+    speed = np.sqrt(propagation_config.GM_SUN_KM3_S2 / radius)
+    angle = speed / radius * et + body
+    return [radius * np.cos(angle), radius * np.sin(angle), 0.0, -speed * np.sin(angle), speed * np.cos(angle), 0.0]
+
+
+@pytest.mark.parametrize("mode", ["interactive", "accurate"])
+def test_spacecraft_launched_from_earth_leaves_it(mode, monkeypatch):
+    monkeypatch.setattr(ephemeris_cache, "lookup_state", _circular_state)
+    earth = np.array(_circular_state(399, 0.0))
+    velocity = earth[3:] * (1.0 + 5.5 / np.linalg.norm(earth[3:]))
+
+    assert 3 not in p3_traj.propagation_settings(mode)["perturbers"]
+    times, positions = p3_traj.propagate_spacecraft(earth[:3], velocity, 0.0, 10 * 86400.0, mode=mode, n_points=11)
+
+    # 5.5 km/s of excess speed carries it millions of km in ten days; the EMB point mass used to hold it within ~10,000 km.
+    earth_distance_km = np.linalg.norm(positions[-1] / 1000.0 - np.array(_circular_state(399, times[-1]))[:3])
+    assert earth_distance_km > 2e6
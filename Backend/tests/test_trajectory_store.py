@@ -0,0 +1,83 @@
+# In Backend/tests/test_trajectory_store.py
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+import pytest
+import rebound
+
+import trajectory_store
+
+DURATION = 2.0 * np.pi * 20  # Twenty orbits, G = 1
+
+
+def _build(trajectory_id, barrier):
+    """One archived propagation of the test orbit, started together with the other builds."""
+    sim = rebound.Simulation()
+    sim.add(m=1.0)
+    sim.add(m=0.0, a=1.0, e=0.3)
+    sim.integrator = "whfast"
+    sim.dt = 1e-3
+    barrier.wait()
+    archive = trajectory_store.start_archive(sim, trajectory_id, DURATION)
+    sim.integrate(DURATION, exact_finish_time=1)
+    trajectory_store.finish_archive(sim, trajectory_id, archive, particle=1, seconds_per_time_unit=1.0, scale=1.0,
+                                    velocity_scale=1.0, start_et=0.0, duration_s=DURATION, frame="J2000", center="SUN")
+
+
+def _build_in_worker(directory, trajectory_id, barrier):
+    trajectory_store.TRAJECTORY_DIR = directory
+    _build(trajectory_id, barrier)
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(trajectory_store, "TRAJECTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(trajectory_store, "_archives", type(trajectory_store._archives)())
+    monkeypatch.setattr(trajectory_store, "_specs", {})
+    return tmp_path
+
+
+def _assert_one_clean_archive(store_dir, trajectory_id):
+    assert sorted(os.listdir(store_dir)) == [f"{trajectory_id}.bin", f"{trajectory_id}.json"]
+    archive = rebound.Simulationarchive(trajectory_store.archive_path(trajectory_id))
+    times = [snapshot.t for snapshot in archive]
+    # One archive's snapshots, in order; the final state may repeat a snapshot taken at the end time.
+    assert np.all(np.diff(times[:-1]) > 0) and times[-1] >= times[-2]
+    assert times[-1] == pytest.approx(DURATION)
+    assert len(times) <= trajectory_store.SNAPSHOTS + 2
+    energies = [snapshot.energy() for snapshot in archive]
+    np.testing.assert_allclose(energies, energies[0], rtol=1e-6)
+
+    # Samples lie on the orbit: a = 1 gives speed^2 = 2 / r - 1.
+    states = trajectory_store.sample(trajectory_id, np.linspace(0.0, DURATION, 7))
+    r = np.linalg.norm(states[:, :3], axis=1)
+    np.testing.assert_allclose(np.sum(states[:, 3:] ** 2, axis=1), 2.0 / r - 1.0, rtol=1e-6)
+
+
+def test_concurrent_threads_building_one_trajectory(store_dir):
+    trajectory_id = trajectory_store.register("orbit", test=1)
+    barrier = threading.Barrier(4)
+    threads = [threading.Thread(target=_build, args=(trajectory_id, barrier)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    _assert_one_clean_archive(store_dir, trajectory_id)
+
+
+def test_forked_workers_building_one_trajectory(store_dir):
+    # Workers don't share _build_locks, so each build must write a file of its own.
+    context = multiprocessing.get_context("fork")
+    trajectory_id = trajectory_store.register("orbit", test=2)
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=_build_in_worker, args=(str(store_dir), trajectory_id, barrier)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [worker.exitcode for worker in workers] == [0] * 4
+    _assert_one_clean_archive(store_dir, trajectory_id)
@@ -0,0 +1,256 @@
+# In Backend/trajectory_store.py
+"""
+Random-access trajectories: state at any time without re-running a propagation.
+
+A propagation is registered under a content hash of its inputs (the trajectory
+ID), like propagation_cache keys. It is stored in one of two ways:
+  - REBOUND runs are written to a SimulationArchive with SNAPSHOTS snapshots
+    spread over the run, and the final state is added at the end. A query
+    restores the snapshot at or before each requested time. It integrates
+    only the gap to that time, at most duration / SNAPSHOTS. Times that share
+    a snapshot are sampled in one pass from it.
+  - Sun-only (Kepler) runs store the initial state and are evaluated
+    analytically with kepler.propagate.
+
+The propagation modules write the archive during the run they do anyway, into
+a uniquely named temporary file that replaces <id>.bin once the run is done, so
+concurrent builds of one trajectory (threads or workers) never share a file. A
+trajectory whose archive is missing or evicted is rebuilt from its inputs by
+the module that owns its kind (BUILDERS) on the first query.
+
+Files under data/trajectories/ (least recently used evicted past ASTROTERRA_TRAJECTORY_DISK_MB):
+  <id>.json  kind, inputs and sampling metadata
+  <id>.bin   REBOUND SimulationArchive
+"""
+import importlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import kepler
+import sampling
+from propagation_cache import canonical_key
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+TRAJECTORY_DIR = os.path.join(PROJECT_ROOT, "data", "trajectories")
+DISK_MAX_BYTES = int(os.environ.get("ASTROTERRA_TRAJECTORY_DISK_MB", 256)) * 1024 * 1024
+SNAPSHOTS = 64
+OPEN_ARCHIVES = 16
+MAX_SAMPLES = 5000
+
+# Kind -> "module.function" that re-runs the propagation with archiving: function(trajectory_id, **inputs).
+BUILDERS = {
+    "mitigation": "phase3_trajectory.build_mitigation_trajectory",
+    "orbit": "simulation.build_orbit_trajectory",
+}
+
+_lock = threading.Lock()
+_build_locks = {}
+_archives = OrderedDict()  # trajectory ID -> (Simulationarchive, lock)
+_specs = {}  # trajectory ID -> spec, for trajectories with metadata
+
+
+def _spec_path(trajectory_id):
+    return os.path.join(TRAJECTORY_DIR, f"{trajectory_id}.json")
+
+
+def archive_path(trajectory_id):
+    return os.path.join(TRAJECTORY_DIR, f"{trajectory_id}.bin")
+
+
+def valid_trajectory_id(trajectory_id):
+    return len(trajectory_id) == 64 and all(c in "0123456789abcdef" for c in trajectory_id)
+
+
+def _read_spec(trajectory_id):
+    spec = _specs.get(trajectory_id)
+    if spec is not None:
+        return spec
+    try:
+        with open(_spec_path(trajectory_id), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(f"Unknown trajectory '{trajectory_id}'.") from None
+
+
+def _write_spec(trajectory_id, spec):
+    os.makedirs(TRAJECTORY_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=TRAJECTORY_DIR, prefix=f"{trajectory_id}.", suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(spec, f)
+        os.replace(tmp_path, _spec_path(trajectory_id))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _specs.pop(trajectory_id, None)
+
+
+def register(kind, **inputs):
+    """Records a propagation's kind and inputs (plain JSON values); returns its trajectory ID."""
+    trajectory_id = canonical_key("trajectory", kind=kind, **inputs)
+    if not os.path.exists(_spec_path(trajectory_id)):
+        _write_spec(trajectory_id, {"kind": kind, "inputs": inputs, "meta": None})
+    return trajectory_id
+
+
+# --- Writing (called by the propagation modules) ---
+def start_archive(sim, trajectory_id, duration):
+    """
+    Makes `sim` save a snapshot every duration / SNAPSHOTS (in simulation time units) from now on,
+    into a temporary archive of its own. Returns that archive's path, for finish_archive.
+    """
+    os.makedirs(TRAJECTORY_DIR, exist_ok=True)
+    fd, archive = tempfile.mkstemp(dir=TRAJECTORY_DIR, prefix=f"{trajectory_id}.", suffix=".bin.tmp")
+    os.close(fd)
+    sim.save_to_file(archive, interval=duration / SNAPSHOTS, delete_file=True)
+    return archive
+
+
+def finish_archive(sim, trajectory_id, archive, **meta):
+    """
+    Appends the final state to `archive` (from start_archive), moves it into place and records
+    how to read it: particle, relative_to, seconds_per_time_unit, scale and velocity_scale
+    (to metres and m/s), duration_s, frame, center.
+    """
+    import rebound  # deferred: only REBOUND-backed propagations reach this
+
+    try:
+        sim.save_to_file(archive)
+        snapshot_times = [snapshot.t for snapshot in rebound.Simulationarchive(archive)]
+        os.replace(archive, archive_path(trajectory_id))
+    except BaseException:
+        os.remove(archive)
+        raise
+    with _lock:
+        _archives.pop(trajectory_id, None)
+    _save_meta(trajectory_id, dict(meta, method="archive", snapshot_times=snapshot_times))
+
+
+def save_analytic(trajectory_id, r0, v0, sun_pos, sun_vel, mu, **meta):
+    """Records a Sun-only trajectory: state relative to the Sun (km, km/s) and the Sun's uniform drift."""
+    _save_meta(trajectory_id, dict(
+        meta, method="kepler", r0=list(map(float, r0)), v0=list(map(float, v0)),
+        sun_pos=list(map(float, sun_pos)), sun_vel=list(map(float, sun_vel)), mu=float(mu),
+    ))
+
+
+def _save_meta(trajectory_id, meta):
+    spec = dict(_read_spec(trajectory_id), meta=meta)
+    _write_spec(trajectory_id, spec)
+    _evict(keep=trajectory_id)
+
+
+def _evict(keep):
+    """Removes least recently used trajectories until the directory fits DISK_MAX_BYTES."""
+    entries = []
+    for name in os.listdir(TRAJECTORY_DIR):
+        if name.endswith(".json"):
+            trajectory_id = name[:-5]
+            paths = [_spec_path(trajectory_id), archive_path(trajectory_id)]
+            sizes = [os.path.getsize(p) for p in paths if os.path.exists(p)]
+            entries.append((os.path.getmtime(paths[0]), trajectory_id, paths, sum(sizes)))
+    total = sum(entry[3] for entry in entries)
+    for _, trajectory_id, paths, size in sorted(entries):
+        if total <= DISK_MAX_BYTES:
+            break
+        if trajectory_id == keep:
+            continue
+        with _lock:
+            _archives.pop(trajectory_id, None)
+        _specs.pop(trajectory_id, None)
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        total -= size
+
+
+# --- Reading ---
+def _ready_spec(trajectory_id):
+    """The trajectory's spec, re-running its propagation first if it has no usable archive."""
+    spec = _read_spec(trajectory_id)
+    meta = spec["meta"]
+    if meta is not None and (meta["method"] != "archive" or os.path.exists(archive_path(trajectory_id))):
+        _specs[trajectory_id] = spec
+        return spec
+    with _lock:
+        build_lock = _build_locks.setdefault(trajectory_id, threading.Lock())
+    with build_lock:
+        spec = _read_spec(trajectory_id)
+        meta = spec["meta"]
+        if meta is None or (meta["method"] == "archive" and not os.path.exists(archive_path(trajectory_id))):
+            module_name, function_name = BUILDERS[spec["kind"]].rsplit(".", 1)
+            getattr(importlib.import_module(module_name), function_name)(trajectory_id, **spec["inputs"])
+            spec = _read_spec(trajectory_id)
+    return spec
+
+
+def _open_archive(trajectory_id):
+    import rebound  # deferred: Kepler trajectories never load REBOUND
+
+    with _lock:
+        entry = _archives.get(trajectory_id)
+        if entry is None:
+            entry = (rebound.Simulationarchive(archive_path(trajectory_id)), threading.Lock())
+            _archives[trajectory_id] = entry
+            while len(_archives) > OPEN_ARCHIVES:
+                _archives.popitem(last=False)
+        _archives.move_to_end(trajectory_id)
+    return entry
+
+
+def _sample_archive(trajectory_id, meta, offsets):
+    t = offsets / meta["seconds_per_time_unit"]
+    snapshot_times = np.asarray(meta["snapshot_times"])
+    snapshot = np.clip(np.searchsorted(snapshot_times, t, side="right") - 1, 0, len(snapshot_times) - 1)
+    order = np.argsort(t, kind="stable")
+    samples = np.empty((t.size, 7), dtype=np.float64)
+    archive, archive_lock = _open_archive(trajectory_id)
+    for k in np.unique(snapshot):
+        rows = order[snapshot[order] == k]
+        with archive_lock:
+            sim = archive[int(k)]
+        samples[rows] = sampling.sample_states(
+            sim, t[rows], meta["particle"], meta.get("relative_to"), meta["scale"], meta["velocity_scale"],
+        )
+    return samples[:, 1:]
+
+
+def _sample_kepler(meta, offsets):
+    sun_pos, sun_vel = np.array(meta["sun_pos"]), np.array(meta["sun_vel"])
+    positions, velocities = kepler.propagate(np.array(meta["r0"]), np.array(meta["v0"]), offsets, mu=meta["mu"])
+    positions = positions + sun_pos + np.outer(offsets, sun_vel)
+    return np.hstack([positions, velocities + sun_vel]) * 1000.0
+
+
+def sample(trajectory_id, offsets):
+    """
+    States at `offsets` (seconds from the trajectory's start): an (n, 6) array of
+    [x, y, z (m), vx, vy, vz (m/s)]. Raises KeyError for unknown IDs, ValueError for bad times.
+    """
+    offsets = np.atleast_1d(np.asarray(offsets, dtype=np.float64))
+    if offsets.size > MAX_SAMPLES:
+        raise ValueError(f"At most {MAX_SAMPLES} times per query.")
+    spec = _ready_spec(trajectory_id)
+    meta = spec["meta"]
+    if offsets.size and (offsets.min() < 0.0 or offsets.max() > meta["duration_s"]):
+        raise ValueError(f"Times must lie within the trajectory (0 to {meta['duration_s']:.0f} s after its start).")
+    os.utime(_spec_path(trajectory_id))  # mtime doubles as the LRU timestamp for eviction
+    if meta["method"] == "kepler":
+        return _sample_kepler(meta, offsets)
+    return _sample_archive(trajectory_id, meta, offsets)
+
+
+def describe(trajectory_id):
+    """Kind, start ET, duration, frame and center of a trajectory (builds it if needed)."""
+    spec = _ready_spec(trajectory_id)
+    meta = spec["meta"]
+    return {
+        "trajectory_id": trajectory_id, "kind": spec["kind"], "method": meta["method"],
+        "start_et": meta["start_et"], "duration_s": meta["duration_s"], "frame": meta["frame"], "center": meta["center"],
+    }
@@ -21,6 +21,8 @@ let sandboxState = 'inactive'; // inactive, selecting_asteroid, selecting_target
 // --- Add these under your SANDBOX GLOBALS ---
 let phase1State = {};
 let phase1DataSource = null;
+let encounterDataSource = null; // Impact risk corridor and nominal impact point from /simulation/encounter
+let encounterRequest = 0;
 let launchPointMarker = null;
 // --- Add this near your other global variables ---
 let missionState = {};
@@ -28,6 +30,11 @@ let missionState = {};
 let impactTime = null;
 let mitigationDataSource = null;
 
+// --- Session: this browser's simulation state on the backend (X-Session-Id header) ---
+const SESSION_ID = getSessionId();
+let phase1ServerSession = false;
+let sessionSocket = null; // /ws/session/{SESSION_ID}: snapshot then deltas of the Phase 1 simulation
+
 const LAUNCH_VEHICLES = {
     falcon_heavy: { name: "Falcon Heavy", cost: 0.15, max_payload_kg: 26700, spec: "Cost: $150M | Max Payload: 26,700 kg", construction_time: 20, reliability: 0.98, escape_burn_hr: 12 },
     sls_block1: { name: "SLS Block 1", cost: 2.0, max_payload_kg: 95000, spec: "Cost: $2.0B | Max Payload: 95,000 kg", construction_time: 40, reliability: 0.92, escape_burn_hr: 4 },
@@ -46,6 +53,69 @@ const IMPACTOR_MATERIALS = {
 // --- INITIALIZATION ---
 document.addEventListener('DOMContentLoaded', initialize);
 
+function getSessionId() {
+    let id = localStorage.getItem('astroterra-session-id');
+    if (!id) {
+        id = crypto.randomUUID ? crypto.randomUUID() : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        localStorage.setItem('astroterra-session-id', id);
+    }
+    return id;
+}
+
+// fetch() for the /simulation/* endpoints: the session header gives every browser its own simulation.
+function simulationFetch(path, options = {}) {
+    return fetch(`${import.meta.env.VITE_API_URL}${path}`, {
+        ...options,
+        headers: { ...(options.headers || {}), 'X-Session-Id': SESSION_ID },
+    });
+}
+
+// Opens this session's update channel. The backend answers with a snapshot of the simulation state
+// and its CZML, then pushes deltas after every action, whichever connection or REST call made it.
+function openSessionSocket() {
+    closeSessionSocket();
+    const url = new URL(`${import.meta.env.VITE_API_URL}/ws/session/${encodeURIComponent(SESSION_ID)}`, window.location.href);
+    url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(url);
+    socket.onmessage = (event) => applySessionMessage(JSON.parse(event.data));
+    socket.onerror = (event) => console.warn("Session channel error; observations fall back to REST.", event);
+    socket.onclose = () => {
+        if (sessionSocket === socket) sessionSocket = null;
+    };
+    sessionSocket = socket;
+}
+
+function closeSessionSocket() {
+    if (sessionSocket) {
+        const socket = sessionSocket;
+        sessionSocket = null;
+        socket.close();
+    }
+}
+
+// Sends {"action": ...} over the session channel; false if it is not open (use REST instead).
+function sendSessionAction(action) {
+    if (!sessionSocket || sessionSocket.readyState !== WebSocket.OPEN) return false;
+    sessionSocket.send(JSON.stringify({ action }));
+    return true;
+}
+
+// Applies a session channel message: merges the changed state fields into phase1State and the CZML
+// packet updates (new, changed and {"delete": true} packets) into the Phase 1 data source.
+function applySessionMessage(message) {
+    if (message.type === 'error') {
+        console.error("Session channel:", message.detail);
+        document.getElementById('phase1-status-text').textContent = message.detail;
+        document.getElementById('phase1-observe-btn').disabled = false;
+        return;
+    }
+    if (message.type === 'snapshot') phase1State = {};
+    Object.assign(phase1State, message.simulation_state);
+    if (phase1DataSource && message.czml.length) phase1DataSource.process(message.czml);
+    const observed = 'observation_level' in message.simulation_state || 'phase' in message.simulation_state;
+    if (observed && phase1State.active && phase1State.observation_level > 0) showObservationResult(phase1State);
+}
+
 // --- Place this entire new function BEFORE the initialize() function ---
 function createEarthEntity() {
     viewer.entities.add({
@@ -182,8 +252,8 @@ document.querySelectorAll('.porkchop-btn').forEach(btn => {
     // --- Final Setup ---
     viewer.camera.setView({ destination: Cesium.Cartesian3.fromDegrees(-90, 45, 15000000) });
     fetchAndPopulateNeoList();
-    preloadHeatmapData(false);
-    populateCuratedList();
+    loadInitialScene();
+    populateUpcomingThreats();
     makePanelsDraggable();
     setupPanelToggles();
     makeTimerDraggable();
@@ -306,11 +376,61 @@ function updateSandboxInstructions() {
     }
 }
 
-async function populateCuratedList() {
+// The startup layers in one /scene request (planets + catalog CZML and the curated list), instead of one
+// request per layer. Falls back to the per-layer endpoints if the scene request fails.
+async function loadInitialScene() {
+    let parts;
     try {
-        const response = await fetch(`${import.meta.env.VITE_API_URL}/neos/curated_list`);
-        if (!response.ok) throw new Error('Failed to fetch curated NEO list.');
-        const data = await response.json();
+        const response = await fetch(`${import.meta.env.VITE_API_URL}/scene?layers=planets,catalog,curated_list&format=multipart`);
+        if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
+        parts = parseMultipart(await response.arrayBuffer(), response.headers.get('Content-Type'));
+    } catch (error) {
+        console.warn("Scene request failed; loading layers one by one.", error);
+        preloadHeatmapData(false);
+        populateCuratedList();
+        return;
+    }
+    // Both CZML parts are complete documents; the heatmap is one document, so the catalog's header is dropped.
+    preloadHeatmapData(false, [...parts.planets, ...parts.catalog.slice(1)]);
+    populateCuratedList(parts.curated_list);
+}
+
+// Splits a /scene multipart/mixed body into {part name: parsed JSON}. Every part carries a Content-Length.
+function parseMultipart(buffer, contentType) {
+    const boundary = contentType.match(/boundary=([^;]+)/)[1];
+    const bytes = new Uint8Array(buffer);
+    const decoder = new TextDecoder();
+    const parts = {};
+    let offset = 0;
+    for (;;) {
+        const headerEnd = indexOfHeaderEnd(bytes, offset);
+        if (headerEnd < 0) break;
+        const headers = decoder.decode(bytes.subarray(offset, headerEnd));
+        if (!headers.startsWith(`--${boundary}\r\n`)) break;
+        const name = headers.match(/name="([^"]+)"/)[1];
+        const length = parseInt(headers.match(/Content-Length: (\d+)/i)[1], 10);
+        const bodyStart = headerEnd + 4;
+        parts[name] = JSON.parse(decoder.decode(bytes.subarray(bodyStart, bodyStart + length)));
+        offset = bodyStart + length + 2; // Skip the CRLF after the body
+    }
+    return parts;
+}
+
+// Index of the blank line (CRLF CRLF) that ends a part's headers, or -1.
+function indexOfHeaderEnd(bytes, from) {
+    for (let i = from; i + 3 < bytes.length; i++) {
+        if (bytes[i] === 13 && bytes[i + 1] === 10 && bytes[i + 2] === 13 && bytes[i + 3] === 10) return i;
+    }
+    return -1;
+}
+
+async function populateCuratedList(data = null) {
+    try {
+        if (!data) {
+            const response = await fetch(`${import.meta.env.VITE_API_URL}/neos/curated_list`);
+            if (!response.ok) throw new Error('Failed to fetch curated NEO list.');
+            data = await response.json();
+        }
         const selectElement = document.getElementById('curated-neo-select');
         if (!selectElement) return;
         selectElement.innerHTML = '';
@@ -347,10 +467,10 @@ async function populateCuratedList() {
 
 // In main.js
 
-async function preloadHeatmapData(showByDefault = false) {
+async function preloadHeatmapData(showByDefault = false, czml = null) {
     try {
         const neosUrl = `${import.meta.env.VITE_API_URL}/czml/catalog`;
-        heatmapDataSource = await Cesium.CzmlDataSource.load(neosUrl);
+        heatmapDataSource = await Cesium.CzmlDataSource.load(czml || neosUrl);
         
         // --- REPLACE THE OLD forEach LOOP WITH THIS NEW LOGIC ---
         const dotImage = createDotImage();
@@ -391,6 +511,7 @@ async function preloadHeatmapData(showByDefault = false) {
 
 async function visualizeNeoHeatmap() {
     document.getElementById('asteroid-dashboard').style.display = 'block'; 
+    closeSessionSocket();
     viewer.entities.removeAll();
     viewer.dataSources.removeAll(true);
     if (targetMarker) {
@@ -408,21 +529,65 @@ async function visualizeNeoHeatmap() {
     }
 }
 async function fetchAndPopulateNeoList() {
+    // Suggestions come from the backend search index as the user types,
+    // so the full NEO list never has to be downloaded.
+    const searchInput = document.getElementById('asteroid-search');
+    const datalist = document.getElementById('asteroid-list');
+    if (!searchInput || !datalist) return;
+
+    let debounceTimer = null;
+    searchInput.addEventListener('input', () => {
+        clearTimeout(debounceTimer);
+        const query = searchInput.value.trim();
+        if (!query) return;
+        debounceTimer = setTimeout(async () => {
+            try {
+                const url = `${import.meta.env.VITE_API_URL}/neos/search?q=${encodeURIComponent(query)}&limit=10`;
+                const response = await fetch(url);
+                if (!response.ok) throw new Error(`NEO search failed with status: ${response.status}`);
+                const data = await response.json();
+                // Keep the latest suggestions around for lookups by name.
+                allNeos = data.results;
+                datalist.innerHTML = ''; // Clear previous options
+                allNeos.forEach(neo => {
+                    const option = document.createElement('option');
+                    option.value = neo.name;
+                    datalist.appendChild(option);
+                });
+            } catch (error) {
+                console.error("Failed to search NEOs:", error);
+            }
+        }, 150);
+    });
+}
+
+// Closest approaches of planet and city killers in the coming years, from the close-approach calendar.
+// Clicking one selects the object in the heatmap.
+async function populateUpcomingThreats() {
+    const list = document.getElementById('upcoming-threats-list');
+    if (!list) return;
     try {
-        const response = await fetch(`${import.meta.env.VITE_API_URL}/neos/list`);
-        if (!response.ok) throw new Error(`Failed to fetch NEO list with status: ${response.status}`);
-        allNeos = await response.json();
-        // The data is now loaded into the allNeos array for future use.
-        const datalist = document.getElementById('asteroid-list');
-        datalist.innerHTML = ''; // Clear previous options
-        allNeos.forEach(neo => {
-            const option = document.createElement('option');
-            option.value = neo.name;
-            datalist.appendChild(option);
+        const response = await fetch(`${import.meta.env.VITE_API_URL}/neos/upcoming_threats?limit=5`);
+        if (!response.ok) throw new Error(`Upcoming threats request failed with status: ${response.status}`);
+        const data = await response.json();
+        list.innerHTML = '';
+        if (data.results.length === 0) {
+            list.innerHTML = `<li>No close approaches before ${data.to.slice(0, 10)}.</li>`;
+            return;
+        }
+        data.results.forEach(threat => {
+            const item = document.createElement('li');
+            item.textContent = `${threat.name.trim()}: ${threat.date.slice(0, 10)}, ${threat.dist_ld.toFixed(1)} LD`;
+            item.title = `${threat.classification}, ${threat.dist_au.toFixed(4)} AU at ${threat.v_rel_km_s.toFixed(1)} km/s`;
+            item.addEventListener('click', () => {
+                const entity = heatmapDataSource && heatmapDataSource.entities.getById(`asteroid_${threat.spkid}`);
+                if (entity) viewer.selectedEntity = entity;
+            });
+            list.appendChild(item);
         });
-        console.log(`${allNeos.length} NEOs loaded into memory.`);
     } catch (error) {
-        console.error("Failed to fetch NEO list:", error);
+        list.innerHTML = '<li>Close-approach calendar unavailable.</li>';
+        console.error("Failed to load upcoming threats:", error);
     }
 }
 
@@ -485,6 +650,9 @@ async function startPhase1Mission() {
     document.getElementById('mission-selection-panel').style.display = 'none';
     document.getElementById('asteroid-dashboard').style.display = 'none'; // Hide dashboard to prevent UI overlap
     viewer.entities.removeAll();
+    closeSessionSocket();
+    encounterRequest++; // Drops corridors still loading for the previous run
+    removeImpactCorridor();
     if(phase1DataSource && viewer.dataSources.contains(phase1DataSource)) {
         viewer.dataSources.remove(phase1DataSource, true);
     }
@@ -505,6 +673,17 @@ async function startPhase1Mission() {
     phase1DataSource = await Cesium.CzmlDataSource.load(czmlUrl);
     await viewer.dataSources.add(phase1DataSource);
 
+    // Start this session's simulation on the backend; without it the scripted observation sequence is used.
+    phase1ServerSession = false;
+    try {
+        const response = await simulationFetch('/simulation/start', { method: 'POST' });
+        phase1ServerSession = response.ok;
+        if (!response.ok) console.warn(`Simulation start failed (status ${response.status}); using scripted observations.`);
+    } catch (error) {
+        console.warn("Simulation start failed; using scripted observations.", error);
+    }
+    if (phase1ServerSession) openSessionSocket();
+
     // 3. Logic for the "Observe" button
     let observationCount = 0;
     const observeBtn = document.getElementById('phase1-observe-btn');
@@ -513,7 +692,21 @@ async function startPhase1Mission() {
     
     // Reset button state for a new scenario run
     observeBtn.disabled = false;
-    observeBtn.onclick = () => {
+    observeBtn.onclick = async () => {
+        if (phase1ServerSession) {
+            observeBtn.disabled = true;
+            // The channel's delta updates the panel and the uncertainty cone (applySessionMessage).
+            if (sendSessionAction('observe')) return;
+            try {
+                const response = await simulationFetch('/simulation/observe', { method: 'POST' });
+                if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
+                showObservationResult((await response.json()).simulation_state);
+            } catch (error) {
+                console.error("Observation failed:", error);
+                observeBtn.disabled = false;
+            }
+            return;
+        }
         observationCount++;
         if (observationCount === 1) {
             probabilitySpan.textContent = "35.0%";
@@ -524,18 +717,7 @@ async function startPhase1Mission() {
         } else {
             probabilitySpan.textContent = "100.0%";
             statusSpan.textContent = "IMPACT CONFIRMED.";
-            observeBtn.disabled = true;
-
-            // Start the impact timer
-                      const impactorEntity = phase1DataSource.entities.getById('impactor2025');
-                                if (impactorEntity && impactorEntity.position) {
-                                    impactTime = viewer.clock.stopTime;
-                                    viewer.clock.onTick.addEventListener(updateImpactTimer);
-                                    document.getElementById('impact-timer-container').style.display = 'block';
-                                }
-            // Transition to the decision phase
-            document.getElementById('phase1-observation-step').style.display = 'none';
-            document.getElementById('phase1-decision-step').style.display = 'block';
+            confirmPhase1Tracking();
         }
     };
 
@@ -575,7 +757,64 @@ async function startPhase1Mission() {
                 }
                 return 20000.0; // default scale
             }, false);
-        }    }// --- Add these two new functions anywhere in main.js ---
+        }    }
+
+// Shows a simulation state from the backend in the Phase 1 panel.
+function showObservationResult(state) {
+    document.getElementById('phase1-probability').textContent = `${(state.impact_probability * 100).toFixed(1)}%`;
+    if (phase1ServerSession && state.impact_probability > 0) showImpactCorridor();
+    const statusSpan = document.getElementById('phase1-status-text');
+    if (state.phase === 'confirmation') {
+        statusSpan.textContent = state.impact_probability >= 0.99 ? "IMPACT CONFIRMED." : "Tracking complete.";
+        confirmPhase1Tracking();
+    } else {
+        statusSpan.textContent = `Orbit refined (${state.observation_level}/${state.max_observations} nights)...`;
+        document.getElementById('phase1-observe-btn').disabled = false;
+    }
+}
+
+// Draws where the impacting clones of the current orbit solution hit the ground (b-plane encounter analysis).
+async function showImpactCorridor() {
+    const request = ++encounterRequest;
+    try {
+        const response = await simulationFetch('/simulation/encounter');
+        if (!response.ok) throw new Error(`Encounter analysis failed with status: ${response.status}`);
+        const encounter = await response.json();
+        const corridor = await Cesium.CzmlDataSource.load(encounter.czml);
+        if (request !== encounterRequest) return; // A newer observation has been analysed since
+        removeImpactCorridor();
+        encounterDataSource = corridor;
+        await viewer.dataSources.add(corridor);
+        const impact = encounter.nominal.impact;
+        if (impact) {
+            console.log(`Nominal impact at ${impact.lat_deg.toFixed(2)}, ${impact.lon_deg.toFixed(2)} (${impact.utc} UTC); ` +
+                `${(encounter.clones.impact_fraction * 100).toFixed(1)}% of ${encounter.clones.n} clones hit.`);
+        }
+    } catch (error) {
+        console.error("Failed to load the impact corridor:", error);
+    }
+}
+
+function removeImpactCorridor() {
+    if (encounterDataSource && viewer.dataSources.contains(encounterDataSource)) {
+        viewer.dataSources.remove(encounterDataSource, true);
+    }
+    encounterDataSource = null;
+}
+
+// Tracking is complete: start the impact timer and move on to the decision step.
+function confirmPhase1Tracking() {
+    document.getElementById('phase1-observe-btn').disabled = true;
+    const impactorEntity = phase1DataSource.entities.getById('impactor2025');
+    if (impactorEntity && impactorEntity.position) {
+        impactTime = viewer.clock.stopTime;
+        viewer.clock.onTick.addEventListener(updateImpactTimer);
+        document.getElementById('impact-timer-container').style.display = 'block';
+    }
+    document.getElementById('phase1-observation-step').style.display = 'none';
+    document.getElementById('phase1-decision-step').style.display = 'block';
+}
+// --- Add these two new functions anywhere in main.js ---
 
 // In main.js, replace the existing function
 // In main.js, replace the existing function
@@ -1004,7 +1243,7 @@ async function launchMitigationMission() {
 
     try {
         // 4. SEND DATA TO THE BACKEND
-        const response = await fetch(`${import.meta.env.VITE_API_URL}/simulation/launch_mitigation`, {
+        const response = await simulationFetch('/simulation/launch_mitigation', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(payload)